@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+I2C bus benchmark: servo latency while the display redraws
+
+Drives a real-time ``MockI2CBus`` (every transaction takes its wire time)
+with three threads for a few seconds: servo updates at the streaming rate,
+IMU reads at the sample rate and back-to-back full-screen display
+redraws. It runs twice, once with each device locking the bus for itself
+in arrival order (what independent drivers do) and once through the
+``I2CBusManager``, and prints servo, IMU and display latency and bus
+utilization for both.
+
+Usage:
+    python software/benchmarks/i2c_bus_benchmark.py --seconds 5
+"""
+
+import sys
+import time
+import json
+import argparse
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hardware.i2c_bus import (I2CBusManager, MockI2CBus, SERVO_PRIORITY, IMU_PRIORITY,
+                              DISPLAY_PRIORITY)
+from hardware.framebuffer import SSD1306Backend
+from hardware.servo_output import PCA9685Output
+
+DISPLAY_ADDRESS = 0x3C
+IMU_ADDRESS = 0x68
+SERVO_ADDRESS = 0x40
+
+
+def run(managed: bool, seconds: float, servo_hz: float, imu_hz: float, frequency_hz: float):
+    bus = MockI2CBus((DISPLAY_ADDRESS, IMU_ADDRESS, SERVO_ADDRESS), frequency_hz, realtime=True)
+    manager = I2CBusManager(bus, frequency_hz)
+    servo = PCA9685Output(manager.device("servo", SERVO_PRIORITY), SERVO_ADDRESS)
+    imu = manager.device("imu", IMU_PRIORITY)
+    display = SSD1306Backend(manager.device("display", DISPLAY_PRIORITY, background=managed,
+                                            coalesce=(0x00, 0x40) if managed else ()),
+                             DISPLAY_ADDRESS)
+    if managed:
+        manager.start()
+    servo.initialize()
+    display.initialize()
+    stop = time.monotonic() + seconds
+
+    def servo_loop():
+        pulse = 1.0
+        while time.monotonic() < stop:
+            # A slow sweep, so nearly every update changes a channel
+            pulse = 1.0 + (pulse + 0.01 - 1.0) % 1.0
+            servo.write(pulse, 2.0 - pulse)
+            time.sleep(1.0 / servo_hz)
+
+    def imu_loop():
+        sample = bytearray(6)
+        while time.monotonic() < stop:
+            imu.writeto_then_readfrom(IMU_ADDRESS, bytes((0x3B,)), sample)
+            time.sleep(1.0 / imu_hz)
+
+    def display_loop():
+        frame = 0
+        while time.monotonic() < stop:
+            frame += 1
+            for page in range(8):
+                display.write_page(page, 0, bytes([frame & 0xFF]) * 128)
+            if managed:
+                manager.flush()
+
+    threads = [threading.Thread(target=loop) for loop in (servo_loop, imu_loop, display_loop)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    manager.stop()
+    return manager.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark servo latency on a shared I2C bus")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--servo-hz", type=float, default=50.0, help="Servo update rate")
+    parser.add_argument("--imu-hz", type=float, default=200.0, help="IMU sample rate")
+    parser.add_argument("--frequency-hz", type=float, default=100_000, help="I2C clock")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = {name: run(managed, args.seconds, args.servo_hz, args.imu_hz, args.frequency_hz)
+               for name, managed in (("direct", False), ("managed", True))}
+
+    print(f"{'mode':<10}{'device':<10}{'transactions':>14}{'mean ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in results.items():
+        for device, summary in stats["devices"].items():
+            print(f"{name:<10}{device:<10}{summary['transactions']:>14}"
+                  f"{summary.get('latency_mean_ms', 0.0):>10.2f}"
+                  f"{summary.get('latency_p99_ms', 0.0):>10.2f}"
+                  f"{summary.get('latency_max_ms', 0.0):>10.2f}")
+        print(f"{name:<10}bus utilization {stats['utilization']:.0%}, "
+              f"{stats['coalesced']} display writes coalesced")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
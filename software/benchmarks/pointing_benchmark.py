@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Pointing benchmark: throughput and accuracy of the pointing pipeline
+
+Measures, on the machine it runs on:
+
+- solves per second for each target type, one time per call (uncached),
+  one call over a day of minutes (batch), and through the pointing cache
+- trajectory plans per second and complete simulated moves per second
+- ConfigManager lookups per second with a large generated target list
+- display renders and scroll steps per second on the headless backend
+
+and compares positions over a day against the fixed reference values in
+``references.json``: airless apparent places for planets and catalog
+objects from astropy's built-in ephemeris, SGP4 for the satellite and the
+WGS84 vector for the Earth location, at the observer and epoch stored in
+the file. Types whose precision tier refracts are checked against the
+references refracted with Skyfield's formula for the configured weather.
+A built-in ISS element set close to the epoch is used for the satellite
+check so results do not depend on the TLE files present.
+
+Results can be saved as a baseline and later runs compared against it: a
+throughput more than ``--threshold`` below its baseline, or a pointing
+error above ``--tolerance``, fails the run with exit status 1. Baselines
+are per machine, so record one on the device (or CI runner) itself.
+Ephemeris files must already be cached in the configured data directory.
+
+Usage:
+    python software/benchmarks/pointing_benchmark.py --save-baseline
+    python software/benchmarks/pointing_benchmark.py --threshold 0.2 --json results.json
+"""
+
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import itertools
+import platform
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import AnywharrowController
+from hardware.framebuffer import HeadlessBackend
+from positioning.astronomy import REFRACTED_TIERS
+from positioning.pointing_cache import PointingCache
+from simulation.backends import SimulatedServo
+from utils.clock import SimulatedClock
+from utils.config import ConfigManager
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_REFERENCES = Path(__file__).resolve().parent / "references.json"
+DEFAULT_EPOCH = "2014-01-21T00:00:00Z"
+
+# ISS elements from 2014-01-20, used for the satellite accuracy check
+REFERENCE_TLE = (
+    "ISS (ZARYA)",
+    "1 25544U 98067A   14020.93268519  .00009878  00000-0  18200-3 0  5082",
+    "2 25544  51.6498 109.4756 0003572  55.9686 274.8005 15.49815350868473",
+)
+
+# One representative target per type
+SAMPLE_TARGETS = [
+    {"name": "Mars", "type": "planet"},
+    {"name": "Vega", "type": "star"},
+    {"name": "Andromeda Galaxy", "type": "deep_space"},
+    {"name": "ISS (ZARYA)", "type": "satellite", "norad_id": 25544},
+    {"name": "Tokyo", "type": "earth_location", "latitude": 35.6762, "longitude": 139.6503},
+]
+
+
+def angular_separation(az1, el1, az2, el2):
+    """Great-circle angle between directions, all in degrees"""
+    az1, el1, az2, el2 = (np.radians(np.asarray(value, dtype=float)) for value in (az1, el1, az2, el2))
+    cosine = np.sin(el1) * np.sin(el2) + np.cos(el1) * np.cos(el2) * np.cos(az1 - az2)
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def rate(operation: Callable[[], object], min_seconds: float = 0.3, repeats: int = 3) -> float:
+    """
+    Operations per second of a callable
+
+    The call is repeated in growing batches until a batch takes at least
+    ``min_seconds``; the best of ``repeats`` such batches is reported.
+    """
+    count = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(count):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        count = max(count * 2, int(count * 1.2 * min_seconds / max(elapsed, 1e-9)))
+    best = count / elapsed
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(count):
+            operation()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+class PointingBenchmark:
+    """Runs every benchmark section against one controller"""
+
+    def __init__(self, config_path: str, epoch: float, min_seconds: float = 0.3,
+                 config_targets: int = 20000, references_path=DEFAULT_REFERENCES):
+        self.epoch = epoch
+        self.references_path = Path(references_path)
+        self.min_seconds = min_seconds
+        self.config_targets = config_targets
+        self.clock = SimulatedClock(epoch)
+        self.servo = SimulatedServo(self.clock)
+        self.controller = AnywharrowController(config_path, clock=self.clock, servo=self.servo,
+                                               display_backend=HeadlessBackend())
+        self.astronomy = self.controller.astronomy
+        self.astronomy.satellites.find()
+        self.astronomy.satellites.add_tle(*REFERENCE_TLE)
+        self.throughput: Dict[str, float] = {}
+        self.accuracy: Dict[str, Dict[str, float]] = {}
+
+    def _rate(self, name: str, operation: Callable[[], object], per_call: int = 1):
+        self.throughput[name] = rate(operation, self.min_seconds) * per_call
+
+    def solve_single(self, target, when, astronomy=None):
+        """Solve one target once, bypassing the pointing cache"""
+        astronomy = astronomy or self.astronomy
+        if target["type"] == "earth_location":
+            return astronomy.calculate_earth_location_azimuth_elevation(
+                target["latitude"], target["longitude"], altitude=target.get("altitude", 0.0))
+        return astronomy.calculate_celestial_azimuth_elevation(target["name"], when,
+                                                               norad_id=target.get("norad_id"))
+
+    def run_solves(self):
+        day = self.epoch + np.arange(1440) * 60.0
+        cache = self.controller.pointing_cache
+        for target in SAMPLE_TARGETS:
+            kind = target["type"]
+            self.solve_single(target, self.epoch)
+            self._rate(f"solve_single[{kind}]", lambda: self.solve_single(target, self.epoch))
+            self._rate(f"solve_batch[{kind}]",
+                       lambda: self.astronomy.calculate_batch_azimuth_elevation([target], day),
+                       per_call=len(day))
+            if cache is not None:
+                offsets = itertools.cycle(np.linspace(0.0, 30.0, 997))
+                cache.get_position(target, self.epoch)
+                self._rate(f"solve_cached[{kind}]",
+                           lambda: cache.get_position(target, self.epoch + next(offsets)))
+
+    def run_motion(self):
+        gimbal = self.controller.gimbal
+        gimbal.initialize()
+        generator = np.random.default_rng(0)
+        moves = itertools.cycle(np.column_stack([generator.uniform(0.0, 360.0, 4096),
+                                                 generator.uniform(0.0, 90.0, 4096)]))
+
+        def plan():
+            azimuth, elevation = next(moves)
+            gimbal.planner.plan(gimbal.azimuth_angle, gimbal.elevation_angle, azimuth, elevation)
+
+        def move():
+            azimuth, elevation = next(moves)
+            gimbal.move_to_position(azimuth, elevation, wait=True)
+
+        self._rate("trajectory_plan", plan)
+        self._rate("trajectory_move", move)
+
+    def run_config(self):
+        directory = Path(tempfile.mkdtemp(prefix="pointing-benchmark-"))
+        try:
+            generator = np.random.default_rng(1)
+            targets = [{"name": f"Target {i}", "type": "earth_location",
+                        "latitude": float(generator.uniform(-80.0, 80.0)),
+                        "longitude": float(generator.uniform(-180.0, 180.0))}
+                       for i in range(self.config_targets)]
+            with open(directory / "targets.json", 'w') as f:
+                json.dump({"targets": targets}, f)
+
+            start = time.perf_counter()
+            config = ConfigManager(str(directory))
+            self.throughput["config_load_targets_per_second"] = \
+                self.config_targets / (time.perf_counter() - start)
+
+            names = itertools.cycle(generator.permutation(self.config_targets).tolist())
+            self._rate("config_get_by_name", lambda: config.get_target_by_name(f"Target {next(names)}"))
+            self._rate("config_get_index", lambda: config.get_target_index(f"Target {next(names)}"))
+            self._rate("config_get_target", lambda: config.get_target(int(next(names))))
+            config.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_display(self):
+        display = self.controller.display
+        display.initialize()
+        labels = [("Mars", "The Red Planet"),
+                  ("International Space Station", "Crewed orbital laboratory"),
+                  ("Andromeda Galaxy", "M31 Galaxy")]
+        shown = itertools.count()
+
+        def render():
+            display.show_target(*labels[next(shown) % len(labels)])
+
+        self._rate("display_render", render)
+        display.show_target(*labels[1])
+        self._rate("display_scroll", display.scroll)
+
+    def run_accuracy(self):
+        """Maximum error over a day against the fixed reference positions"""
+        from skyfield.earthlib import refract
+
+        with open(self.references_path, 'r') as f:
+            references = json.load(f)
+        observer = references["observer"]
+        astronomy = self.astronomy.for_location(observer["latitude"], observer["longitude"],
+                                                observer["altitude"])
+        cache = None
+        if self.controller.pointing_cache is not None:
+            cache = PointingCache.from_config(astronomy, self.controller.config)
+        epoch = parse_epoch(references["epoch"])
+
+        for target in SAMPLE_TARGETS:
+            kind = target["type"]
+            reference = references["targets"][target["name"]]
+            reference_az = np.array(reference["azimuth"])
+            reference_el = np.array(reference["elevation"])
+            times = epoch + np.arange(len(reference_az)) * references["step_seconds"]
+            # Refracted tiers are checked against refracted references
+            if astronomy.tier(kind) in REFRACTED_TIERS:
+                reference_el = refract(reference_el, astronomy.temperature_c, astronomy.pressure_mbar)
+
+            batch_az, batch_el = astronomy.calculate_batch_azimuth_elevation([target], times)
+            single = np.array([astronomy._nan_none(self.solve_single(target, when, astronomy))
+                               for when in times])
+            errors = {
+                "single_deg": angular_separation(single[:, 0], single[:, 1], reference_az, reference_el),
+                "batch_deg": angular_separation(batch_az[0], batch_el[0], reference_az, reference_el),
+            }
+            if cache is not None:
+                cached = np.array([astronomy._nan_none(cache.get_position(target, when)) for when in times])
+                errors["cached_deg"] = angular_separation(cached[:, 0], cached[:, 1],
+                                                          reference_az, reference_el)
+            # NaN (no solution) counts as an infinite error
+            self.accuracy[kind] = {name: float(np.nan_to_num(np.max(values), nan=np.inf))
+                                   for name, values in errors.items()}
+
+    def run(self, sections):
+        for section in sections:
+            getattr(self, f"run_{section}")()
+        return {"throughput": self.throughput, "accuracy": self.accuracy}
+
+
+def compare(results, baseline, threshold: float, tolerance: float):
+    """
+    Regressions against a baseline and the accuracy tolerance
+
+    Returns:
+        list: Human-readable failure messages, empty if the run passed
+    """
+    failures = []
+    for name, value in results["throughput"].items():
+        reference = baseline.get("throughput", {}).get(name)
+        if reference and value < reference * (1.0 - threshold):
+            failures.append(f"{name}: {value:,.0f}/s is {1.0 - value / reference:.0%} "
+                            f"below the baseline of {reference:,.0f}/s")
+    for kind, errors in results["accuracy"].items():
+        for name, value in errors.items():
+            if not value <= tolerance:
+                failures.append(f"{kind} {name}: {value:.4f}° exceeds {tolerance}°")
+    return failures
+
+
+def parse_epoch(text: str) -> float:
+    moment = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def main():
+    sections = ["solves", "motion", "config", "display", "accuracy"]
+    parser = argparse.ArgumentParser(description="Benchmark pointing throughput and accuracy")
+    parser.add_argument("--config", default="config", help="Configuration directory")
+    parser.add_argument("--epoch", default=DEFAULT_EPOCH, help="Epoch of the timed solves (ISO 8601, UTC)")
+    parser.add_argument("--sections", nargs="+", choices=sections, default=sections,
+                        help="Benchmark sections to run")
+    parser.add_argument("--min-seconds", type=float, default=0.3,
+                        help="Minimum duration of each timed batch")
+    parser.add_argument("--config-targets", type=int, default=20000,
+                        help="Targets generated for the ConfigManager lookups")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline file")
+    parser.add_argument("--references", default=str(DEFAULT_REFERENCES),
+                        help="Reference positions for the accuracy check")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed fractional throughput drop below the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Allowed pointing error against the references in degrees")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    benchmark = PointingBenchmark(args.config, parse_epoch(args.epoch), args.min_seconds,
+                                  args.config_targets, args.references)
+    results = benchmark.run(args.sections)
+    results.update({"epoch": args.epoch, "machine": platform.node(),
+                    "python": platform.python_version(), "timestamp": time.time()})
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+
+    print(f"{'benchmark':<40}{'per second':>16}{'baseline':>16}{'change':>9}")
+    for name, value in results["throughput"].items():
+        reference = baseline.get("throughput", {}).get(name)
+        if reference:
+            print(f"{name:<40}{value:>16,.0f}{reference:>16,.0f}{value / reference - 1.0:>+9.0%}")
+        else:
+            print(f"{name:<40}{value:>16,.0f}{'-':>16}")
+    if results["accuracy"]:
+        columns = sorted({name for errors in results["accuracy"].values() for name in errors})
+        print(f"\n{'max error °':<16}" + "".join(f"{name:>14}" for name in columns))
+        for kind, errors in results["accuracy"].items():
+            print(f"{kind:<16}" + "".join(f"{errors.get(name, float('nan')):>14.5f}" for name in columns))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    failures = compare(results, baseline, args.threshold, args.tolerance)
+    if not baseline:
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
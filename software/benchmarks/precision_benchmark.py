@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Precision benchmark: cost and error of each precision tier per target type
+
+For every target type and tier this measures single solves per second, a
+day of minutes solved in one batch call per second, and the largest
+angular error over a day against the observed direction: Skyfield's full
+apparent place with refraction for the configured temperature and
+pressure (Skyfield's own SGP4 for satellites, the WGS84 vector for Earth
+locations). Errors are checked every 30 seconds, so each rise and set is
+sampled within a fraction of a degree of the horizon, where refraction
+is largest. It then names the cheapest tier within ``--budget`` degrees
+for each type, which is what ``precision.tiers`` in settings.json should
+be set to on that device.
+
+Usage:
+    python software/benchmarks/precision_benchmark.py --budget 0.5
+"""
+
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.pointing_benchmark import (DEFAULT_EPOCH, REFERENCE_TLE, SAMPLE_TARGETS,
+                                           angular_separation, parse_epoch, rate)
+from positioning.astronomy import AstronomyCalculator, PLANET_SEGMENTS, PRECISION_TIERS
+from utils.config import ConfigManager
+
+
+class PrecisionBenchmark:
+    """Times and checks every tier against one reference per target type"""
+
+    def __init__(self, config_path: str, epoch: float, min_seconds: float = 0.3):
+        self.config = ConfigManager(config_path)
+        self.epoch = epoch
+        self.min_seconds = min_seconds
+        self.base = AstronomyCalculator.from_config(self.config)
+        self.base.satellites.find()
+        self.base.satellites.add_tle(*REFERENCE_TLE)
+
+    def calculator(self, tier: str) -> AstronomyCalculator:
+        """Calculator sharing the loaded data with every type at one tier"""
+        astronomy = self.base.for_location(self.base.latitude, self.base.longitude, self.base.altitude)
+        astronomy.precision = {kind: tier for kind in astronomy.precision}
+        return astronomy
+
+    def reference(self, target: Dict[str, Any], times: np.ndarray):
+        """Observed azimuth and elevation from the full Skyfield chain"""
+        from skyfield.api import EarthSatellite, Star, wgs84
+
+        astronomy = self.base
+        t = astronomy.to_time(times)
+        weather = {"temperature_C": astronomy.temperature_c, "pressure_mbar": astronomy.pressure_mbar}
+        kind = target["type"]
+        if kind == "planet":
+            body = astronomy.eph[PLANET_SEGMENTS[target["name"].lower()]]
+            alt, az, _ = astronomy.observer.at(t).observe(body).apparent().altaz(**weather)
+        elif kind in ("star", "deep_space"):
+            row = astronomy.catalog.find(target["name"])
+            star = Star(ra_hours=float(astronomy.catalog.ra[row]) / 15.0,
+                        dec_degrees=float(astronomy.catalog.dec[row]))
+            alt, az, _ = astronomy.observer.at(t).observe(star).apparent().altaz(**weather)
+        elif kind == "satellite":
+            satellite = EarthSatellite(REFERENCE_TLE[1], REFERENCE_TLE[2], REFERENCE_TLE[0], astronomy.ts)
+            alt, az, _ = (satellite - astronomy.topos).at(t).altaz(**weather)
+        else:
+            place = wgs84.latlon(target["latitude"], target["longitude"],
+                                 elevation_m=target.get("altitude", 0.0))
+            alt, az, _ = (place - astronomy.topos).at(t).altaz()
+        return az.degrees, alt.degrees
+
+    def solve_single(self, astronomy: AstronomyCalculator, target: Dict[str, Any], when: float):
+        if target["type"] == "earth_location":
+            return astronomy.calculate_earth_location_azimuth_elevation(
+                target["latitude"], target["longitude"], altitude=target.get("altitude", 0.0))
+        return astronomy.calculate_celestial_azimuth_elevation(target["name"], when,
+                                                               norad_id=target.get("norad_id"))
+
+    def run(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Returns:
+            dict: type -> tier -> single/batch rates and max error in degrees
+        """
+        day = self.epoch + np.arange(1440) * 60.0
+        checks = self.epoch + np.arange(0.0, 86400.0, 30.0)
+        results = {}
+        for target in SAMPLE_TARGETS:
+            reference_az, reference_el = self.reference(target, checks)
+            # Refraction is only defined above the horizon
+            visible = reference_el > 0.0
+            results[target["type"]] = {}
+            for tier in PRECISION_TIERS:
+                astronomy = self.calculator(tier)
+                az, el = astronomy.calculate_batch_azimuth_elevation([target], checks)
+                errors = angular_separation(az[0], el[0], reference_az, reference_el)[visible]
+                results[target["type"]][tier] = {
+                    "single_per_second": rate(lambda: self.solve_single(astronomy, target, self.epoch),
+                                              self.min_seconds),
+                    "batch_per_second": rate(
+                        lambda: astronomy.calculate_batch_azimuth_elevation([target], day),
+                        self.min_seconds) * len(day),
+                    "max_error_deg": float(np.nan_to_num(np.max(errors, initial=0.0), nan=np.inf)),
+                }
+        return results
+
+
+def cheapest_tiers(results, budget: float) -> Dict[str, str]:
+    """Cheapest tier of each type within the error budget (None if none is)"""
+    # PRECISION_TIERS is ordered cheapest first
+    return {kind: next((tier for tier in PRECISION_TIERS if tiers[tier]["max_error_deg"] <= budget), None)
+            for kind, tiers in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the precision tiers")
+    parser.add_argument("--config", default="config", help="Configuration directory")
+    parser.add_argument("--epoch", default=DEFAULT_EPOCH, help="Reference epoch (ISO 8601, UTC)")
+    parser.add_argument("--budget", type=float, default=0.5,
+                        help="Pointing error budget in degrees")
+    parser.add_argument("--min-seconds", type=float, default=0.3,
+                        help="Minimum duration of each timed batch")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    results = PrecisionBenchmark(args.config, parse_epoch(args.epoch), args.min_seconds).run()
+    choice = cheapest_tiers(results, args.budget)
+
+    print(f"{'type':<16}{'tier':<22}{'single/s':>12}{'batch/s':>14}{'max error °':>14}")
+    for kind, tiers in results.items():
+        for tier, values in tiers.items():
+            marker = "  <-" if choice[kind] == tier else ""
+            print(f"{kind:<16}{tier:<22}{values['single_per_second']:>12,.0f}"
+                  f"{values['batch_per_second']:>14,.0f}{values['max_error_deg']:>14.4f}{marker}")
+    print(f"\nCheapest tiers within {args.budget}°:")
+    print(json.dumps({"tiers": choice}, indent=2))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"budget": args.budget, "results": results, "tiers": choice}, f, indent=2)
+    return 0 if all(choice.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
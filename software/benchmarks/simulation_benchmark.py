@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Simulation benchmark: run the control loop over a simulated day
+
+AnywharrowController runs on a simulated clock with a simulated servo,
+IMU and headless display, so a day of target rotation takes seconds to
+minutes. For every target type it reports solve latency, pointing error
+(on arrival and while tracking), motion time and CPU time. Solve latency
+and CPU time are real; motion time and pointing error are in simulated
+time. Ephemeris files must already be cached in the configured data
+directory.
+
+Usage:
+    python software/benchmarks/simulation_benchmark.py --hours 24 --json results.json
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import AnywharrowController
+from hardware.framebuffer import HeadlessBackend
+from simulation.backends import SimulatedServo, SimulatedIMU
+from utils.clock import SimulatedClock
+
+
+def angular_separation(az1, el1, az2, el2) -> float:
+    """Great-circle angle between two directions, all in degrees"""
+    az1, el1, az2, el2 = np.radians([az1, el1, az2, el2])
+    cosine = np.sin(el1) * np.sin(el2) + np.cos(el1) * np.cos(el2) * np.cos(az1 - az2)
+    return float(np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0))))
+
+
+class SimulationRun:
+    """One simulated run of the sequential control loop"""
+
+    def __init__(self, config_path: str, start: float, seed: int = 0,
+                 servo_rate_dps: float = 300.0, servo_latency: float = 0.02,
+                 backlash_degrees: float = 0.2, tilt: float = 0.5):
+        self.clock = SimulatedClock(start)
+        self.servo = SimulatedServo(self.clock, servo_rate_dps, servo_latency, backlash_degrees)
+        self.imu_device = SimulatedIMU(roll=tilt, pitch=-tilt, seed=seed)
+        self.display = HeadlessBackend()
+        self.controller = AnywharrowController(
+            config_path, clock=self.clock, servo=self.servo,
+            display_backend=self.display, imu_device=self.imu_device)
+        self.results = defaultdict(lambda: defaultdict(list))
+
+    def true_position(self, target):
+        """Uncached position of a target at the current simulated time"""
+        azimuth, elevation = self.controller.astronomy.calculate_batch_azimuth_elevation(
+            [target], [self.clock.time()])
+        return float(azimuth[0, 0]), float(elevation[0, 0])
+
+    def pointing_error(self, target) -> float:
+        return angular_separation(*self.servo.get_position(), *self.true_position(target))
+
+    def run(self, duration: float, interval: Optional[float] = None, track_samples: int = 4):
+        """
+        Rotate through the targets for ``duration`` simulated seconds
+
+        Args:
+            duration: Simulated seconds to run
+            interval: Dwell per target in simulated seconds (default: the
+                target's own dwell time)
+            track_samples: Pointing error samples taken during each dwell
+        """
+        controller = self.controller
+        controller.gimbal.initialize()
+        controller.display.initialize()
+        end = self.clock.monotonic() + duration
+
+        while self.clock.monotonic() < end:
+            target = controller.get_next_target()
+            stats = self.results[target["type"]]
+            cpu_start = time.process_time()
+
+            solve_start = time.perf_counter()
+            azimuth, elevation = controller.calculate_target_position(target, self.clock.time())
+            stats["solve_ms"].append((time.perf_counter() - solve_start) * 1000.0)
+            if azimuth is None or elevation is None:
+                stats["failures"].append(1)
+                self.clock.sleep(5)
+                continue
+
+            move_start = self.clock.monotonic()
+            controller.gimbal.move_to_position(azimuth, elevation, wait=True)
+            stats["motion_s"].append(self.clock.monotonic() - move_start)
+            stats["arrival_error_deg"].append(self.pointing_error(target))
+            controller.display.show_target(target["name"], target.get("description", ""))
+
+            # Dwell in slices so tracking error can be sampled along the way
+            dwell = interval or controller.dwell_time(target)
+            for _ in range(track_samples):
+                controller.dwell(target, dwell / track_samples)
+                controller.imu.poll(self.clock.monotonic())
+                stats["tracking_error_deg"].append(self.pointing_error(target))
+
+            stats["cpu_ms"].append((time.process_time() - cpu_start) * 1000.0)
+
+        return self.summary()
+
+    def summary(self):
+        """Per-type statistics of the run"""
+        summary = {}
+        for kind, stats in sorted(self.results.items()):
+            row = {"targets": len(stats["solve_ms"]), "failures": len(stats["failures"])}
+            for name in ["solve_ms", "motion_s", "arrival_error_deg", "tracking_error_deg", "cpu_ms"]:
+                values = np.array(stats[name])
+                if len(values):
+                    row[name] = {"mean": float(values.mean()),
+                                 "p95": float(np.percentile(values, 95)),
+                                 "max": float(values.max())}
+            summary[kind] = row
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the controller over a simulated day")
+    parser.add_argument("--config", default="config", help="Configuration directory")
+    parser.add_argument("--hours", type=float, default=24.0, help="Simulated hours to run")
+    parser.add_argument("--start", type=float, default=None,
+                        help="Simulated start as a Unix timestamp (default: now)")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="Dwell per target in seconds (default: from settings)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for sensor noise")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    simulation = SimulationRun(args.config, time.time() if args.start is None else args.start,
+                               seed=args.seed)
+    wall_start = time.perf_counter()
+    summary = simulation.run(args.hours * 3600.0, args.interval)
+    wall = time.perf_counter() - wall_start
+
+    print(f"Simulated {args.hours:.1f} h in {wall:.1f} s ({args.hours * 3600.0 / wall:.0f}x real time)")
+    print(f"{'type':<16}{'targets':>8}{'solve ms':>10}{'p95':>8}{'motion s':>10}"
+          f"{'arrive °':>10}{'track °':>10}{'track max':>10}{'cpu ms':>9}")
+    for kind, row in summary.items():
+        def mean(name, key="mean"):
+            return row[name][key] if name in row else float("nan")
+        print(f"{kind:<16}{row['targets']:>8}{mean('solve_ms'):>10.3f}{mean('solve_ms', 'p95'):>8.3f}"
+              f"{mean('motion_s'):>10.2f}{mean('arrival_error_deg'):>10.3f}"
+              f"{mean('tracking_error_deg'):>10.3f}{mean('tracking_error_deg', 'max'):>10.3f}"
+              f"{mean('cpu_ms'):>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"hours": args.hours, "wall_seconds": wall, "types": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time from a cold interpreter to the first pointing
+
+Each run starts a fresh Python process that imports the control program,
+builds AnywharrowController, solves the first target and commands the
+gimbal there. Ephemeris files must already be cached in the configured
+data directory, otherwise the first run measures a download.
+
+Usage:
+    python software/benchmarks/startup_benchmark.py --runs 5 --budget 1.0
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+SOFTWARE_DIR = Path(__file__).resolve().parent.parent
+
+# Executed in the child process; reports a per-stage breakdown as JSON
+CHILD_SCRIPT = """
+import sys, time, json, logging
+start = time.perf_counter()
+sys.path.insert(0, {software_dir!r})
+import main
+logging.disable(logging.CRITICAL)
+imported = time.perf_counter()
+controller = main.AnywharrowController({config_path!r})
+constructed = time.perf_counter()
+target = controller.get_next_target()
+azimuth, elevation = controller.calculate_target_position(target)
+solved = time.perf_counter()
+controller.gimbal.move_to_position(azimuth or 0.0, elevation or 0.0, smooth=False)
+pointed = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "construct": constructed - imported,
+    "first_solve": solved - constructed,
+    "first_pointing": pointed - start,
+    "target": target["name"],
+    "solved": azimuth is not None,
+}}))
+"""
+
+
+def run_once(config_path: str) -> dict:
+    """Run one cold start in a fresh interpreter and return its timings"""
+    script = CHILD_SCRIPT.format(software_dir=str(SOFTWARE_DIR), config_path=config_path)
+    wall_start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    wall = time.perf_counter() - wall_start
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup run failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_wall"] = wall
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start to first pointing")
+    parser.add_argument("--config", default="config", help="Configuration directory")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="Maximum median seconds to first pointing")
+    args = parser.parse_args()
+
+    runs = [run_once(args.config) for _ in range(args.runs)]
+    if not all(run["solved"] for run in runs):
+        print("Warning: first target could not be solved (is the ephemeris cached?)")
+
+    print(f"Cold start to first pointing over {args.runs} runs (target: {runs[0]['target']})")
+    for stage in ["import", "construct", "first_solve", "first_pointing", "process_wall"]:
+        values = [run[stage] for run in runs]
+        print(f"  {stage:<15} median {statistics.median(values) * 1000:8.1f} ms"
+              f"   max {max(values) * 1000:8.1f} ms")
+
+    median_wall = statistics.median(run["process_wall"] for run in runs)
+    if median_wall > args.budget:
+        print(f"FAIL: median {median_wall:.3f}s exceeds budget {args.budget:.3f}s")
+        sys.exit(1)
+    print(f"OK: median {median_wall:.3f}s within budget {args.budget:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Thin fleet device: drives the servos from a fleet server's pointing stream
+
+Runs without the ephemeris, TLEs, star catalog or any astronomy code, so it
+fits on boards too small to solve the sky themselves. The device's own
+settings.json still supplies its location (sent to the server), motion
+limits, pointing model and display.
+
+Usage:
+    python software/fleet/client.py --config config --server 192.168.1.10:9200
+"""
+
+import sys
+import math
+import socket
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fleet.protocol import Address, DEFAULT_PORT, encode, decode, parse_address
+from kinematics.gimbal_control import GimbalController
+from kinematics.trajectory import TrajectoryPlanner
+from kinematics.calibration import PointingModel
+from hardware.display import DisplayController
+from hardware.servo_output import PCA9685Output
+from hardware.i2c_bus import I2CBusManager, SERVO_PRIORITY, DISPLAY_PRIORITY
+from utils.config import ConfigManager
+from utils.clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+
+class PointingSegment:
+    """Positions of one target visit, sampled at a fixed step"""
+
+    def __init__(self, target: Dict[str, Any], start: float, step: float, dwell: float,
+                 azimuth, elevation):
+        self.target = target
+        self.start = start
+        self.step = step
+        self.dwell = dwell
+        # Unwrapped so interpolation never runs the long way round through 0°
+        self.azimuth = np.unwrap(np.asarray(azimuth, dtype=float), period=360.0)
+        self.elevation = np.asarray(elevation, dtype=float)
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> "PointingSegment":
+        return cls(message["target"], message["start"], message["step"], message["dwell"],
+                   message["azimuth"], message["elevation"])
+
+    @property
+    def end(self) -> float:
+        return self.start + self.step * (len(self.azimuth) - 1)
+
+    def motion(self, when: float) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Interpolated position and rates at a time
+
+        Returns:
+            tuple: (azimuth, elevation, azimuth_rate, elevation_rate) in
+                degrees and degrees per second, or None outside the segment
+        """
+        if not self.start <= when <= self.end:
+            return None
+        x = (when - self.start) / self.step
+        i = min(int(x), len(self.azimuth) - 2)
+        fraction = x - i
+        azimuth_rate = (self.azimuth[i + 1] - self.azimuth[i]) / self.step
+        elevation_rate = (self.elevation[i + 1] - self.elevation[i]) / self.step
+        azimuth = (self.azimuth[i] + azimuth_rate * fraction * self.step) % 360.0
+        elevation = self.elevation[i] + elevation_rate * fraction * self.step
+        return float(azimuth), float(elevation), float(azimuth_rate), float(elevation_rate)
+
+
+class FleetClient:
+    """Blocking connection to a fleet server"""
+
+    def __init__(self, address: Address, device: Dict[str, Any], timeout: float = 30.0):
+        self.address = address
+        self.device = device
+        self.timeout = timeout
+        self._socket: Optional[socket.socket] = None
+        self._reader = None
+
+    def connect(self):
+        """Connect and introduce the device"""
+        self.close()
+        if isinstance(self.address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(self.timeout)
+            self._socket.connect(self.address)
+        else:
+            self._socket = socket.create_connection(self.address, self.timeout)
+        self._reader = self._socket.makefile('rb')
+        reply = self._request({"op": "hello", **self.device})
+        logger.info(f"Connected to fleet server as {reply.get('device')} "
+                    f"({reply.get('targets')} targets)")
+
+    def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        self._socket.sendall(encode(message))
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Fleet server closed the connection")
+        reply = decode(line)
+        if reply["op"] == "error":
+            raise RuntimeError(f"Fleet server error: {reply.get('message')}")
+        return reply
+
+    def next_segment(self, when: float, azimuth: float,
+                     elevation: float) -> Tuple[Optional[PointingSegment], float]:
+        """
+        Ask for the next target visit
+
+        Args:
+            when: Current Unix time
+            azimuth: Current azimuth in degrees
+            elevation: Current elevation in degrees
+
+        Returns:
+            tuple: (segment, retry_seconds); the segment is None when the
+                server has nothing observable
+        """
+        if self._socket is None:
+            self.connect()
+        reply = self._request({"op": "next", "when": when,
+                               "azimuth": azimuth, "elevation": elevation})
+        if reply["op"] == "idle":
+            return None, float(reply.get("retry_seconds", 5.0))
+        return PointingSegment.from_message(reply), 0.0
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class FleetDeviceController:
+    """Control loop of a thin device fed by a fleet server"""
+
+    def __init__(self, config_path="config", server: Optional[str] = None, clock=None,
+                 servo=None, display_backend=None):
+        self.config = ConfigManager(config_path)
+        self.clock = clock or SystemClock()
+        self.i2c_bus = I2CBusManager.from_config(self.config)
+        self.gimbal = GimbalController(
+            TrajectoryPlanner.from_config(self.config),
+            streaming=(self.config.get_nested_setting("motion", "streaming", default=True)
+                       and not self.clock.simulated),
+            pointing_model=PointingModel.from_config(self.config),
+            servo=servo,
+            clock=self.clock,
+            output=None if servo is not None else PCA9685Output.from_config(
+                self.config, self.i2c_bus and self.i2c_bus.device("servo", SERVO_PRIORITY)),
+        )
+        self.display = DisplayController(
+            width=self.config.get_nested_setting("display", "width", default=128),
+            height=self.config.get_nested_setting("display", "height", default=64),
+            address=int(self.config.get_nested_setting("hardware", "display_i2c_address", default="0x3c"), 16),
+            backend=display_backend,
+            i2c=self.i2c_bus and self.i2c_bus.device("display", DISPLAY_PRIORITY, background=True,
+                                                     coalesce=(0x00, 0x40)),
+        )
+
+        address = parse_address(
+            server or self.config.get_nested_setting("fleet", "server", default="127.0.0.1"),
+            self.config.get_nested_setting("fleet", "port", default=DEFAULT_PORT))
+        self.client = FleetClient(address, {
+            "device": self.config.get_nested_setting("device", "name", default=socket.gethostname()),
+            "location": self.config.get_nested_setting("device", "location", default={}),
+        })
+        self.reconnect_seconds = self.config.get_nested_setting("fleet", "reconnect_seconds", default=5.0)
+
+        self.tracking_step = self.config.get_nested_setting("tracking", "step_degrees", default=0.1)
+        self.tracking_min_rate = self.config.get_nested_setting("tracking", "min_rate_hz", default=0.05)
+        self.tracking_max_rate = self.config.get_nested_setting("tracking", "max_rate_hz", default=20.0)
+        self.tracking_latency = self.config.get_nested_setting("tracking", "latency_seconds", default=0.1)
+        self.tracking_max_jump = self.config.get_nested_setting("tracking", "max_jump_degrees", default=1.0)
+
+    def visit(self, segment: PointingSegment):
+        """Point at a segment's target and track it for the dwell"""
+        target = segment.target
+        motion = segment.motion(self.clock.time())
+        if motion is None:
+            logger.warning(f"Segment for {target['name']} arrived too late")
+            return
+        logger.info(f"Moving to {target['name']}: Az={motion[0]:.1f}°, El={motion[1]:.1f}°")
+        self.gimbal.move_to_position(motion[0], motion[1], wait=True)
+        self.display.show_target(target["name"], target.get("description") or "")
+
+        end = self.clock.monotonic() + segment.dwell
+        while True:
+            remaining = end - self.clock.monotonic()
+            if remaining <= 0:
+                break
+            motion = segment.motion(self.clock.time() + self.tracking_latency)
+            if motion is None:
+                break
+            azimuth, elevation, azimuth_rate, elevation_rate = motion
+            speed = math.hypot(azimuth_rate * math.cos(math.radians(elevation)), elevation_rate)
+            period = 1.0 / min(self.tracking_max_rate,
+                               max(self.tracking_min_rate, speed / self.tracking_step))
+            if self.gimbal.distance_to(azimuth, elevation) > self.tracking_max_jump:
+                self.gimbal.move_to_position(azimuth, elevation, wait=True)
+            else:
+                self.gimbal.follow(azimuth, elevation, azimuth_rate, elevation_rate, period)
+            self.clock.sleep(min(period, remaining))
+
+    def step(self) -> bool:
+        """
+        Fetch and run one visit
+
+        Returns:
+            bool: Whether a target was visited
+        """
+        try:
+            segment, retry = self.client.next_segment(
+                self.clock.time(), *self.gimbal.get_current_position())
+        except (OSError, ConnectionError, RuntimeError, ValueError) as e:
+            logger.error(f"Fleet server unavailable: {e}")
+            self.client.close()
+            self.clock.sleep(self.reconnect_seconds)
+            return False
+        if segment is None:
+            self.clock.sleep(retry)
+            return False
+        self.visit(segment)
+        return True
+
+    def run(self):
+        """Main control loop"""
+        logger.info("Starting anywharrow fleet device...")
+        if self.i2c_bus is not None:
+            self.i2c_bus.start()
+        if not (self.gimbal.initialize() and self.display.initialize()):
+            logger.error("Failed to initialize hardware. Exiting.")
+            return
+        try:
+            while True:
+                self.step()
+        except KeyboardInterrupt:
+            logger.info("Shutting down anywharrow...")
+        self.cleanup()
+
+    def cleanup(self):
+        self.client.close()
+        self.config.close()
+        self.gimbal.cleanup()
+        self.display.cleanup()
+        if self.i2c_bus is not None:
+            self.i2c_bus.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="anywharrow fleet device")
+    parser.add_argument("--config", default="config", help="Configuration directory")
+    parser.add_argument("--server", default=None,
+                        help="Fleet server as host:port or unix:/path (default: from settings)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    FleetDeviceController(args.config, args.server).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Wire format shared by the fleet server and its device clients
+
+Messages are JSON objects, one per line, over TCP or a Unix domain socket.
+A device opens with ``hello`` and then asks for one ``next`` segment at a
+time; the server answers each request with exactly one message:
+
+    -> {"op": "hello", "device": "arrow-3", "location": {"latitude": ..., ...}}
+    <- {"op": "welcome", "device": "arrow-3", "targets": 8}
+    -> {"op": "next", "when": 1735689600.0, "azimuth": 120.0, "elevation": 30.0}
+    <- {"op": "segment", "target": {...}, "start": ..., "step": 1.0,
+        "dwell": 60.0, "azimuth": [...], "elevation": [...]}
+    <- {"op": "idle", "retry_seconds": 5.0}
+    <- {"op": "error", "message": "..."}
+
+Segment positions are sky azimuth/elevation in degrees for the device's
+own location, sampled every ``step`` seconds from ``start`` (Unix time).
+Each device applies its own pointing model on top.
+"""
+
+import json
+from typing import Any, Dict, Tuple, Union
+
+DEFAULT_PORT = 9200
+
+# Positions are sent rounded to well below servo resolution
+DECIMALS = 4
+
+# (host, port) for TCP, or a filesystem path for a Unix domain socket
+Address = Union[Tuple[str, int], str]
+
+
+def parse_address(text: str, default_port: int = DEFAULT_PORT) -> Address:
+    """
+    Parse ``host:port``, ``host`` or ``unix:/path/to/socket``
+
+    Returns:
+        Address: (host, port) tuple or a Unix socket path
+    """
+    if text.startswith("unix:"):
+        return text[len("unix:"):]
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, default_port
+    return host, int(port)
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def decode(line: bytes) -> Dict[str, Any]:
+    message = json.loads(line)
+    if not isinstance(message, dict) or "op" not in message:
+        raise ValueError("Malformed fleet message")
+    return message
@@ -0,0 +1,272 @@
+"""
+Fleet server: one ephemeris and scheduling engine for many devices
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from positioning.astronomy import AstronomyCalculator
+from kinematics.trajectory import TrajectoryPlanner
+from planning.scheduler import TargetScheduler
+from fleet.protocol import DEFAULT_PORT, DECIMALS, encode, decode
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceSession:
+    """Scheduling state of one connected device"""
+
+    def __init__(self, name: str, astronomy: AstronomyCalculator,
+                 targets: List[Dict[str, Any]], scheduler: Optional[TargetScheduler],
+                 location: Optional[Tuple[float, float, float]] = None):
+        self.name = name
+        self.astronomy = astronomy
+        self.location = location
+        self.targets = targets
+        self.scheduler = scheduler
+        self.cursor = 0
+        self.segments = 0
+
+    def next_target(self, when: float, azimuth: float, elevation: float) -> Dict[str, Any]:
+        """Next target from the device's schedule, round robin if nothing is planned"""
+        if self.scheduler is not None:
+            target = self.scheduler.next_target(when, azimuth, elevation)
+            if target is not None:
+                return target
+        target = self.targets[self.cursor]
+        self.cursor = (self.cursor + 1) % len(self.targets)
+        return target
+
+
+class FleetServer:
+    """
+    Solves the sky once per building and streams pointing to thin devices
+
+    The server holds the only ephemeris kernel, timescale, TLE set and star
+    catalog. Each connecting device sends its location; the server derives
+    a calculator for it that shares all of that data
+    (``AstronomyCalculator.for_location``). Visibility depends on where a
+    device is, so the scheduling plan is solved once per location, rounded
+    to ``location_decimals`` degrees, and shared by the devices there; each
+    device keeps only its own queue (``TargetScheduler.share``). When a
+    device asks for
+    its next target the server solves the whole visit in one batch call and
+    replies with a segment of positions at ``step_seconds`` intervals, which
+    the device interpolates while it tracks. Devices never load ephemeris
+    data or run astronomy code.
+
+    Solving runs on a single worker thread, so Skyfield objects are never
+    used concurrently; the event loop only moves bytes.
+    """
+
+    def __init__(self, config, astronomy: Optional[AstronomyCalculator] = None,
+                 host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 unix_socket: Optional[str] = None, step_seconds: float = 1.0,
+                 lead_seconds: float = 30.0, location_decimals: int = 3):
+        self.config = config
+        self.astronomy = astronomy or AstronomyCalculator.from_config(config)
+        self.planner = TrajectoryPlanner.from_config(config)
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.step = step_seconds
+        self.lead = lead_seconds
+        self.location_decimals = location_decimals
+
+        self.sessions: Dict[str, DeviceSession] = {}
+        self.schedulers: Dict[Tuple[float, float, float], TargetScheduler] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fleet-solver")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @classmethod
+    def from_config(cls, config) -> "FleetServer":
+        """Create a server from the ``fleet`` section of settings.json"""
+        return cls(
+            config,
+            host=config.get_nested_setting("fleet", "host", default="127.0.0.1"),
+            port=config.get_nested_setting("fleet", "port", default=DEFAULT_PORT),
+            unix_socket=config.get_nested_setting("fleet", "unix_socket", default=None),
+            step_seconds=config.get_nested_setting("fleet", "step_seconds", default=1.0),
+            lead_seconds=config.get_nested_setting("fleet", "lead_seconds", default=30.0),
+            location_decimals=config.get_nested_setting("fleet", "location_decimals", default=3),
+        )
+
+    def location_key(self, latitude: float, longitude: float, altitude: float) -> Tuple[float, float, float]:
+        """
+        Location that devices share a scheduling plan at
+
+        The default of 3 decimals (about 110 m) moves even a low satellite by
+        well under the tracking step, so devices in one building share a plan.
+        """
+        return (round(latitude, self.location_decimals), round(longitude, self.location_decimals),
+                round(altitude, -1))
+
+    def scheduler_for(self, key: Tuple[float, float, float],
+                      targets: List[Dict[str, Any]]) -> TargetScheduler:
+        """Scheduler for a new device at a location, sharing the plan of devices already there"""
+        shared = self.schedulers.get(key)
+        if shared is None:
+            astronomy = self.astronomy.for_location(*key)
+            shared = TargetScheduler.from_config(astronomy, self.planner, self.config, targets)
+            self.schedulers[key] = shared
+            logger.info(f"New scheduling plan for location {key}")
+        return shared.share()
+
+    def register(self, hello: Dict[str, Any]) -> DeviceSession:
+        """Create (or replace) the session of a device from its hello message"""
+        name = str(hello.get("device") or f"device-{len(self.sessions) + 1}")
+        location = hello.get("location", {})
+        astronomy = self.astronomy.for_location(
+            float(location.get("latitude", 0.0)), float(location.get("longitude", 0.0)),
+            float(location.get("altitude", 0.0)))
+
+        key = self.location_key(astronomy.latitude, astronomy.longitude, astronomy.altitude)
+
+        targets = self.config.get_targets()
+        scheduler = None
+        max_scheduled = self.config.get_nested_setting("scheduling", "max_targets", default=2000)
+        if (len(targets) <= max_scheduled
+                and self.config.get_nested_setting("scheduling", "enabled", default=True)):
+            scheduler = self.scheduler_for(key, targets)
+            targets = scheduler.targets
+
+        previous = self.sessions.get(name)
+        session = DeviceSession(name, astronomy, targets, scheduler, key)
+        self.sessions[name] = session
+        if previous is not None:
+            self._release(previous)
+        metrics.set_gauge("fleet_devices", len(self.sessions))
+        logger.info(f"Device {name} registered at {location}")
+        return session
+
+    def unregister(self, session: DeviceSession):
+        """Drop the session of a device that disconnected, unless it was replaced"""
+        if self.sessions.get(session.name) is session:
+            del self.sessions[session.name]
+            metrics.set_gauge("fleet_devices", len(self.sessions))
+            logger.info(f"Device {session.name} disconnected")
+            self._release(session)
+
+    def _release(self, session: DeviceSession):
+        """Forget the plan at a session's location once no device uses it"""
+        if not any(other.location == session.location for other in self.sessions.values()):
+            self.schedulers.pop(session.location, None)
+
+    def dwell_time(self, target: Dict[str, Any]) -> float:
+        """Seconds a device stays on a target"""
+        interval = self.config.get_nested_setting("behavior", "update_interval_seconds", default=60)
+        return float(target.get("dwell_seconds", interval))
+
+    def next_segment(self, session: DeviceSession, when: float, azimuth: float,
+                     elevation: float) -> Dict[str, Any]:
+        """
+        Solve the next visit of a device
+
+        Targets that cannot be solved over the visit are skipped; after a
+        full round of failures the device is told to retry later.
+
+        Returns:
+            dict: A ``segment`` or ``idle`` message
+        """
+        with metrics.timer("fleet_segment"):
+            for _ in range(len(session.targets)):
+                target = session.next_target(when, azimuth, elevation)
+                dwell = self.dwell_time(target)
+                times = when + np.arange(0.0, dwell + self.lead + self.step, self.step)
+                az, el = session.astronomy.calculate_batch_azimuth_elevation([target], times)
+                if np.isnan(az[0]).any() or np.isnan(el[0]).any():
+                    logger.warning(f"Could not solve {target['name']} for {session.name}")
+                    continue
+
+                session.segments += 1
+                metrics.increment("fleet_segments", device=session.name)
+                return {
+                    "op": "segment",
+                    "target": {key: target.get(key) for key in ("name", "type", "description")},
+                    "start": when,
+                    "step": self.step,
+                    "dwell": dwell,
+                    "azimuth": np.round(az[0], DECIMALS).tolist(),
+                    "elevation": np.round(el[0], DECIMALS).tolist(),
+                }
+        return {"op": "idle", "retry_seconds": 5.0}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = decode(line)
+                    if request["op"] == "hello":
+                        session = await loop.run_in_executor(self.executor, self.register, request)
+                        reply = {"op": "welcome", "device": session.name,
+                                 "targets": len(session.targets)}
+                    elif session is None:
+                        reply = {"op": "error", "message": "hello required"}
+                    elif request["op"] == "next":
+                        reply = await loop.run_in_executor(
+                            self.executor, self.next_segment, session, float(request["when"]),
+                            float(request.get("azimuth", 0.0)), float(request.get("elevation", 0.0)))
+                    else:
+                        reply = {"op": "error", "message": f"unknown op {request['op']!r}"}
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"op": "error", "message": str(e)}
+                writer.write(encode(reply))
+                await writer.drain()
+        except ConnectionError as e:
+            logger.warning(f"Connection lost: {e}")
+        finally:
+            if session is not None:
+                await loop.run_in_executor(self.executor, self.unregister, session)
+            writer.close()
+
+    async def start(self):
+        """Start listening; returns once the socket is bound"""
+        if self.unix_socket:
+            if os.path.exists(self.unix_socket):
+                os.unlink(self.unix_socket)
+            self._server = await asyncio.start_unix_server(self._handle, self.unix_socket)
+            logger.info(f"Fleet server listening on {self.unix_socket}")
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            logger.info(f"Fleet server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def run(self):
+        """Serve until interrupted"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            logger.info("Shutting down fleet server...")
+        self.executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-device serving statistics"""
+        return {
+            "devices": len(self.sessions),
+            "locations": len(self.schedulers),
+            "segments": {name: session.segments for name, session in self.sessions.items()},
+        }
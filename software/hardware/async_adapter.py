@@ -0,0 +1,50 @@
+"""
+Asyncio adapter for blocking hardware controllers
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDevice:
+    """
+    Exposes a blocking controller's methods as coroutines
+
+    Every method of the wrapped controller keeps its name and arguments but
+    returns an awaitable that runs the call on the device's own
+    single-thread executor. Calls to one device are therefore serialized, as
+    the driver expects, while different devices never block each other or
+    the event loop. Plain attributes are passed through unchanged.
+    """
+
+    def __init__(self, device: Any, executor: Optional[ThreadPoolExecutor] = None):
+        self._device = device
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=type(device).__name__)
+
+    @property
+    def device(self) -> Any:
+        """The wrapped blocking controller"""
+        return self._device
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._device, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(attribute, *args, **kwargs))
+
+        return call
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the device's executor"""
+        self._executor.shutdown(wait=wait)
@@ -3,33 +3,74 @@ LED display controller for showing target information
 """
 
 import logging
+import textwrap
 from typing import Optional
 
+from hardware.framebuffer import FrameRenderer, HeadlessBackend, SSD1306Backend
+from utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
+# Line layout: target name on the first page, description from the third
+NAME_PAGE = 0
+DESCRIPTION_PAGE = 2
+
 class DisplayController:
     """Controls the LED display for showing target information"""
     
-    def __init__(self):
-        self.display = None
+    def __init__(self, width: int = 128, height: int = 64, address: int = 0x3C,
+                 backend=None, scroll_step: int = 2, i2c=None):
+        self.display = backend
+        # Bus to open the panel on, e.g. a shared-bus BusDevice
+        self.i2c = i2c
+        self.width = width
+        self.height = height
+        self.address = address
+        self.scroll_step = scroll_step
+        self.renderer: Optional[FrameRenderer] = None
         self.current_text = ""
-        
+        self.current_name = ""
+        self.scroll_offset = 0
+    
     def initialize(self):
         """Initialize the display"""
         try:
             logger.info("Initializing display...")
-            # Initialize display hardware (placeholder)
-            # self.display = SSD1306_I2C(128, 64, I2C(0))
+            if self.display is None:
+                self.display = self._open_hardware()
+            self.display.initialize()
+            self.renderer = FrameRenderer(self.display, self.width, self.height)
+            self.renderer.flush()
             logger.info("Display initialized")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize display: {e}")
             return False
     
+    def _open_hardware(self):
+        """Open the SSD1306 on the I2C bus, or fall back to a headless display"""
+        if self.i2c is not None:
+            return SSD1306Backend(self.i2c, self.address, self.width, self.height)
+        
+        try:
+            import board
+            import busio
+        except ImportError:
+            logger.warning("No I2C support available, using headless display")
+            return HeadlessBackend(self.width, self.height)
+        
+        i2c = busio.I2C(board.SCL, board.SDA)
+        while not i2c.try_lock():
+            pass
+        return SSD1306Backend(i2c, self.address, self.width, self.height)
+    
     def show_target(self, name: str, description: str = ""):
         """
         Display target information on the screen
         
+        Only the lines that changed since the last update are sent to the
+        panel. Names too long for one line scroll with ``scroll``.
+        
         Args:
             name: Target name to display
             description: Optional description
@@ -40,16 +81,43 @@ class DisplayController:
             
             logger.info(f"Displaying: {display_text}")
             
-            # Update display (placeholder)
-            # self.display.fill(0)  # Clear screen
-            # self.display.text(display_text, 0, 0, 1)
-            # self.display.show()
+            if self.renderer is not None:
+                renderer = self.renderer
+                if name != self.current_name:
+                    self.scroll_offset = 0
+                renderer.draw_text(NAME_PAGE, name, scroll=self.scroll_offset)
+                
+                lines = textwrap.wrap(description, renderer.columns_per_line)
+                for offset, page in enumerate(range(DESCRIPTION_PAGE, renderer.pages)):
+                    renderer.draw_text(page, lines[offset] if offset < len(lines) else "")
+                with metrics.timer("display_flush"):
+                    metrics.increment("display_bytes", renderer.flush())
             
             self.current_text = display_text
-            
+            self.current_name = name
+        
         except Exception as e:
             logger.error(f"Failed to update display: {e}")
     
+    def scroll(self) -> bool:
+        """
+        Advance a scrolling target name by one step
+        
+        Returns:
+            bool: Whether the name is long enough to scroll
+        """
+        if self.renderer is None or not self.renderer.needs_scroll(self.current_name):
+            return False
+        try:
+            self.scroll_offset += self.scroll_step
+            self.renderer.draw_text(NAME_PAGE, self.current_name, scroll=self.scroll_offset)
+            with metrics.timer("display_flush"):
+                metrics.increment("display_bytes", self.renderer.flush())
+            return True
+        except Exception as e:
+            logger.error(f"Failed to scroll display: {e}")
+            return False
+    
     def show_status(self, status: str):
         """Display system status"""
         self.show_target("Status", status)
@@ -57,9 +125,11 @@ class DisplayController:
     def clear(self):
         """Clear the display"""
         try:
-            # self.display.fill(0)
-            # self.display.show()
+            if self.renderer is not None:
+                self.renderer.clear()
+                self.renderer.flush()
             self.current_text = ""
+            self.current_name = ""
             logger.info("Display cleared")
         except Exception as e:
             logger.error(f"Failed to clear display: {e}")
@@ -0,0 +1,334 @@
+"""
+1-bit framebuffer rendering with partial SSD1306 updates
+"""
+
+import struct
+import zlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Character cell: 5 glyph columns plus 1 column of spacing, one page high
+GLYPH_WIDTH = 6
+PAGE_HEIGHT = 8
+
+# Classic 5x7 font, one byte per column with the top row in bit 0. This is
+# the SSD1306 page layout, so a rasterized glyph is copied straight into a
+# page without any bit shuffling.
+FONT_5X7 = {
+    ' ': (0x00, 0x00, 0x00, 0x00, 0x00), '!': (0x00, 0x00, 0x5F, 0x00, 0x00),
+    '"': (0x00, 0x07, 0x00, 0x07, 0x00), '#': (0x14, 0x7F, 0x14, 0x7F, 0x14),
+    '$': (0x24, 0x2A, 0x7F, 0x2A, 0x12), '%': (0x23, 0x13, 0x08, 0x64, 0x62),
+    '&': (0x36, 0x49, 0x56, 0x20, 0x50), "'": (0x00, 0x08, 0x07, 0x03, 0x00),
+    '(': (0x00, 0x1C, 0x22, 0x41, 0x00), ')': (0x00, 0x41, 0x22, 0x1C, 0x00),
+    '*': (0x2A, 0x1C, 0x7F, 0x1C, 0x2A), '+': (0x08, 0x08, 0x3E, 0x08, 0x08),
+    ',': (0x00, 0x80, 0x70, 0x30, 0x00), '-': (0x08, 0x08, 0x08, 0x08, 0x08),
+    '.': (0x00, 0x00, 0x60, 0x60, 0x00), '/': (0x20, 0x10, 0x08, 0x04, 0x02),
+    '0': (0x3E, 0x51, 0x49, 0x45, 0x3E), '1': (0x00, 0x42, 0x7F, 0x40, 0x00),
+    '2': (0x72, 0x49, 0x49, 0x49, 0x46), '3': (0x21, 0x41, 0x49, 0x4D, 0x33),
+    '4': (0x18, 0x14, 0x12, 0x7F, 0x10), '5': (0x27, 0x45, 0x45, 0x45, 0x39),
+    '6': (0x3C, 0x4A, 0x49, 0x49, 0x31), '7': (0x41, 0x21, 0x11, 0x09, 0x07),
+    '8': (0x36, 0x49, 0x49, 0x49, 0x36), '9': (0x46, 0x49, 0x49, 0x29, 0x1E),
+    ':': (0x00, 0x00, 0x14, 0x00, 0x00), ';': (0x00, 0x40, 0x34, 0x00, 0x00),
+    '<': (0x00, 0x08, 0x14, 0x22, 0x41), '=': (0x14, 0x14, 0x14, 0x14, 0x14),
+    '>': (0x00, 0x41, 0x22, 0x14, 0x08), '?': (0x02, 0x01, 0x59, 0x09, 0x06),
+    '@': (0x3E, 0x41, 0x5D, 0x59, 0x4E), 'A': (0x7C, 0x12, 0x11, 0x12, 0x7C),
+    'B': (0x7F, 0x49, 0x49, 0x49, 0x36), 'C': (0x3E, 0x41, 0x41, 0x41, 0x22),
+    'D': (0x7F, 0x41, 0x41, 0x41, 0x3E), 'E': (0x7F, 0x49, 0x49, 0x49, 0x41),
+    'F': (0x7F, 0x09, 0x09, 0x09, 0x01), 'G': (0x3E, 0x41, 0x41, 0x51, 0x73),
+    'H': (0x7F, 0x08, 0x08, 0x08, 0x7F), 'I': (0x00, 0x41, 0x7F, 0x41, 0x00),
+    'J': (0x20, 0x40, 0x41, 0x3F, 0x01), 'K': (0x7F, 0x08, 0x14, 0x22, 0x41),
+    'L': (0x7F, 0x40, 0x40, 0x40, 0x40), 'M': (0x7F, 0x02, 0x1C, 0x02, 0x7F),
+    'N': (0x7F, 0x04, 0x08, 0x10, 0x7F), 'O': (0x3E, 0x41, 0x41, 0x41, 0x3E),
+    'P': (0x7F, 0x09, 0x09, 0x09, 0x06), 'Q': (0x3E, 0x41, 0x51, 0x21, 0x5E),
+    'R': (0x7F, 0x09, 0x19, 0x29, 0x46), 'S': (0x26, 0x49, 0x49, 0x49, 0x32),
+    'T': (0x03, 0x01, 0x7F, 0x01, 0x03), 'U': (0x3F, 0x40, 0x40, 0x40, 0x3F),
+    'V': (0x1F, 0x20, 0x40, 0x20, 0x1F), 'W': (0x3F, 0x40, 0x38, 0x40, 0x3F),
+    'X': (0x63, 0x14, 0x08, 0x14, 0x63), 'Y': (0x03, 0x04, 0x78, 0x04, 0x03),
+    'Z': (0x61, 0x59, 0x49, 0x4D, 0x43), '[': (0x00, 0x7F, 0x41, 0x41, 0x41),
+    '\\': (0x02, 0x04, 0x08, 0x10, 0x20), ']': (0x00, 0x41, 0x41, 0x41, 0x7F),
+    '^': (0x04, 0x02, 0x01, 0x02, 0x04), '_': (0x40, 0x40, 0x40, 0x40, 0x40),
+    '`': (0x00, 0x03, 0x07, 0x08, 0x00), 'a': (0x20, 0x54, 0x54, 0x78, 0x40),
+    'b': (0x7F, 0x28, 0x44, 0x44, 0x38), 'c': (0x38, 0x44, 0x44, 0x44, 0x28),
+    'd': (0x38, 0x44, 0x44, 0x28, 0x7F), 'e': (0x38, 0x54, 0x54, 0x54, 0x18),
+    'f': (0x00, 0x08, 0x7E, 0x09, 0x02), 'g': (0x18, 0xA4, 0xA4, 0x9C, 0x78),
+    'h': (0x7F, 0x08, 0x04, 0x04, 0x78), 'i': (0x00, 0x44, 0x7D, 0x40, 0x00),
+    'j': (0x20, 0x40, 0x40, 0x3D, 0x00), 'k': (0x7F, 0x10, 0x28, 0x44, 0x00),
+    'l': (0x00, 0x41, 0x7F, 0x40, 0x00), 'm': (0x7C, 0x04, 0x78, 0x04, 0x78),
+    'n': (0x7C, 0x08, 0x04, 0x04, 0x78), 'o': (0x38, 0x44, 0x44, 0x44, 0x38),
+    'p': (0xFC, 0x18, 0x24, 0x24, 0x18), 'q': (0x18, 0x24, 0x24, 0x18, 0xFC),
+    'r': (0x7C, 0x08, 0x04, 0x04, 0x08), 's': (0x48, 0x54, 0x54, 0x54, 0x24),
+    't': (0x04, 0x04, 0x3F, 0x44, 0x24), 'u': (0x3C, 0x40, 0x40, 0x20, 0x7C),
+    'v': (0x1C, 0x20, 0x40, 0x20, 0x1C), 'w': (0x3C, 0x40, 0x30, 0x40, 0x3C),
+    'x': (0x44, 0x28, 0x10, 0x28, 0x44), 'y': (0x4C, 0x90, 0x90, 0x90, 0x7C),
+    'z': (0x44, 0x64, 0x54, 0x4C, 0x44), '{': (0x00, 0x08, 0x36, 0x41, 0x00),
+    '|': (0x00, 0x00, 0x77, 0x00, 0x00), '}': (0x00, 0x41, 0x36, 0x08, 0x00),
+    '~': (0x02, 0x01, 0x02, 0x04, 0x02), '°': (0x00, 0x06, 0x09, 0x09, 0x06),
+}
+
+# SSD1306 I2C control bytes
+_COMMAND = 0x00
+_DATA = 0x40
+
+# Power-up sequence for a 128x64 panel in horizontal addressing mode
+_SSD1306_INIT = (
+    0xAE,              # display off
+    0xD5, 0x80,        # clock divide
+    0xA8, 0x3F,        # multiplex ratio (height - 1)
+    0xD3, 0x00,        # display offset
+    0x40,              # start line 0
+    0x8D, 0x14,        # charge pump on
+    0x20, 0x00,        # horizontal addressing
+    0xA1,              # segment remap
+    0xC8,              # COM scan descending
+    0xDA, 0x12,        # COM pins
+    0x81, 0xCF,        # contrast
+    0xD9, 0xF1,        # precharge
+    0xDB, 0x40,        # VCOM detect
+    0xA4,              # resume from RAM
+    0xA6,              # normal (not inverted)
+    0xAF,              # display on
+)
+
+
+class SSD1306Backend:
+    """
+    Writes framebuffer pages to an SSD1306 over I2C
+
+    Each update sets the column and page window first, so only the changed
+    column span of a page goes over the bus: one command transaction and
+    one data transaction per span.
+    """
+
+    def __init__(self, i2c, address: int = 0x3C, width: int = 128, height: int = 64):
+        self.i2c = i2c
+        self.address = address
+        self.width = width
+        self.height = height
+
+    def initialize(self):
+        """Send the power-up command sequence"""
+        init = list(_SSD1306_INIT)
+        init[init.index(0xA8) + 1] = self.height - 1
+        init[init.index(0xDA) + 1] = 0x12 if self.height == 64 else 0x02
+        self._command(*init)
+
+    def _command(self, *commands: int):
+        # After a command control byte the panel takes a stream of commands
+        self.i2c.writeto(self.address, bytes((_COMMAND, *commands)))
+
+    def write_page(self, page: int, column: int, data: bytes):
+        """Write a run of column bytes into one page"""
+        self._command(0x21, column, column + len(data) - 1, 0x22, page, page)
+        self.i2c.writeto(self.address, bytes((_DATA,)) + data)
+
+
+class HeadlessBackend:
+    """
+    Display backend without hardware
+
+    Keeps its own copy of the panel memory, updated only by the page writes
+    the renderer sends, so it shows exactly what the real panel would.
+    Frames can be taken as arrays or written as PNG files.
+    """
+
+    def __init__(self, width: int = 128, height: int = 64,
+                 output_directory: Optional[str] = None, keep_frames: int = 0):
+        self.width = width
+        self.height = height
+        self.memory = np.zeros((height // PAGE_HEIGHT, width), dtype=np.uint8)
+        self.output_directory = Path(output_directory) if output_directory else None
+        self.keep_frames = keep_frames
+        self.frames: List[np.ndarray] = []
+        self.frame_count = 0
+
+    def initialize(self):
+        if self.output_directory is not None:
+            self.output_directory.mkdir(parents=True, exist_ok=True)
+
+    def write_page(self, page: int, column: int, data: bytes):
+        """Write a run of column bytes into one page"""
+        self.memory[page, column:column + len(data)] = np.frombuffer(data, dtype=np.uint8)
+
+    def present(self):
+        """Called by the renderer after each flush that changed the panel"""
+        self.frame_count += 1
+        if self.keep_frames:
+            self.frames.append(self.to_array())
+            del self.frames[:-self.keep_frames]
+        if self.output_directory is not None:
+            self.save_png(self.output_directory / f"frame_{self.frame_count:06d}.png")
+
+    def to_array(self) -> np.ndarray:
+        """Panel contents as a (height, width) boolean array"""
+        return unpack_pages(self.memory)
+
+    def save_png(self, path):
+        """Write the panel contents as a 1-bit greyscale PNG"""
+        write_png(path, self.to_array())
+
+
+def unpack_pages(pages: np.ndarray) -> np.ndarray:
+    """Convert (pages, width) SSD1306 bytes to a (height, width) boolean array"""
+    bits = np.unpackbits(pages[:, np.newaxis, :], axis=1, bitorder='little')
+    return bits.reshape(-1, pages.shape[1]).astype(bool)
+
+
+def write_png(path, pixels: np.ndarray):
+    """Write a boolean (height, width) array as a 1-bit greyscale PNG"""
+    height, width = pixels.shape
+    rows = np.packbits(pixels, axis=1)
+    raw = b"".join(b"\x00" + row.tobytes() for row in rows)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+
+class FrameRenderer:
+    """
+    In-memory 1-bit framebuffer with dirty-page flushing
+
+    The framebuffer uses the SSD1306 memory layout: one byte per column per
+    8-row page. Text lines sit on page boundaries, so drawing a label is a
+    slice copy of its cached column bytes. ``flush`` compares against the
+    last frame sent and transfers only the changed column span of each
+    changed page.
+    """
+
+    def __init__(self, backend, width: int = 128, height: int = 64, label_cache_size: int = 64):
+        self.backend = backend
+        self.width = width
+        self.height = height
+        self.pages = height // PAGE_HEIGHT
+        self.framebuffer = np.zeros((self.pages, width), dtype=np.uint8)
+        self._shown: Optional[np.ndarray] = None
+
+        self._glyphs: Dict[str, np.ndarray] = {}
+        self._labels: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.label_cache_size = label_cache_size
+
+        self.flushes = 0
+        self.pages_written = 0
+        self.bytes_written = 0
+
+    @property
+    def columns_per_line(self) -> int:
+        return self.width // GLYPH_WIDTH
+
+    def glyph(self, char: str) -> np.ndarray:
+        """Rasterized column bytes of one character, including spacing"""
+        columns = self._glyphs.get(char)
+        if columns is None:
+            columns = np.zeros(GLYPH_WIDTH, dtype=np.uint8)
+            columns[:5] = FONT_5X7.get(char, FONT_5X7['?'])
+            self._glyphs[char] = columns
+        return columns
+
+    def label(self, text: str) -> np.ndarray:
+        """Rasterized column bytes of a whole string, cached per string"""
+        columns = self._labels.get(text)
+        if columns is not None:
+            self._labels.move_to_end(text)
+            return columns
+
+        if text:
+            columns = np.concatenate([self.glyph(char) for char in text])
+        else:
+            columns = np.zeros(0, dtype=np.uint8)
+        self._labels[text] = columns
+        if len(self._labels) > self.label_cache_size:
+            self._labels.popitem(last=False)
+        return columns
+
+    def clear(self):
+        """Blank the framebuffer (takes effect on the next flush)"""
+        self.framebuffer[:] = 0
+
+    def draw_text(self, page: int, text: str, x: int = 0, scroll: int = 0, gap: int = 3):
+        """
+        Draw one line of text, replacing whatever was on that line from x on
+
+        Args:
+            page: Text line (SSD1306 page) to draw on
+            text: Text to draw
+            x: Starting column in pixels
+            scroll: Horizontal scroll offset in pixels; text wider than the
+                line wraps around with ``gap`` blank characters in between
+            gap: Blank characters between the end and the start of
+                scrolling text
+        """
+        columns = self.label(text)
+        span = self.width - x
+        line = self.framebuffer[page, x:]
+        if scroll and len(columns) > span:
+            period = len(columns) + gap * GLYPH_WIDTH
+            index = (scroll + np.arange(span)) % period
+            visible = index < len(columns)
+            line[:] = 0
+            line[visible] = columns[index[visible]]
+            return
+
+        count = min(span, len(columns))
+        line[:count] = columns[:count]
+        line[count:] = 0
+
+    def needs_scroll(self, text: str, x: int = 0) -> bool:
+        """Whether a label is wider than the space left on its line"""
+        return len(self.label(text)) > self.width - x
+
+    def flush(self) -> int:
+        """
+        Send changed pages to the backend
+
+        Returns:
+            int: Number of data bytes transferred
+        """
+        if self._shown is None:
+            dirty = np.ones_like(self.framebuffer, dtype=bool)
+        else:
+            dirty = self.framebuffer != self._shown
+
+        transferred = 0
+        for page in np.flatnonzero(dirty.any(axis=1)):
+            changed = np.flatnonzero(dirty[page])
+            start, end = int(changed[0]), int(changed[-1]) + 1
+            self.backend.write_page(int(page), start, self.framebuffer[page, start:end].tobytes())
+            self.pages_written += 1
+            transferred += end - start
+
+        if transferred:
+            self._shown = self.framebuffer.copy()
+            self.flushes += 1
+            self.bytes_written += transferred
+            present = getattr(self.backend, "present", None)
+            if present is not None:
+                present()
+        return transferred
+
+    def invalidate(self):
+        """Force the next flush to rewrite the whole panel"""
+        self._shown = None
+
+    def to_array(self) -> np.ndarray:
+        """Framebuffer contents as a (height, width) boolean array"""
+        return unpack_pages(self.framebuffer)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get transfer statistics"""
+        return {
+            "flushes": self.flushes,
+            "pages_written": self.pages_written,
+            "bytes_written": self.bytes_written,
+            "cached_labels": len(self._labels),
+        }
@@ -0,0 +1,523 @@
+"""
+Shared I2C bus: one owner thread, prioritized transactions, idle-slot display writes
+"""
+
+import time
+import heapq
+import errno
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+SERVO_PRIORITY = 0
+IMU_PRIORITY = 1
+DISPLAY_PRIORITY = 2
+
+DEFAULT_FREQUENCY_HZ = 400_000
+
+# Smallest piece a background write is split into, control byte included
+MIN_SPLIT_BYTES = 8
+
+# Foreground transactions this close together count as one update
+BURST_SECONDS = 0.001
+
+
+def transfer_seconds(length: int, frequency_hz: float = DEFAULT_FREQUENCY_HZ) -> float:
+    """Wire time of one transaction: address byte plus data, 9 clocks each, and start/stop"""
+    return ((length + 1) * 9 + 2) / frequency_hz
+
+
+class _Transaction:
+    __slots__ = ("device", "address", "data", "read_length", "priority", "submitted",
+                 "done", "result", "error")
+
+    def __init__(self, device: "BusDevice", address: int, data: bytes, read_length: int = 0):
+        self.device = device
+        self.address = address
+        self.data = data
+        self.read_length = read_length
+        self.priority = device.priority
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.result: Optional[bytes] = None
+        self.error: Optional[Exception] = None
+
+
+class BusDevice:
+    """
+    Handle of one device on a managed bus
+
+    Has the ``busio.I2C`` methods the drivers use (``writeto``,
+    ``readfrom_into``, ``writeto_then_readfrom``, locking), so drivers such
+    as ``SSD1306Backend`` or ``adafruit_mpu6050`` take it in place of the
+    bus. Calls block until the transaction has run, except writes of a
+    background device, which return as soon as they are queued.
+    """
+
+    def __init__(self, manager: "I2CBusManager", name: str, priority: int,
+                 background: bool = False, coalesce: Iterable[int] = ()):
+        self.manager = manager
+        self.name = name
+        self.priority = priority
+        self.background = background
+        # Leading control bytes after which consecutive writes may be merged
+        self.coalesce = frozenset(coalesce)
+
+    def try_lock(self) -> bool:
+        # The manager serializes transactions, callers never hold the bus
+        return True
+
+    def unlock(self):
+        pass
+
+    def scan(self) -> List[int]:
+        return self.manager.bus.scan()
+
+    def writeto(self, address: int, buffer, *, start: int = 0, end: Optional[int] = None):
+        self.manager.submit(_Transaction(self, address, bytes(buffer[start:end])),
+                            wait=not self.background)
+
+    def readfrom_into(self, address: int, buffer, *, start: int = 0, end: Optional[int] = None):
+        end = len(buffer) if end is None else end
+        buffer[start:end] = self.manager.submit(_Transaction(self, address, b"", end - start))
+
+    def writeto_then_readfrom(self, address: int, buffer_out, buffer_in, *, out_start: int = 0,
+                              out_end: Optional[int] = None, in_start: int = 0,
+                              in_end: Optional[int] = None):
+        in_end = len(buffer_in) if in_end is None else in_end
+        buffer_in[in_start:in_end] = self.manager.submit(
+            _Transaction(self, address, bytes(buffer_out[out_start:out_end]), in_end - in_start))
+
+
+class _DeviceStats:
+    def __init__(self, window: int = 1024):
+        self.transactions = 0
+        self.bytes = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) * 1000.0
+        summary = {"transactions": self.transactions, "bytes": self.bytes,
+                   "errors": self.errors, "busy_seconds": self.busy}
+        if len(latencies):
+            summary.update({
+                "latency_mean_ms": float(latencies.mean()),
+                "latency_p99_ms": float(np.percentile(latencies, 99)),
+                "latency_max_ms": float(latencies.max()),
+            })
+        return summary
+
+
+class I2CBusManager:
+    """
+    Arbiter of one I2C bus shared by the servo driver, IMU and display
+
+    A single worker thread owns the bus. Devices get ``BusDevice`` handles
+    and their transactions are queued by priority: servo updates first,
+    IMU reads next, FIFO within a priority. Display writes are background
+    work on top of that:
+
+    - they return to the renderer immediately and are queued separately
+    - consecutive writes to the same address that start with the same
+      coalescable control byte (SSD1306 command and data streams) are
+      merged into one transaction, up to ``max_transfer`` bytes
+    - they are only started in an idle slot: nothing else is queued and
+      the transfer ends before the next servo or IMU transaction is due,
+      predicted from each device's update period; coalescable writes too
+      long for the slot are split
+
+    so a full-screen redraw is cut into slot-sized transactions between
+    servo updates and IMU samples instead of delaying them.
+
+    Without ``start()`` transactions run directly in the calling thread
+    under a lock, in call order. A caller waiting longer than ``timeout``
+    seconds for its transaction gets a ``TimeoutError``.
+    """
+
+    def __init__(self, bus, frequency_hz: float = DEFAULT_FREQUENCY_HZ, max_transfer: int = 256,
+                 timeout: float = 1.0):
+        self.bus = bus
+        self.frequency_hz = frequency_hz
+        self.max_transfer = max_transfer
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._queue: List = []
+        self._background: deque = deque()
+        self._sequence = 0
+        self._executing = False
+        self._bus_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Last submission and period of each foreground device, for
+        # predicting when its next transaction is due
+        self._cadence: Dict[str, List[Optional[float]]] = {}
+
+        self.devices: Dict[str, BusDevice] = {}
+        self.stats: Dict[str, _DeviceStats] = {}
+        self.coalesced = 0
+        self.started = time.monotonic()
+        self.busy = 0.0
+
+    @classmethod
+    def from_config(cls, config) -> Optional["I2CBusManager"]:
+        """
+        Create a manager from the ``i2c`` section of settings.json
+
+        Returns:
+            I2CBusManager: Manager of the hardware bus, or of a ``MockI2CBus``
+                with the configured devices if ``mock`` is set; None when
+                disabled or the host has no I2C support
+        """
+        if not config.get_nested_setting("i2c", "enabled", default=True):
+            return None
+        frequency = config.get_nested_setting("i2c", "frequency_hz", default=DEFAULT_FREQUENCY_HZ)
+        if config.get_nested_setting("i2c", "mock", default=False):
+            addresses = [int(config.get_nested_setting(*keys, default=default), 16) for keys, default in (
+                (("hardware", "display_i2c_address"), "0x3c"),
+                (("hardware", "imu_i2c_address"), "0x68"),
+                (("servo_output", "address"), "0x40"))]
+            bus = MockI2CBus(addresses, frequency, realtime=True)
+        else:
+            try:
+                import board
+                import busio
+            except ImportError:
+                logger.warning("No I2C support available, devices use their fallbacks")
+                return None
+            bus = busio.I2C(board.SCL, board.SDA, frequency=frequency)
+            while not bus.try_lock():
+                pass
+        return cls(bus, frequency,
+                   config.get_nested_setting("i2c", "max_transfer_bytes", default=256),
+                   config.get_nested_setting("i2c", "timeout_seconds", default=1.0))
+
+    def device(self, name: str, priority: int, background: bool = False,
+               coalesce: Iterable[int] = ()) -> BusDevice:
+        """Handle for a device; ``background`` writes go in idle slots"""
+        device = BusDevice(self, name, priority, background, coalesce)
+        self.devices[name] = device
+        self.stats[name] = _DeviceStats()
+        return device
+
+    def start(self):
+        """Start the bus worker thread"""
+        if self._running:
+            return
+        self._running = True
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="i2c-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Send any queued writes, then stop the worker"""
+        self.flush(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued transaction has run"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._running and (self._queue or self._background or self._executing):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def submit(self, transaction: _Transaction, wait: bool = True) -> Optional[bytes]:
+        """
+        Queue a transaction
+
+        Returns:
+            bytes: Data read, when waiting for a read
+        """
+        if not transaction.device.background:
+            self._note_submit(transaction.device.name, transaction.submitted)
+        if not self._running:
+            self._execute(transaction, transaction.data, [transaction])
+        else:
+            with self._condition:
+                if transaction.device.background and not transaction.read_length:
+                    self._background.append(transaction)
+                else:
+                    self._sequence += 1
+                    heapq.heappush(self._queue, (transaction.priority, self._sequence, transaction))
+                self._condition.notify_all()
+            if not wait:
+                return None
+            if not transaction.done.wait(self.timeout):
+                raise TimeoutError(f"I2C transaction of {transaction.device.name} "
+                                   f"not done after {self.timeout} s")
+        if transaction.error is not None:
+            raise transaction.error
+        return transaction.result
+
+    def _note_submit(self, name: str, now: float):
+        # The worker reads the cadences while scheduling background writes
+        with self._condition:
+            cadence = self._cadence.setdefault(name, [now, None])
+            interval = now - cadence[0]
+            # Transactions closer together than BURST_SECONDS belong to one update
+            if interval >= BURST_SECONDS:
+                cadence[1] = interval if cadence[1] is None else 0.8 * cadence[1] + 0.2 * interval
+            cadence[0] = now
+
+    def _active_cadences(self, now: float):
+        """(last, period) of devices updating periodically right now"""
+        return [(last, period) for last, period in self._cadence.values()
+                if period is not None and now - last <= 2.0 * period]
+
+    def _slot_remaining(self, now: float) -> float:
+        """Seconds until the next foreground transaction is expected (inf when none is)"""
+        active = self._active_cadences(now)
+        if not active:
+            return float("inf")
+        guard = transfer_seconds(9, self.frequency_hz)
+        return min(last + period for last, period in active) - now - guard
+
+    def _capacity(self, seconds: float) -> int:
+        """Bytes that fit in one transaction of at most ``seconds``"""
+        if seconds == float("inf"):
+            return self.max_transfer
+        return min(self.max_transfer, int((seconds * self.frequency_hz - 2) / 9) - 1)
+
+    def _slot_budget(self, now: float) -> Optional[float]:
+        """
+        Seconds a background transfer may take now, or None to wait
+
+        Coalescable writes are split to fit the slot. Any other write
+        longer than the shortest slot goes at the start of one, right after
+        a foreground update, so it is never starved.
+        """
+        remaining = self._slot_remaining(now)
+        head = self._background[0]
+        if transfer_seconds(len(head.data), self.frequency_hz) <= remaining:
+            return remaining
+        if head.data[0] in head.device.coalesce and self._capacity(remaining) >= MIN_SPLIT_BYTES:
+            return remaining
+        active = self._active_cadences(now)
+        shortest = min(period for last, period in active)
+        latest = max(last for last, period in active)
+        if transfer_seconds(len(head.data), self.frequency_hz) > shortest \
+                and now - latest < 0.1 * shortest:
+            return float("inf")
+        return None
+
+    def _take_background(self, budget: float):
+        """
+        Next background transfer within the budget
+
+        Consecutive writes to the same address that start with the same
+        coalescable control byte are merged; a coalescable write too long
+        for the budget is split and its remainder stays queued.
+
+        Returns:
+            tuple: (first transaction, bytes to write, transactions completed)
+        """
+        capacity = self._capacity(budget)
+        first = self._background[0]
+        coalescable = first.data[:1] and first.data[0] in first.device.coalesce
+        if coalescable and len(first.data) > capacity:
+            data = first.data[:capacity]
+            first.data = first.data[:1] + first.data[capacity:]
+            return first, data, []
+
+        self._background.popleft()
+        data = first.data
+        completed = [first]
+        while coalescable and self._background:
+            following = self._background[0]
+            if (following.device is not first.device or following.address != first.address
+                    or following.data[:1] != first.data[:1]
+                    or len(data) + len(following.data) - 1 > capacity):
+                break
+            data += self._background.popleft().data[1:]
+            completed.append(following)
+        return first, data, completed
+
+    def _run(self):
+        try:
+            self._serve()
+        except Exception as e:
+            logger.exception(f"I2C bus worker failed: {e}")
+            # Fail everything still queued and let later calls run inline
+            with self._condition:
+                self._running = False
+                self._executing = False
+                pending = [entry[2] for entry in self._queue] + list(self._background)
+                self._queue.clear()
+                self._background.clear()
+                self._condition.notify_all()
+            for transaction in pending:
+                transaction.error = OSError(f"I2C bus worker failed: {e}")
+                transaction.done.set()
+
+    def _serve(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._queue:
+                        transaction = heapq.heappop(self._queue)[2]
+                        batch = (transaction, transaction.data, [transaction])
+                        break
+                    if self._background:
+                        now = time.monotonic()
+                        budget = self._slot_budget(now)
+                        if budget is not None:
+                            batch = self._take_background(budget)
+                            break
+                        # No room before the next foreground update, try again after it
+                        self._condition.wait(max(self._slot_remaining(now), 0.0) + BURST_SECONDS)
+                        continue
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                self._executing = True
+            try:
+                self._execute(*batch)
+            finally:
+                with self._condition:
+                    self._executing = False
+                    self._condition.notify_all()
+
+    def _execute(self, first: _Transaction, data: bytes, completed: List[_Transaction]):
+        """Run one bus transaction and complete the transactions it finishes"""
+        error = None
+        with self._bus_lock:
+            start = time.monotonic()
+            try:
+                if first.read_length:
+                    buffer = bytearray(first.read_length)
+                    if data:
+                        self.bus.writeto_then_readfrom(first.address, data, buffer)
+                    else:
+                        self.bus.readfrom_into(first.address, buffer)
+                    first.result = bytes(buffer)
+                else:
+                    self.bus.writeto(first.address, data)
+            except Exception as e:
+                error = e
+                if first.device.background:
+                    logger.error(f"I2C write to {first.device.name} failed: {e}")
+            end = time.monotonic()
+        if error is not None and not completed:
+            # Part of a split write failed: report it when the rest is sent
+            first.error = error
+
+        duration = end - start
+        self.busy += duration
+        stats = self.stats[first.device.name]
+        stats.transactions += 1
+        stats.bytes += len(data) + first.read_length
+        stats.busy += duration
+        stats.errors += error is not None
+        self.coalesced += max(len(completed) - 1, 0)
+        for transaction in completed:
+            transaction.error = error or transaction.error
+            stats.latencies.append(end - transaction.submitted)
+            metrics.observe("i2c_latency", end - transaction.submitted, device=first.device.name)
+            transaction.done.set()
+        metrics.increment("i2c_bytes", len(data) + first.read_length, device=first.device.name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Bus utilization and per-device transaction, byte and latency statistics"""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "utilization": self.busy / elapsed,
+            "queued": len(self._queue) + len(self._background),
+            "coalesced": self.coalesced,
+            "devices": {name: stats.summary() for name, stats in self.stats.items()},
+        }
+
+
+class MockI2CBus:
+    """
+    I2C bus with register-file devices, for running without hardware
+
+    Each device is 256 bytes of registers behind an auto-incrementing
+    pointer: the first byte of a write sets the pointer and the rest are
+    stored from there, reads return bytes from the pointer on. That is
+    how the PCA9685 and MPU6050 behave; SSD1306 traffic is accepted and
+    logged. Addresses without a device raise ``OSError`` (no acknowledge),
+    and with ``realtime`` every transaction takes its wire time.
+    """
+
+    def __init__(self, addresses: Iterable[int] = (), frequency_hz: float = DEFAULT_FREQUENCY_HZ,
+                 realtime: bool = False, keep_log: int = 0):
+        self.frequency_hz = frequency_hz
+        self.realtime = realtime
+        self.registers = {address: bytearray(256) for address in addresses}
+        self._pointers = {address: 0 for address in addresses}
+        self.log: deque = deque(maxlen=keep_log)
+        self.keep_log = keep_log
+        self.transactions = 0
+
+    def try_lock(self) -> bool:
+        return True
+
+    def unlock(self):
+        pass
+
+    def scan(self) -> List[int]:
+        return sorted(self.registers)
+
+    def _transfer(self, address: int, written: int, read: int):
+        if address not in self.registers:
+            raise OSError(errno.EREMOTEIO, f"No acknowledge from 0x{address:02x}")
+        self.transactions += 1
+        if self.keep_log:
+            self.log.append((time.monotonic(), address, written, read))
+        if self.realtime:
+            time.sleep(transfer_seconds(written, self.frequency_hz)
+                       + (transfer_seconds(read, self.frequency_hz) if read else 0.0))
+
+    def _write(self, address: int, data: bytes):
+        if data:
+            pointer = data[0]
+            payload = data[1:]
+            memory = self.registers[address]
+            for offset, value in enumerate(payload):
+                memory[(pointer + offset) % 256] = value
+            self._pointers[address] = pointer
+
+    def _read(self, address: int, buffer):
+        pointer = self._pointers[address]
+        memory = self.registers[address]
+        for offset in range(len(buffer)):
+            buffer[offset] = memory[(pointer + offset) % 256]
+
+    def writeto(self, address: int, buffer, *, start: int = 0, end: Optional[int] = None):
+        data = bytes(buffer[start:end])
+        self._transfer(address, len(data), 0)
+        self._write(address, data)
+
+    def readfrom_into(self, address: int, buffer, *, start: int = 0, end: Optional[int] = None):
+        view = memoryview(buffer)[start:end]
+        self._transfer(address, 0, len(view))
+        self._read(address, view)
+
+    def writeto_then_readfrom(self, address: int, buffer_out, buffer_in, *, out_start: int = 0,
+                              out_end: Optional[int] = None, in_start: int = 0,
+                              in_end: Optional[int] = None):
+        data = bytes(buffer_out[out_start:out_end])
+        view = memoryview(buffer_in)[in_start:in_end]
+        self._transfer(address, len(data), len(view))
+        self._write(address, data)
+        self._read(address, view)
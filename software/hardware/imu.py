@@ -2,62 +2,257 @@
 IMU controller for orientation sensing
 """
 
+import math
+import time
 import logging
+import threading
 from typing import Tuple, Optional
 
+import numpy as np
+from scipy.signal import lfilter
+
+from utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
+STANDARD_GRAVITY = 9.80665
+
+# Sample buffer columns: timestamp, accelerometer (m/s^2), gyroscope (deg/s)
+SAMPLE_COLUMNS = ("t", "ax", "ay", "az", "gx", "gy", "gz")
+
 class IMUController:
-    """Controls the IMU for orientation sensing"""
-    
-    def __init__(self):
-        self.imu = None
+    """
+    Controls the IMU for orientation sensing
+
+    A background thread samples raw accelerometer and gyroscope readings at
+    a fixed rate into a preallocated NumPy ring buffer. Every block of
+    samples is fused with a complementary filter run as a first-order IIR
+    over the whole block, and the latest orientation is published as a
+    quaternion. Readers never touch the I2C bus.
+    """
+
+    def __init__(self, sample_rate_hz: float = 200.0, buffer_size: int = 1024,
+                 block_size: int = 20, alpha: float = 0.98, device=None, i2c=None,
+                 address: int = 0x68):
+        self.imu = device
+        # Bus to open an MPU6050 on when no device is given
+        self.i2c = i2c
+        self.address = address
         self.calibrated = False
-        
+
+        self.sample_rate_hz = sample_rate_hz
+        self.block_size = block_size
+        self.alpha = alpha
+
+        # Ring buffer of raw samples, written only by the sampling thread
+        self.samples = np.zeros((buffer_size, len(SAMPLE_COLUMNS)))
+        self.sample_count = 0
+        self.gyro_bias = np.zeros(3)
+
+        # Filter state (degrees) and published outputs, double-buffered so a
+        # reader always sees a complete quaternion without locking
+        self._roll = 0.0
+        self._pitch = 0.0
+        self._yaw = 0.0
+        self._processed = 0
+        self._quaternions = np.zeros((2, 4))
+        self._quaternions[:, 0] = 1.0
+        self._orientations = np.zeros((2, 3))
+        self._front = 0
+
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
     def initialize(self):
         """Initialize the IMU"""
         try:
             logger.info("Initializing IMU...")
-            # Initialize IMU hardware (placeholder)
-            # self.imu = MPU6050(i2c)
+            if self.imu is None and self.i2c is not None:
+                self.imu = self._open_hardware()
+            self.start_sampling()
             logger.info("IMU initialized")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize IMU: {e}")
             return False
-    
+
+    def _open_hardware(self):
+        """Open an MPU6050 on the bus, or None to sample a level, motionless base"""
+        try:
+            import adafruit_mpu6050
+        except ImportError:
+            logger.warning("No MPU6050 driver available, assuming a level base")
+            return None
+        return adafruit_mpu6050.MPU6050(self.i2c, self.address)
+
+    def start_sampling(self):
+        """Start the background sampling thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._sample_loop, name="imu-sampler", daemon=True)
+        self._thread.start()
+
+    def stop_sampling(self, timeout: float = 1.0):
+        """Stop the background sampling thread"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _read_raw(self) -> Tuple[float, float, float, float, float, float]:
+        """
+        Read one raw sample from the sensor
+
+        Returns:
+            tuple: (ax, ay, az) in m/s^2 and (gx, gy, gz) in deg/s
+        """
+        if self.imu is None:
+            # No hardware: a level, motionless base
+            return 0.0, 0.0, STANDARD_GRAVITY, 0.0, 0.0, 0.0
+        ax, ay, az = self.imu.acceleration
+        gx, gy, gz = self.imu.gyro
+        return ax, ay, az, math.degrees(gx), math.degrees(gy), math.degrees(gz)
+
+    def _sample_loop(self):
+        """Sample at a fixed rate against absolute deadlines"""
+        period = 1.0 / self.sample_rate_hz
+        deadline = time.monotonic()
+        while self._running:
+            try:
+                self.poll(time.monotonic())
+            except Exception as e:
+                logger.error(f"IMU read failed: {e}")
+
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.monotonic()
+
+    def poll(self, timestamp: float):
+        """Read the sensor once and record the sample"""
+        with metrics.timer("imu_read"):
+            reading = self._read_raw()
+        self.record_sample(timestamp, reading)
+
+    def record_sample(self, timestamp: float, reading):
+        """Store one reading in the ring buffer and fuse full blocks"""
+        row = self.sample_count % len(self.samples)
+        self.samples[row, 0] = timestamp
+        self.samples[row, 1:] = reading
+        self.sample_count += 1
+        if self.sample_count - self._processed >= self.block_size:
+            with metrics.timer("imu_fuse"):
+                self._fuse(self._processed, self.sample_count)
+
+    def _fuse(self, start: int, end: int):
+        """Run the complementary filter over samples [start, end)"""
+        # The first sample of a block uses the previous sample for its dt
+        first = max(start - 1, 0, end - len(self.samples))
+        rows = np.arange(first, end) % len(self.samples)
+        block = self.samples[rows]
+
+        dt = np.diff(block[:, 0], prepend=block[0, 0])[-(end - start):]
+        block = block[-(end - start):]
+        accel = block[:, 1:4]
+        gyro = block[:, 4:7] - self.gyro_bias
+
+        # Tilt from gravity, assuming the base is not accelerating
+        accel_roll = np.degrees(np.arctan2(accel[:, 1], accel[:, 2]))
+        accel_pitch = np.degrees(np.arctan2(-accel[:, 0], np.hypot(accel[:, 1], accel[:, 2])))
+
+        # theta[n] = alpha * (theta[n-1] + omega[n] * dt) + (1 - alpha) * theta_acc[n]
+        a = self.alpha
+        roll = lfilter([1.0], [1.0, -a], a * gyro[:, 0] * dt + (1.0 - a) * accel_roll,
+                       zi=[a * self._roll])[0]
+        pitch = lfilter([1.0], [1.0, -a], a * gyro[:, 1] * dt + (1.0 - a) * accel_pitch,
+                        zi=[a * self._pitch])[0]
+
+        self._roll = float(roll[-1])
+        self._pitch = float(pitch[-1])
+        # Without a magnetometer yaw is integrated gyro only
+        self._yaw = float((self._yaw + np.sum(gyro[:, 2] * dt)) % 360.0)
+        self._processed = end
+        self._publish()
+
+    def _publish(self):
+        """Write the latest orientation into the back buffer and swap"""
+        back = 1 - self._front
+        self._orientations[back] = (self._roll, self._pitch, self._yaw)
+        self._quaternions[back] = euler_to_quaternion(self._roll, self._pitch, self._yaw)
+        self._front = back
+
+    def get_quaternion(self) -> np.ndarray:
+        """
+        Get the latest orientation quaternion
+
+        Returns:
+            ndarray: (w, x, y, z), a copy: the buffer behind it is reused
+                two publications later
+        """
+        return self._quaternions[self._front].copy()
+
     def get_orientation(self) -> Tuple[float, float, float]:
         """
         Get current orientation from IMU
-        
+
         Returns:
             tuple: (roll, pitch, yaw) in degrees
         """
         try:
-            # Get orientation data (placeholder)
-            # roll, pitch, yaw = self.imu.get_orientation()
-            # return roll, pitch, yaw
-            
-            # Placeholder return
-            return 0.0, 0.0, 0.0
-            
+            roll, pitch, yaw = self._orientations[self._front]
+            return float(roll), float(pitch), float(yaw)
+
         except Exception as e:
             logger.error(f"Failed to get IMU orientation: {e}")
             return None, None, None
-    
+
+    def get_samples(self, count: Optional[int] = None) -> np.ndarray:
+        """Get a copy of the most recent raw samples, oldest first"""
+        available = min(self.sample_count, len(self.samples))
+        count = available if count is None else min(count, available)
+        rows = np.arange(self.sample_count - count, self.sample_count) % len(self.samples)
+        return self.samples[rows]
+
     def calibrate(self):
         """Calibrate the IMU"""
         try:
             logger.info("Calibrating IMU...")
-            # Perform calibration (placeholder)
-            # self.imu.calibrate()
+            # Estimate gyro bias from the buffered samples of a stationary base
+            samples = self.get_samples()
+            if len(samples):
+                self.gyro_bias = samples[:, 4:7].mean(axis=0)
             self.calibrated = True
             logger.info("IMU calibration complete")
             return True
         except Exception as e:
             logger.error(f"IMU calibration failed: {e}")
             return False
-    
+
+    @property
+    def has_sensor(self) -> bool:
+        """Whether readings come from a sensor rather than the level-base fallback"""
+        return self.imu is not None
+
     def is_calibrated(self) -> bool:
         """Check if IMU is calibrated"""
         return self.calibrated
+
+    def cleanup(self):
+        """Clean up IMU resources"""
+        logger.info("Cleaning up IMU...")
+        self.stop_sampling()
+
+def euler_to_quaternion(roll: float, pitch: float, yaw: float) -> np.ndarray:
+    """Convert roll/pitch/yaw in degrees (ZYX order) to a (w, x, y, z) quaternion"""
+    cr, sr = math.cos(math.radians(roll) / 2), math.sin(math.radians(roll) / 2)
+    cp, sp = math.cos(math.radians(pitch) / 2), math.sin(math.radians(pitch) / 2)
+    cy, sy = math.cos(math.radians(yaw) / 2), math.sin(math.radians(yaw) / 2)
+    return np.array([
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    ])
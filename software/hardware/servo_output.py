@@ -0,0 +1,178 @@
+"""
+PCA9685 servo output with write suppression and register bursts
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PCA9685_ADDRESS = 0x40
+OSCILLATOR_HZ = 25_000_000
+# Counter steps per PWM period
+RESOLUTION = 4096
+
+_MODE1 = 0x00
+_PRESCALE = 0xFE
+_LED0_ON_L = 0x06
+_CHANNEL_REGISTERS = 4
+
+_MODE1_RESTART = 0x80
+_MODE1_AUTO_INCREMENT = 0x20
+_MODE1_SLEEP = 0x10
+
+
+class PCA9685Output:
+    """
+    Azimuth and elevation servos on two channels of a PCA9685
+
+    Pulse widths are quantized to the driver's counter steps (about 4.9 µs
+    at 50 Hz) before anything is sent, and a channel whose step count has
+    not changed since its last write is not written again: while tracking,
+    most setpoints move the pointing by less than one step. Channels that
+    do change go out together in one auto-increment register burst when
+    they are adjacent, so a two-axis update costs one bus transaction
+    instead of two.
+
+    Without an I2C bus (no ``busio`` on the host) the output runs dry:
+    quantization and statistics work, nothing is sent.
+    """
+
+    def __init__(self, i2c=None, address: int = PCA9685_ADDRESS, frequency_hz: float = 50.0,
+                 azimuth_channel: int = 0, elevation_channel: int = 1):
+        self.i2c = i2c
+        self.address = address
+        self.channels = (azimuth_channel, elevation_channel)
+        self.prescale = min(255, max(3, round(OSCILLATOR_HZ / (RESOLUTION * frequency_hz)) - 1))
+        # Period the oscillator actually produces after prescaler rounding
+        self.period_ms = 1000.0 * (self.prescale + 1) * RESOLUTION / OSCILLATOR_HZ
+        self._last_ticks: List[Optional[int]] = [None, None]
+
+        self.commands = 0
+        self.transactions = 0
+        self.channel_writes = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def from_config(cls, config, i2c=None) -> "PCA9685Output":
+        """Create an output from the ``servo_output`` section of settings.json"""
+        return cls(
+            i2c=i2c,
+            address=int(config.get_nested_setting("servo_output", "address", default="0x40"), 16),
+            frequency_hz=config.get_nested_setting("servo_output", "frequency_hz", default=50.0),
+            azimuth_channel=config.get_nested_setting("servo_output", "azimuth_channel", default=0),
+            elevation_channel=config.get_nested_setting("servo_output", "elevation_channel", default=1),
+        )
+
+    def initialize(self):
+        """Open the bus if needed and set the PWM frequency"""
+        if self.i2c is None:
+            self.i2c = self._open_hardware()
+        self._last_ticks = [None, None]
+        if self.i2c is None:
+            return
+        # The prescaler can only be written while the oscillator sleeps
+        self._send(_MODE1, (_MODE1_SLEEP,))
+        self._send(_PRESCALE, (self.prescale,))
+        self._send(_MODE1, (_MODE1_RESTART | _MODE1_AUTO_INCREMENT,))
+
+    def _open_hardware(self):
+        try:
+            import board
+            import busio
+        except ImportError:
+            logger.warning("No I2C support available, servo output runs dry")
+            return None
+
+        i2c = busio.I2C(board.SCL, board.SDA)
+        while not i2c.try_lock():
+            pass
+        return i2c
+
+    @property
+    def step_ms(self) -> float:
+        """Pulse width resolution in milliseconds"""
+        return self.period_ms / RESOLUTION
+
+    def pulse_to_ticks(self, pulse_ms: float) -> int:
+        """Counter steps of a pulse width, rounded to the nearest step"""
+        return min(RESOLUTION - 1, max(0, int(round(pulse_ms / self.step_ms))))
+
+    def quantize(self, pulse_ms: float) -> float:
+        """Pulse width the driver will actually produce"""
+        return self.pulse_to_ticks(pulse_ms) * self.step_ms
+
+    def write(self, azimuth_pulse_ms: float, elevation_pulse_ms: float) -> int:
+        """
+        Set both pulse widths, sending only channels whose steps changed
+
+        Args:
+            azimuth_pulse_ms: Azimuth servo pulse width in milliseconds
+            elevation_pulse_ms: Elevation servo pulse width in milliseconds
+
+        Returns:
+            int: Bus transactions sent (0, 1 or 2)
+        """
+        self.commands += 1
+        ticks = (self.pulse_to_ticks(azimuth_pulse_ms), self.pulse_to_ticks(elevation_pulse_ms))
+        changed = sorted((self.channels[axis], ticks[axis]) for axis in (0, 1)
+                         if ticks[axis] != self._last_ticks[axis])
+
+        transactions = 0
+        try:
+            for first, run in self._runs(changed):
+                data = []
+                for value in run:
+                    # ON at count 0, OFF after the pulse
+                    data.extend((0, 0, value & 0xFF, value >> 8))
+                self._send(_LED0_ON_L + _CHANNEL_REGISTERS * first, data)
+                transactions += 1
+        except Exception:
+            # The driver's state is unknown, so the next write resends both
+            self._last_ticks = [None, None]
+            self.transactions += transactions
+            raise
+        for axis in (0, 1):
+            self._last_ticks[axis] = ticks[axis]
+
+        self.transactions += transactions
+        self.channel_writes += len(changed)
+        saved = 2 - transactions
+        if saved:
+            metrics.increment("servo_writes_saved", saved)
+        return transactions
+
+    @staticmethod
+    def _runs(changed: List[Tuple[int, int]]):
+        """Group (channel, ticks) pairs into runs of consecutive channels"""
+        runs = []
+        for channel, value in changed:
+            if runs and runs[-1][0] + len(runs[-1][1]) == channel:
+                runs[-1][1].append(value)
+            else:
+                runs.append((channel, [value]))
+        return runs
+
+    def _send(self, register: int, data):
+        payload = bytes((register, *data))
+        self.bytes_written += len(payload)
+        if self.i2c is not None:
+            self.i2c.writeto(self.address, payload)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get write counters
+
+        ``writes_saved`` counts bus transactions avoided against writing
+        each axis separately on every command.
+        """
+        return {
+            "commands": self.commands,
+            "transactions": self.transactions,
+            "channel_writes": self.channel_writes,
+            "writes_saved": 2 * self.commands - self.transactions,
+            "bytes": self.bytes_written,
+            "step_ms": self.step_ms,
+        }
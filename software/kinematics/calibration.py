@@ -0,0 +1,403 @@
+"""
+Mount-error pointing model: fitting from sightings and IMU tilt, and
+vectorized application to gimbal setpoints
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Model terms, in degrees:
+#   IA    azimuth encoder (zero) offset
+#   IE    elevation encoder (zero) offset
+#   AN    azimuth axis tilt toward north
+#   AW    azimuth axis tilt toward west
+#   CA    arrow not perpendicular to the elevation axis (collimation)
+#   NPAE  elevation axis not perpendicular to the azimuth axis
+TERMS = ("IA", "IE", "AN", "AW", "CA", "NPAE")
+# Columns of the axis tilt terms, which follow the base tilt measured by the IMU
+_TILT_TERMS = [TERMS.index("AN"), TERMS.index("AW")]
+
+# tan/sec terms blow up at the zenith; evaluate them no higher than this
+MAX_MODEL_ELEVATION = 85.0
+
+
+def _design(azimuth: np.ndarray, elevation: np.ndarray):
+    """
+    Partial derivatives of the azimuth and elevation corrections per term
+
+    Returns:
+        tuple: (azimuth rows, elevation rows), each of shape (n, len(TERMS))
+    """
+    a = np.radians(azimuth)
+    e = np.radians(np.clip(elevation, -MAX_MODEL_ELEVATION, MAX_MODEL_ELEVATION))
+    tan_e = np.tan(e)
+    ones = np.ones_like(a)
+    zeros = np.zeros_like(a)
+    az_rows = np.stack([ones, zeros, np.sin(a) * tan_e, -np.cos(a) * tan_e,
+                        1.0 / np.cos(e), tan_e], axis=-1)
+    el_rows = np.stack([zeros, ones, np.cos(a), np.sin(a), zeros, zeros], axis=-1)
+    return az_rows, el_rows
+
+
+class ServoLUT:
+    """Inverse lookup table for one servo's nonlinearity"""
+
+    def __init__(self, commanded: Sequence[float] = (), measured: Sequence[float] = ()):
+        order = np.argsort(measured)
+        self.commanded = np.asarray(commanded, dtype=float)[order]
+        self.measured = np.asarray(measured, dtype=float)[order]
+
+    def __bool__(self) -> bool:
+        return len(self.measured) >= 2
+
+    def command_for(self, angle):
+        """Commanded angle that makes the servo actually reach ``angle``"""
+        if not self:
+            return angle
+        return np.interp(angle, self.measured, self.commanded)
+
+    @classmethod
+    def fit(cls, target, commanded, low: float, high: float, bin_degrees: float = 15.0,
+            min_per_bin: int = 3, wrap: bool = False) -> "ServoLUT":
+        """
+        Fit a table from the commands that reached known servo angles
+
+        The angles are binned along the axis and each bin with enough
+        sightings contributes one point, its median angle and median
+        command offset, so single bad sightings do not bend the table. The
+        offsets of the outermost bins are carried out to the axis limits,
+        or interpolated across the wrap for azimuth.
+
+        Args:
+            target: Servo angles the mount model asked for
+            commanded: Commands that actually reached them
+            low, high: Axis range in degrees
+            bin_degrees: Bin width in degrees
+            min_per_bin: Fewest sightings for a bin to count
+            wrap: Whether offsets wrap at 360° (azimuth)
+
+        Returns:
+            ServoLUT: The table, empty (no correction) with fewer than two
+                usable bins
+        """
+        target = np.asarray(target, dtype=float)
+        offset = np.asarray(commanded, dtype=float) - target
+        if wrap:
+            offset = (offset + 180.0) % 360.0 - 180.0
+        bins = np.floor((np.clip(target, low, high) - low) / bin_degrees)
+        points = []
+        for index in np.unique(bins):
+            members = bins == index
+            if members.sum() >= min_per_bin:
+                points.append((np.median(target[members]), np.median(offset[members])))
+        if len(points) < 2:
+            return cls()
+        measured, offsets = (np.array(column) for column in zip(*points))
+        if wrap:
+            # Interpolate across the wrap so 0° and 360° get the same offset
+            edge = float(np.interp(high, [measured[-1], measured[0] + high - low], [offsets[-1], offsets[0]]))
+            edges = [edge, edge]
+        else:
+            edges = [offsets[0], offsets[-1]]
+        measured = np.concatenate([[low], measured, [high]])
+        offsets = np.concatenate([edges[:1], offsets, edges[1:]])
+        return cls(measured + offsets, measured)
+
+
+class PointingModel:
+    """
+    Pointing corrections applied to every gimbal setpoint
+
+    The geometric terms are the classic alt-az telescope mount model, linear
+    in its parameters, so they are fitted in closed form with least squares.
+    Servo nonlinearity is handled afterwards by per-axis lookup tables.
+    ``apply`` works on whole setpoint arrays so a trajectory is corrected
+    once when it is planned, not per servo step.
+
+    ``set_base_tilt`` feeds in the IMU tilt at runtime: AN and AW follow
+    any change of the base tilt since the model was fitted.
+    """
+
+    def __init__(self, parameters: Optional[Dict[str, float]] = None,
+                 azimuth_lut: Optional[ServoLUT] = None,
+                 elevation_lut: Optional[ServoLUT] = None, rms_error: Optional[float] = None,
+                 imu_tilt: Optional[Sequence[float]] = None):
+        parameters = parameters or {}
+        self.coefficients = np.array([parameters.get(term, 0.0) for term in TERMS])
+        self.azimuth_lut = azimuth_lut or ServoLUT()
+        self.elevation_lut = elevation_lut or ServoLUT()
+        self.rms_error = rms_error
+        # IMU (north, west) tilt when the model was fitted, and the change since.
+        # The IMU poller updates them while setpoints are corrected elsewhere.
+        self.reference_tilt = None if imu_tilt is None else tuple(float(v) for v in imu_tilt)
+        self.tilt_offset = np.zeros(2)
+        self._tilt_lock = threading.Lock()
+
+    @property
+    def parameters(self) -> Dict[str, float]:
+        return {term: float(value) for term, value in zip(TERMS, self.coefficients)}
+
+    def corrections(self, azimuth, elevation):
+        """Mount corrections (degrees) to add to true azimuth and elevation"""
+        az_rows, el_rows = _design(np.asarray(azimuth, dtype=float),
+                                   np.asarray(elevation, dtype=float))
+        coefficients = self.coefficients.copy()
+        with self._tilt_lock:
+            coefficients[_TILT_TERMS] += self.tilt_offset
+        return az_rows @ coefficients, el_rows @ coefficients
+
+    def set_base_tilt(self, north: float, west: float):
+        """
+        Compensate for the base tilting after calibration
+
+        Args:
+            north, west: Current base tilt in degrees (see ``tilt_from_imu``)
+
+        A model fitted without an IMU tilt takes the first reading as its
+        reference, so only changes from then on are compensated.
+        """
+        with self._tilt_lock:
+            if self.reference_tilt is None:
+                self.reference_tilt = (float(north), float(west))
+            self.tilt_offset = np.array([north - self.reference_tilt[0], west - self.reference_tilt[1]])
+
+    def apply(self, azimuth, elevation):
+        """
+        Convert true pointing directions to servo commands
+
+        Args:
+            azimuth: True azimuth(s) in degrees
+            elevation: True elevation(s) in degrees
+
+        Returns:
+            tuple: (azimuth, elevation) commands in degrees
+        """
+        azimuth = np.asarray(azimuth, dtype=float)
+        elevation = np.asarray(elevation, dtype=float)
+        delta_az, delta_el = self.corrections(azimuth, elevation)
+        command_az = (azimuth + delta_az) % 360.0
+        command_el = elevation + delta_el
+        return (self.azimuth_lut.command_for(command_az),
+                self.elevation_lut.command_for(command_el))
+
+    @classmethod
+    def fit(cls, true_azimuth, true_elevation, commanded_azimuth, commanded_elevation,
+            imu_tilt: Optional[Sequence[float]] = None, imu_weight: float = 1.0,
+            terms: Sequence[str] = TERMS) -> "PointingModel":
+        """
+        Fit the mount model from known-target sightings
+
+        Args:
+            true_azimuth, true_elevation: Computed positions of the targets
+            commanded_azimuth, commanded_elevation: Gimbal commands that
+                actually lined the arrow up with each target
+            imu_tilt: Optional (north, west) base tilt in degrees from the
+                IMU, used as a prior on AN and AW
+            imu_weight: Weight of the IMU prior relative to one sighting
+            terms: Terms to fit; the others stay zero
+
+        Returns:
+            PointingModel: Fitted model with ``rms_error`` in degrees
+        """
+        true_az = np.asarray(true_azimuth, dtype=float)
+        true_el = np.asarray(true_elevation, dtype=float)
+        az_rows, el_rows = _design(true_az, true_el)
+
+        # Azimuth residuals are scaled by cos(E) so both axes are on-sky angles
+        cos_e = np.cos(np.radians(true_el))[:, np.newaxis]
+        residual_az = ((np.asarray(commanded_azimuth) - true_az + 180.0) % 360.0) - 180.0
+        residual_el = np.asarray(commanded_elevation) - true_el
+
+        design = np.vstack([az_rows * cos_e, el_rows])
+        observed = np.concatenate([residual_az * cos_e[:, 0], residual_el])
+        if imu_tilt is not None:
+            prior = np.zeros((2, len(TERMS)))
+            prior[0, TERMS.index("AN")] = imu_weight
+            prior[1, TERMS.index("AW")] = imu_weight
+            design = np.vstack([design, prior])
+            observed = np.concatenate([observed, imu_weight * np.asarray(imu_tilt, dtype=float)])
+
+        columns = [TERMS.index(term) for term in terms]
+        solution, _, _, _ = np.linalg.lstsq(design[:, columns], observed, rcond=None)
+        coefficients = np.zeros(len(TERMS))
+        coefficients[columns] = solution
+
+        fitted = design[:, columns] @ solution
+        n_sightings = 2 * len(true_az)
+        rms = float(np.sqrt(np.mean((observed[:n_sightings] - fitted[:n_sightings]) ** 2)))
+        logger.info(f"Fitted pointing model from {len(true_az)} sightings, RMS {rms:.3f}°")
+        return cls(dict(zip(TERMS, coefficients)), rms_error=rms, imu_tilt=imu_tilt)
+
+    @staticmethod
+    def tilt_from_imu(roll: float, pitch: float) -> tuple:
+        """
+        Base tilt (north, west) in degrees from IMU roll and pitch
+
+        Assumes the IMU x axis points along azimuth zero and its y axis
+        toward azimuth 270, so pitch tilts the azimuth axis north and roll
+        tilts it west.
+        """
+        return pitch, roll
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PointingModel":
+        """Create a model from its stored form"""
+        luts = data.get("servo_lut", {})
+        azimuth = luts.get("azimuth", {})
+        elevation = luts.get("elevation", {})
+        return cls(
+            data.get("parameters", {}),
+            ServoLUT(azimuth.get("commanded", []), azimuth.get("measured", [])),
+            ServoLUT(elevation.get("commanded", []), elevation.get("measured", [])),
+            data.get("rms_error"),
+            data.get("imu_tilt"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact storable form of the model"""
+        return {
+            "parameters": {term: round(value, 6) for term, value in self.parameters.items()},
+            "rms_error": self.rms_error,
+            "imu_tilt": None if self.reference_tilt is None else list(self.reference_tilt),
+            "servo_lut": {
+                "azimuth": {"commanded": self.azimuth_lut.commanded.tolist(),
+                            "measured": self.azimuth_lut.measured.tolist()},
+                "elevation": {"commanded": self.elevation_lut.commanded.tolist(),
+                              "measured": self.elevation_lut.measured.tolist()},
+            },
+        }
+
+    @classmethod
+    def load(cls, path) -> Optional["PointingModel"]:
+        """Load a stored model, or None if the file does not exist"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except Exception as e:
+            logger.error(f"Failed to load pointing model from {path}: {e}")
+            return None
+
+    def save(self, path):
+        """Store the model as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @staticmethod
+    def model_path(config) -> Path:
+        """Model file of a device: ``calibration.model_file`` in the config directory"""
+        return Path(config.config_path) / config.get_nested_setting(
+            "calibration", "model_file", default="calibration.json")
+
+    @classmethod
+    def from_config(cls, config) -> "PointingModel":
+        """
+        Load the model for a device
+
+        Uses ``calibration.model_file`` (relative to the config directory) if
+        it exists, otherwise the scalar offsets in settings.json.
+        """
+        model = cls.load(cls.model_path(config))
+        if model is not None:
+            return model
+        return cls({
+            "IA": config.get_nested_setting("calibration", "azimuth_offset", default=0.0),
+            "IE": config.get_nested_setting("calibration", "elevation_offset", default=0.0),
+        })
+
+
+class SightingLog:
+    """
+    Sightings captured on the device, for refitting the pointing model
+
+    Each line of the JSON-lines file is one sighting: the true azimuth and
+    elevation of a target the arrow was lined up on by hand, the servo
+    command that lined it up (after the mount model and lookup tables in
+    use at the time) and the IMU base tilt.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @classmethod
+    def from_config(cls, config) -> "SightingLog":
+        """Log at ``calibration.sightings_file``, relative to the config directory"""
+        return cls(Path(config.config_path) / config.get_nested_setting(
+            "calibration", "sightings_file", default="sightings.jsonl"))
+
+    def record(self, target: str, when: float, true_azimuth: float, true_elevation: float,
+               commanded_azimuth: float, commanded_elevation: float,
+               imu_tilt: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+        """Append one sighting"""
+        sighting = {
+            "target": target,
+            "time": when,
+            "true": [float(true_azimuth), float(true_elevation)],
+            "commanded": [float(commanded_azimuth), float(commanded_elevation)],
+            "imu_tilt": None if imu_tilt is None else [float(value) for value in imu_tilt],
+        }
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(sighting) + "\n")
+        logger.info(f"Recorded sighting of {target}")
+        return sighting
+
+    def load(self) -> List[Dict[str, Any]]:
+        """All recorded sightings, oldest first"""
+        if not self.path.exists():
+            return []
+        sightings = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    sightings.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring malformed sighting in {self.path}")
+        return sightings
+
+    def fit(self, min_sightings: int = 3, imu_weight: float = 1.0, lut_bin_degrees: float = 15.0,
+            lut_min_per_bin: int = 3) -> Optional[PointingModel]:
+        """
+        Fit a pointing model to every recorded sighting
+
+        The mount model is fitted first; what it leaves over on each axis is
+        servo nonlinearity, fitted as that axis' lookup table.
+
+        Args:
+            min_sightings: Fewest sightings to fit from (each gives two equations)
+            imu_weight: Weight of the mean IMU tilt as a prior on AN and AW
+            lut_bin_degrees: Width of the lookup table bins in degrees
+            lut_min_per_bin: Fewest sightings for a lookup table bin
+
+        Returns:
+            PointingModel: The new model, or None with too few sightings
+        """
+        sightings = self.load()
+        if len(sightings) < min_sightings:
+            logger.warning(f"{len(sightings)} sightings recorded, at least {min_sightings} needed to fit")
+            return None
+        true = np.array([sighting["true"] for sighting in sightings])
+        commanded = np.array([sighting["commanded"] for sighting in sightings])
+        tilts = [sighting["imu_tilt"] for sighting in sightings if sighting.get("imu_tilt") is not None]
+        imu_tilt = np.mean(tilts, axis=0) if tilts else None
+        model = PointingModel.fit(true[:, 0], true[:, 1], commanded[:, 0], commanded[:, 1],
+                                  imu_tilt=imu_tilt, imu_weight=imu_weight)
+
+        # Servo angles the mount model asks for; the sightings' commands
+        # reached them. The tilt offset is zero here, as it is at the fitted tilt.
+        delta_az, delta_el = model.corrections(true[:, 0], true[:, 1])
+        model.azimuth_lut = ServoLUT.fit((true[:, 0] + delta_az) % 360.0, commanded[:, 0], 0.0, 360.0,
+                                         lut_bin_degrees, lut_min_per_bin, wrap=True)
+        model.elevation_lut = ServoLUT.fit(true[:, 1] + delta_el, commanded[:, 1], -90.0, 90.0,
+                                           lut_bin_degrees, lut_min_per_bin)
+        logger.info(f"Servo lookup tables: {len(model.azimuth_lut.measured)} azimuth and "
+                    f"{len(model.elevation_lut.measured)} elevation points")
+        return model
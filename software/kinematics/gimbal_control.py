@@ -2,17 +2,33 @@
 2-DOF gimbal control with kinematics calculations
 """
 
-import time
 import math
 import logging
 from typing import Tuple, Optional
 
+import numpy as np
+
+from kinematics.trajectory import TrajectoryPlanner, shortest_azimuth_delta
+from kinematics.servo_stream import ServoStreamer
+from kinematics.calibration import PointingModel
+from utils.clock import SystemClock
+from utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 class GimbalController:
     """Controls the 2-DOF gimbal mechanism"""
     
-    def __init__(self):
+    def __init__(self, planner: Optional[TrajectoryPlanner] = None, streaming: bool = False,
+                 pointing_model: Optional[PointingModel] = None, servo=None, clock=None,
+                 output=None):
+        self.planner = planner or TrajectoryPlanner()
+        self.pointing_model = pointing_model
+        self.servo = servo
+        # Pulse-width output to the servo driver, e.g. a PCA9685Output
+        self.output = output
+        self.clock = clock or SystemClock()
+        self.streamer = ServoStreamer(self._set_servo_positions, self.planner.rate_hz) if streaming else None
         self.azimuth_angle = 0.0
         self.elevation_angle = 0.0
         self.azimuth_servo = None
@@ -25,6 +41,10 @@ class GimbalController:
             logger.info("Initializing gimbal servos...")
             # self.azimuth_servo = Servo(pin=18)
             # self.elevation_servo = Servo(pin=19)
+            if self.servo is None and self.output is not None:
+                self.output.initialize()
+            if self.streamer is not None:
+                self.streamer.start()
             logger.info("Gimbal servos initialized")
             return True
         except Exception as e:
@@ -32,7 +52,8 @@ class GimbalController:
             return False
     
     def move_to_position(self, azimuth: float, elevation: float, 
-                        smooth: bool = True, duration: float = 2.0) -> bool:
+                        smooth: bool = True, duration: Optional[float] = None,
+                        wait: bool = False) -> bool:
         """
         Move gimbal to specified azimuth and elevation
         
@@ -40,7 +61,10 @@ class GimbalController:
             azimuth: Target azimuth in degrees (0-360)
             elevation: Target elevation in degrees (-90 to 90)
             smooth: Whether to move smoothly or instantly
-            duration: Duration of smooth movement in seconds
+            duration: Minimum duration of smooth movement in seconds; by
+                default the move is as fast as the axis limits allow
+            wait: When streaming, block until the move has finished instead
+                of returning as soon as it is queued
             
         Returns:
             bool: Success status
@@ -61,6 +85,9 @@ class GimbalController:
             self.azimuth_angle = azimuth
             self.elevation_angle = elevation
             
+            if wait and self.streaming:
+                self.streamer.wait_idle()
+            
             return True
             
         except Exception as e:
@@ -75,31 +102,70 @@ class GimbalController:
         """Clamp elevation angle to -90 to 90 degrees"""
         return max(-90.0, min(90.0, angle))
     
-    def _smooth_move(self, target_az: float, target_el: float, duration: float):
-        """Move smoothly to target position"""
-        start_az = self.azimuth_angle
-        start_el = self.elevation_angle
-        
-        steps = int(duration * 50)  # 50 Hz update rate
-        step_time = duration / steps
+    @property
+    def streaming(self) -> bool:
+        """Whether setpoints go through the real-time streaming thread"""
+        return self.streamer is not None and self.streamer.running
+    
+    def _smooth_move(self, target_az: float, target_el: float, duration: Optional[float] = None):
+        """Move smoothly to target position along a planned S-curve"""
+        start_az, start_el = self.azimuth_angle, self.elevation_angle
+        if self.streaming and self.streamer.last_setpoint is not None:
+            # Start from where the servos actually are if a move is in flight
+            start_az, start_el = self.streamer.last_setpoint
         
-        for i in range(steps + 1):
-            progress = i / steps
-            
-            # Linear interpolation
-            current_az = start_az + (target_az - start_az) * progress
-            current_el = start_el + (target_el - start_el) * progress
-            
-            # Apply to servos
-            self._set_servo_positions(current_az, current_el)
-            time.sleep(step_time)
+        with metrics.timer("plan"):
+            trajectory = self.planner.plan(start_az, start_el, target_az, target_el,
+                                           min_duration=duration)
+        self._output(trajectory.azimuth, trajectory.elevation, paced=True)
     
     def _instant_move(self, azimuth: float, elevation: float):
         """Move instantly to target position"""
-        self._set_servo_positions(azimuth, elevation)
+        self._output(np.array([azimuth]), np.array([elevation]))
+    
+    def _output(self, azimuths: np.ndarray, elevations: np.ndarray, paced: bool = False):
+        """
+        Send pointing setpoints to the servos
+        
+        The pointing model corrects the whole setpoint array in one
+        vectorized call before anything is queued or written.
+        
+        Args:
+            azimuths: Azimuth setpoints in degrees
+            elevations: Elevation setpoints in degrees
+            paced: Without streaming, write at the planner rate instead of
+                only writing the first setpoint
+        """
+        if self.pointing_model is not None:
+            command_az, command_el = self.pointing_model.apply(azimuths, elevations)
+        else:
+            command_az, command_el = azimuths, elevations
+        
+        if self.streaming:
+            self.streamer.enqueue(azimuths, elevations, command_az, command_el)
+            return
+        
+        if not paced:
+            self._set_servo_positions(float(command_az[0]), float(command_el[0]))
+            return
+        
+        step_time = 1.0 / self.planner.rate_hz
+        for current_az, current_el in zip(command_az, command_el):
+            # Apply to servos
+            self._set_servo_positions(current_az, current_el)
+            self.clock.sleep(step_time)
     
     def _set_servo_positions(self, azimuth: float, elevation: float):
         """Set servo positions (hardware-specific implementation)"""
+        with metrics.timer("servo_write"):
+            self._write_servos(azimuth, elevation)
+    
+    def _write_servos(self, azimuth: float, elevation: float):
+        if self.servo is not None:
+            # Pluggable backend, e.g. a simulated servo
+            self.servo.write(azimuth, elevation)
+            return
+        
         # Convert angles to servo pulse widths
         # This is a placeholder - actual implementation depends on servo type
         
@@ -109,12 +175,13 @@ class GimbalController:
         azimuth_pulse = self._angle_to_pulse(azimuth)
         elevation_pulse = self._angle_to_pulse(elevation)
         
+        if self.output is not None:
+            # Quantized to PWM steps; unchanged channels are not rewritten
+            self.output.write(azimuth_pulse, elevation_pulse)
+            return
+        
         # Apply to servos (placeholder)
         logger.debug(f"Setting servos: Az={azimuth_pulse:.1f}ms, El={elevation_pulse:.1f}ms")
-        
-        # TODO: Implement actual servo control
-        # self.azimuth_servo.set_pulse_width(azimuth_pulse)
-        # self.elevation_servo.set_pulse_width(elevation_pulse)
     
     def _angle_to_pulse(self, angle: float) -> float:
         """Convert angle to servo pulse width in milliseconds"""
@@ -126,12 +193,63 @@ class GimbalController:
         
         return pulse_width
     
+    def follow(self, azimuth: float, elevation: float, azimuth_rate: float,
+               elevation_rate: float, duration: float) -> bool:
+        """
+        Track a moving direction with a constant-rate ramp
+        
+        Args:
+            azimuth: Azimuth at the start of the ramp in degrees
+            elevation: Elevation at the start of the ramp in degrees
+            azimuth_rate: Azimuth rate in degrees per second
+            elevation_rate: Elevation rate in degrees per second
+            duration: Length of the ramp in seconds, normally the time until
+                the next tracking update replaces it
+            
+        Returns:
+            bool: Success status
+        """
+        try:
+            steps = max(1, int(round(duration * self.planner.rate_hz)))
+            elapsed = np.arange(steps) / self.planner.rate_hz
+            azimuths = (azimuth + azimuth_rate * elapsed) % 360.0
+            elevations = np.clip(elevation + elevation_rate * elapsed, -90.0, 90.0)
+            
+            if not self.streaming:
+                azimuths, elevations = azimuths[:1], elevations[:1]
+            self._output(azimuths, elevations)
+            
+            self.azimuth_angle = float(azimuths[-1])
+            self.elevation_angle = float(elevations[-1])
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to follow target: {e}")
+            return False
+    
+    def distance_to(self, azimuth: float, elevation: float) -> float:
+        """Largest per-axis angle between the commanded position and a direction"""
+        current_az, current_el = self.get_current_position()
+        return max(abs(shortest_azimuth_delta(current_az, azimuth)), abs(elevation - current_el))
+    
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until any streamed move has finished"""
+        if self.streaming:
+            return self.streamer.wait_idle(timeout)
+        return True
+    
     def get_current_position(self) -> Tuple[float, float]:
         """Get current gimbal position"""
+        if self.streaming and self.streamer.last_setpoint is not None:
+            return self.streamer.last_setpoint
         return self.azimuth_angle, self.elevation_angle
     
     def cleanup(self):
         """Clean up resources"""
         logger.info("Cleaning up gimbal controller...")
         # Stop servos in center position
-        self.move_to_position(0, 0, smooth=False)
+        self.move_to_position(0, 0, smooth=False, wait=True)
+        if self.streamer is not None:
+            self.streamer.stop()
+        if self.output is not None:
+            logger.info(f"Servo output: {self.output.get_stats()}")
@@ -0,0 +1,209 @@
+"""
+Real-time servo setpoint streaming on a dedicated thread
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the wake-up lateness histogram, in microseconds
+JITTER_BINS_US = np.array([50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, np.inf])
+
+
+class SetpointRingBuffer:
+    """
+    Single-producer, single-consumer ring buffer of setpoint rows
+
+    Each row holds the pointing direction (azimuth, elevation) and the
+    servo command for it (command azimuth, command elevation).
+
+    Storage is one preallocated NumPy array. The producer only advances
+    ``_head`` and the consumer only advances ``_tail``; each index is a plain
+    int written by one thread, so no lock is needed. ``flush`` asks the
+    consumer to skip everything written so far instead of touching ``_tail``.
+    """
+
+    def __init__(self, capacity: int = 4096, width: int = 4):
+        self._data = np.zeros((capacity, width))
+        self._capacity = capacity
+        self._head = 0
+        self._tail = 0
+        self._flush_to = 0
+
+    def __len__(self) -> int:
+        return self._head - max(self._tail, self._flush_to)
+
+    def push(self, *columns: np.ndarray) -> int:
+        """
+        Append setpoints, one array per column (producer side)
+
+        Returns:
+            int: Number of setpoints accepted; the rest are dropped if full
+        """
+        count = min(len(columns[0]), self._capacity - len(self))
+        index = (self._head + np.arange(count)) % self._capacity
+        for column, values in enumerate(columns):
+            self._data[index, column] = values[:count]
+        self._head += count
+        return count
+
+    def flush(self):
+        """Discard all queued setpoints (producer side)"""
+        self._flush_to = self._head
+
+    def pop(self) -> Optional[Tuple[float, ...]]:
+        """Take the oldest setpoint row, or None if empty (consumer side)"""
+        tail = max(self._tail, self._flush_to)
+        if tail >= self._head:
+            self._tail = tail
+            return None
+        row = tuple(float(value) for value in self._data[tail % self._capacity])
+        self._tail = tail + 1
+        return row
+
+
+class ServoStreamer:
+    """
+    Writes queued setpoints to the servos at a fixed rate on its own thread
+
+    The loop sleeps until absolute deadlines on the monotonic clock, so time
+    spent writing does not accumulate into the period. A tick that wakes
+    more than one period late is counted as an overrun and the schedule is
+    re-anchored rather than bursting to catch up. Wake-up lateness is kept in
+    a histogram for jitter reporting.
+    """
+
+    def __init__(self, write: Callable[[float, float], None], rate_hz: float = 50.0,
+                 capacity: int = 4096):
+        self.write = write
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.buffer = SetpointRingBuffer(capacity)
+        self.last_setpoint: Optional[Tuple[float, float]] = None
+
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+
+        self.ticks = 0
+        self.overruns = 0
+        self.dropped = 0
+        self.max_lateness = 0.0
+        self.jitter_histogram = np.zeros(len(JITTER_BINS_US), dtype=np.int64)
+
+    def start(self):
+        """Start the streaming thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="servo-stream", daemon=True)
+        self._thread.start()
+        logger.info(f"Servo streaming started at {self.rate_hz:.0f} Hz")
+
+    def stop(self, timeout: float = 1.0):
+        """Stop the streaming thread"""
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def enqueue(self, azimuth: np.ndarray, elevation: np.ndarray,
+                command_azimuth: Optional[np.ndarray] = None,
+                command_elevation: Optional[np.ndarray] = None, replace: bool = True):
+        """
+        Queue a trajectory and return immediately
+
+        Args:
+            azimuth: Azimuth setpoints in degrees
+            elevation: Elevation setpoints in degrees
+            command_azimuth: Servo commands for the azimuth setpoints if they
+                differ (e.g. after pointing corrections)
+            command_elevation: Servo commands for the elevation setpoints
+            replace: Drop setpoints still queued from a previous trajectory
+        """
+        azimuth = np.asarray(azimuth, dtype=float)
+        elevation = np.asarray(elevation, dtype=float)
+        if command_azimuth is None:
+            command_azimuth, command_elevation = azimuth, elevation
+        if replace:
+            self.buffer.flush()
+        self._idle.clear()
+        accepted = self.buffer.push(azimuth, elevation,
+                                    np.broadcast_to(command_azimuth, azimuth.shape),
+                                    np.broadcast_to(command_elevation, elevation.shape))
+        self.dropped += len(azimuth) - accepted
+        self._wakeup.set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued setpoint has been written"""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if end is None else max(0.0, end - time.monotonic())
+            if not self._idle.wait(remaining):
+                return False
+            if len(self.buffer) == 0:
+                return True
+            time.sleep(self.period)
+
+    def _run(self):
+        deadline = time.monotonic()
+        while self._running:
+            setpoint = self.buffer.pop()
+            if setpoint is None:
+                # Nothing to stream: sleep until woken and restart the schedule
+                self._idle.set()
+                self._wakeup.wait()
+                self._wakeup.clear()
+                deadline = time.monotonic()
+                continue
+
+            azimuth, elevation, command_azimuth, command_elevation = setpoint
+            try:
+                self.write(command_azimuth, command_elevation)
+                self.last_setpoint = (azimuth, elevation)
+            except Exception as e:
+                logger.error(f"Servo write failed: {e}")
+
+            deadline += self.period
+            now = time.monotonic()
+            if deadline > now:
+                time.sleep(deadline - now)
+            now = time.monotonic()
+
+            lateness = now - deadline
+            self.ticks += 1
+            self.max_lateness = max(self.max_lateness, lateness)
+            self.jitter_histogram[np.searchsorted(JITTER_BINS_US, max(lateness, 0.0) * 1e6)] += 1
+            metrics.observe("servo_tick_lateness", max(lateness, 0.0))
+            if lateness > self.period:
+                self.overruns += 1
+                metrics.increment("servo_overruns")
+                deadline = now
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tick, overrun and jitter statistics"""
+        histogram = {f"<={int(edge)}us" if np.isfinite(edge) else ">50000us": int(count)
+                     for edge, count in zip(JITTER_BINS_US, self.jitter_histogram)}
+        return {
+            "rate_hz": self.rate_hz,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "dropped": self.dropped,
+            "queued": len(self.buffer),
+            "max_lateness_ms": self.max_lateness * 1000.0,
+            "jitter_histogram": histogram,
+        }
@@ -0,0 +1,179 @@
+"""
+Time-optimal, jerk-limited trajectory planning for the 2-DOF gimbal
+"""
+
+import math
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AxisLimits:
+    """Kinematic limits for one gimbal axis (degrees, seconds)"""
+
+    def __init__(self, max_velocity: float = 120.0, max_acceleration: float = 240.0,
+                 max_jerk: Optional[float] = 1200.0):
+        self.max_velocity = max_velocity
+        self.max_acceleration = max_acceleration
+        self.max_jerk = max_jerk
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AxisLimits":
+        """Create limits from a settings.json ``motion`` axis section"""
+        return cls(
+            max_velocity=data.get("max_velocity_dps", 120.0),
+            max_acceleration=data.get("max_acceleration_dps2", 240.0),
+            max_jerk=data.get("max_jerk_dps3", 1200.0),
+        )
+
+    def jerk_time(self) -> float:
+        """Time to ramp acceleration from zero to its limit"""
+        if not self.max_jerk:
+            return 0.0
+        return self.max_acceleration / self.max_jerk
+
+    def trapezoid_time(self, distance: float) -> float:
+        """Minimum time to cover a distance with a trapezoidal velocity profile"""
+        distance = abs(distance)
+        v, a = self.max_velocity, self.max_acceleration
+        if distance <= v * v / a:
+            return 2.0 * math.sqrt(distance / a)
+        return distance / v + v / a
+
+
+class Trajectory:
+    """Precomputed setpoints for a synchronized two-axis move"""
+
+    def __init__(self, times: np.ndarray, azimuth: np.ndarray, elevation: np.ndarray):
+        self.times = times
+        self.azimuth = azimuth
+        self.elevation = elevation
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def shortest_azimuth_delta(start: float, target: float) -> float:
+    """Signed azimuth change in (-180, 180] that reaches the target"""
+    delta = (target - start + 180.0) % 360.0 - 180.0
+    return 180.0 if delta == -180.0 else delta
+
+
+class TrajectoryPlanner:
+    """
+    Plans S-curve moves for both gimbal axes
+
+    Each axis gets the fastest trapezoidal velocity profile its velocity and
+    acceleration limits allow. The slower axis sets the move duration and the
+    faster one is slowed to finish at the same time. Both velocity profiles
+    are then smoothed by a moving average as long as the slowest acceleration
+    ramp, which bounds jerk without changing the distance travelled. The whole
+    setpoint array is generated up front.
+    """
+
+    def __init__(self, azimuth_limits: Optional[AxisLimits] = None,
+                 elevation_limits: Optional[AxisLimits] = None, rate_hz: float = 50.0):
+        self.azimuth_limits = azimuth_limits or AxisLimits()
+        self.elevation_limits = elevation_limits or AxisLimits()
+        self.rate_hz = rate_hz
+
+    @classmethod
+    def from_config(cls, config) -> "TrajectoryPlanner":
+        """Create a planner from the ``motion`` section of settings.json"""
+        return cls(
+            AxisLimits.from_dict(config.get_nested_setting("motion", "azimuth", default={})),
+            AxisLimits.from_dict(config.get_nested_setting("motion", "elevation", default={})),
+            rate_hz=config.get_nested_setting("motion", "rate_hz", default=50.0),
+        )
+
+    def move_time(self, start_az: float, start_el: float, target_az: float,
+                  target_el: float) -> float:
+        """Approximate duration in seconds of ``plan`` for the same move"""
+        jerk_time = max(self.azimuth_limits.jerk_time(), self.elevation_limits.jerk_time())
+        return jerk_time + max(
+            self.azimuth_limits.trapezoid_time(shortest_azimuth_delta(start_az, target_az)),
+            self.elevation_limits.trapezoid_time(target_el - start_el))
+
+    def plan(self, start_az: float, start_el: float, target_az: float, target_el: float,
+             min_duration: Optional[float] = None) -> Trajectory:
+        """
+        Plan a move between two pointing directions
+
+        Args:
+            start_az: Current azimuth in degrees
+            start_el: Current elevation in degrees
+            target_az: Target azimuth in degrees (wrapped the short way)
+            target_el: Target elevation in degrees
+            min_duration: Optional lower bound on the move duration in seconds
+
+        Returns:
+            Trajectory: Setpoints at ``rate_hz``, azimuth in 0-360
+        """
+        dt = 1.0 / self.rate_hz
+        delta_az = shortest_azimuth_delta(start_az, target_az)
+        delta_el = target_el - start_el
+
+        jerk_time = max(self.azimuth_limits.jerk_time(), self.elevation_limits.jerk_time())
+        duration = max(self.azimuth_limits.trapezoid_time(delta_az),
+                       self.elevation_limits.trapezoid_time(delta_el))
+        if min_duration is not None:
+            duration = max(duration, min_duration - jerk_time)
+
+        if duration < dt:
+            return Trajectory(np.array([0.0]), np.array([target_az % 360.0]),
+                              np.array([float(target_el)]))
+
+        cruise_az = self._cruise_velocity(delta_az, duration, self.azimuth_limits)
+        cruise_el = self._cruise_velocity(delta_el, duration, self.elevation_limits)
+
+        # A moving average of length a/j turns each acceleration step into a
+        # ramp at the jerk limit. When an axis goes straight from accelerating
+        # to decelerating the step is 2a, so the filter has to be twice as long.
+        for distance, cruise, limits in ((delta_az, cruise_az, self.azimuth_limits),
+                                         (delta_el, cruise_el, self.elevation_limits)):
+            if distance and duration - 2.0 * cruise / limits.max_acceleration < jerk_time:
+                jerk_time = max(jerk_time, 2.0 * limits.jerk_time())
+
+        steps = int(math.ceil(duration / dt))
+        midpoints = (np.arange(steps) + 0.5) * dt
+        filter_length = max(1, int(round(jerk_time / dt)))
+
+        azimuth = self._axis_positions(start_az, delta_az, duration, cruise_az, midpoints,
+                                       self.azimuth_limits, filter_length, dt)
+        elevation = self._axis_positions(start_el, delta_el, duration, cruise_el, midpoints,
+                                         self.elevation_limits, filter_length, dt)
+        times = np.arange(len(azimuth)) * dt
+        return Trajectory(times, azimuth % 360.0, elevation)
+
+    def _cruise_velocity(self, distance: float, duration: float, limits: AxisLimits) -> float:
+        """Cruise velocity of the trapezoid that covers a distance in exactly ``duration``"""
+        a = limits.max_acceleration
+        discriminant = max(0.0, a * a * duration * duration - 4.0 * a * abs(distance))
+        return min(limits.max_velocity, (a * duration - math.sqrt(discriminant)) / 2.0)
+
+    def _axis_positions(self, start: float, distance: float, duration: float, cruise: float,
+                        midpoints: np.ndarray, limits: AxisLimits,
+                        filter_length: int, dt: float) -> np.ndarray:
+        """Sample one axis' position for a trapezoid stretched to ``duration``"""
+        if distance == 0.0:
+            return np.full(len(midpoints) + filter_length, float(start))
+
+        a = limits.max_acceleration
+        velocity = np.minimum.reduce([
+            np.full_like(midpoints, cruise),
+            a * midpoints,
+            a * (duration - midpoints),
+        ]).clip(min=0.0)
+        if filter_length > 1:
+            velocity = np.convolve(velocity, np.ones(filter_length) / filter_length)
+
+        travelled = np.concatenate([[0.0], np.cumsum(velocity) * dt])
+        travelled *= abs(distance) / travelled[-1]
+        return start + math.copysign(1.0, distance) * travelled
@@ -4,16 +4,31 @@ anywharrow - Main control program
 A desktop device that points to any location in the universe
 """
 
-import time
 import json
+import math
+import queue
+import asyncio
 import logging
+import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from positioning.astronomy import AstronomyCalculator
+from positioning.pointing_cache import PointingCache
 from kinematics.gimbal_control import GimbalController
+from kinematics.trajectory import TrajectoryPlanner, shortest_azimuth_delta
+from kinematics.calibration import PointingModel, SightingLog
+from planning.scheduler import TargetScheduler
+from planning.events import EventEngine
+from planning.precompute import PointingTable, TableSolver, build_table
 from hardware.display import DisplayController
+from hardware.servo_output import PCA9685Output
+from hardware.i2c_bus import I2CBusManager, SERVO_PRIORITY, IMU_PRIORITY, DISPLAY_PRIORITY
 from hardware.imu import IMUController
+from hardware.async_adapter import AsyncDevice
 from utils.config import ConfigManager
+from utils.clock import SystemClock
+from utils.metrics import metrics, MetricsServer, SummaryWriter, SamplingProfiler
 
 # Set up logging
 logging.basicConfig(
@@ -25,51 +40,423 @@ logger = logging.getLogger(__name__)
 class AnywharrowController:
     """Main controller for the anywharrow device"""
     
-    def __init__(self, config_path="config"):
+    def __init__(self, config_path="config", clock=None, servo=None,
+                 display_backend=None, imu_device=None):
+        """
+        Args:
+            config_path: Configuration directory
+            clock: Time source; a simulated clock runs the loop faster than
+                real time
+            servo, display_backend, imu_device: Hardware backends to use
+                instead of the real drivers (see ``simulation.backends``)
+        """
         self.config = ConfigManager(config_path)
-        self.astronomy = AstronomyCalculator()
-        self.gimbal = GimbalController()
-        self.display = DisplayController()
-        self.imu = IMUController()
+        self.clock = clock or SystemClock()
+        # Servo driver, IMU and display share one I2C bus
+        self.i2c_bus = I2CBusManager.from_config(self.config)
+        self.astronomy = AstronomyCalculator.from_config(self.config)
+        # Nightly precomputed positions, used while they cover the current time
+        self.pointing_table = None
+        self.pointing_table_path = None
+        self._pointing_table_mtime = None
+        if self.config.get_nested_setting("precompute", "enabled", default=True):
+            self.pointing_table_path = self.precompute_path(self.config)
+        self.pointing_cache = None
+        if self.config.get_nested_setting("pointing_cache", "enabled", default=True):
+            self.pointing_cache = PointingCache.from_config(self.astronomy, self.config)
+        self.gimbal = GimbalController(
+            TrajectoryPlanner.from_config(self.config),
+            # The streaming thread runs on the wall clock
+            streaming=(self.config.get_nested_setting("motion", "streaming", default=True)
+                       and not self.clock.simulated),
+            pointing_model=PointingModel.from_config(self.config),
+            servo=servo,
+            clock=self.clock,
+            output=None if servo is not None else PCA9685Output.from_config(
+                self.config, self._bus_device("servo", SERVO_PRIORITY)),
+        )
+        self.display = DisplayController(
+            width=self.config.get_nested_setting("display", "width", default=128),
+            height=self.config.get_nested_setting("display", "height", default=64),
+            address=int(self.config.get_nested_setting("hardware", "display_i2c_address", default="0x3c"), 16),
+            backend=display_backend,
+            # SSD1306 command (0x00) and data (0x40) streams can be merged
+            i2c=self._bus_device("display", DISPLAY_PRIORITY, background=True,
+                                 coalesce=(0x00, 0x40)),
+        )
+        self.imu = IMUController(
+            sample_rate_hz=self.config.get_nested_setting("imu", "sample_rate_hz", default=200.0),
+            buffer_size=self.config.get_nested_setting("imu", "buffer_size", default=1024),
+            alpha=self.config.get_nested_setting("imu", "filter_alpha", default=0.98),
+            device=imu_device,
+            i2c=self._bus_device("imu", IMU_PRIORITY),
+            address=int(self.config.get_nested_setting("hardware", "imu_i2c_address", default="0x68"), 16),
+        )
+        # Correct setpoints for the base tilt the IMU measures
+        self.tilt_compensation = self.config.get_nested_setting(
+            "calibration", "imu_tilt_compensation", default=True)
+        self.sightings = SightingLog.from_config(self.config)
         
         self.current_target_index = 0
         self.targets = self.config.get_targets()
+        self.scheduler = None
+        self.events = None
+        max_scheduled = self.config.get_nested_setting("scheduling", "max_targets", default=2000)
+        if len(self.targets) > max_scheduled:
+            # Batch-solving a whole large catalog would defeat lazy loading
+            logger.info(f"{len(self.targets)} targets exceed scheduling.max_targets, using round robin")
+        else:
+            # Planning reads the pointing table too, solving live what it misses
+            solver = self.astronomy
+            if self.pointing_table_path is not None:
+                solver = TableSolver(self.astronomy, self._table_covering)
+            if self.config.get_nested_setting("scheduling", "enabled", default=True):
+                self.scheduler = TargetScheduler.from_config(
+                    solver, self.gimbal.planner, self.config, self.targets)
+            if self.config.get_nested_setting("events", "enabled", default=True):
+                self.events = EventEngine.from_config(solver, self.config, self.targets)
+        # Passes of these types interrupt the rotation, once per pass
+        self.interrupt_types = self.config.get_nested_setting("events", "interrupt_types", default=["satellite"])
+        self._visited_passes = set()
+        
+        # Metrics endpoint, periodic summary and profiler, all off by default
+        metrics.enabled = self.config.get_nested_setting("metrics", "enabled", default=False)
+        self.metrics_server = None
+        self.metrics_summary = None
+        self.profiler = None
         
+        # Target file edits arrive on the watcher thread and are applied
+        # by the control loop between targets
+        self._target_changes = queue.SimpleQueue()
+        self.config.store.subscribe(
+            lambda added, removed, changed: self._target_changes.put((added, removed, changed)))
+        
+        # Continuous tracking during the dwell
+        self.tracking_enabled = self.config.get_nested_setting("tracking", "enabled", default=True)
+        self.tracked_types = self.config.get_nested_setting(
+            "tracking", "types", default=["planet", "star", "satellite", "deep_space"])
+        self.tracking_step = self.config.get_nested_setting("tracking", "step_degrees", default=0.1)
+        self.tracking_min_rate = self.config.get_nested_setting("tracking", "min_rate_hz", default=0.05)
+        self.tracking_max_rate = self.config.get_nested_setting("tracking", "max_rate_hz", default=20.0)
+        self.tracking_latency = self.config.get_nested_setting("tracking", "latency_seconds", default=0.1)
+        self.tracking_max_jump = self.config.get_nested_setting("tracking", "max_jump_degrees", default=1.0)
+        
+    def _bus_device(self, name, priority, **options):
+        """Handle on the shared I2C bus, or None to let the device open its own"""
+        if self.i2c_bus is None:
+            return None
+        return self.i2c_bus.device(name, priority, **options)
+    
     def initialize(self):
         """Initialize all hardware components"""
         logger.info("Initializing anywharrow...")
         
         try:
+            if self.i2c_bus is not None:
+                self.i2c_bus.start()
             self.gimbal.initialize()
             self.display.initialize()
             self.imu.initialize()
+            self._start_metrics()
+            if self.config.get_nested_setting("target_store", "watch", default=True):
+                self.config.store.start_watching(
+                    self.config.get_nested_setting("target_store", "watch_interval_seconds", default=2.0))
             logger.info("Hardware initialization complete")
             return True
         except Exception as e:
             logger.error(f"Hardware initialization failed: {e}")
             return False
     
+    def _start_metrics(self):
+        """Start the configured metrics exporters"""
+        if not metrics.enabled:
+            return
+        port = self.config.get_nested_setting("metrics", "port", default=9108)
+        if port is not None:
+            self.metrics_server = MetricsServer(
+                metrics, self.config.get_nested_setting("metrics", "host", default="127.0.0.1"), port)
+            self.metrics_server.start()
+        summary_file = self.config.get_nested_setting("metrics", "summary_file", default=None)
+        if summary_file:
+            self.metrics_summary = SummaryWriter(
+                summary_file, metrics,
+                self.config.get_nested_setting("metrics", "summary_interval_seconds", default=60))
+            self.metrics_summary.start()
+        if self.config.get_nested_setting("metrics", "profiler", default=False):
+            self.profiler = SamplingProfiler(
+                self.config.get_nested_setting("metrics", "profiler_interval_ms", default=5) / 1000.0)
+            self.profiler.start()
+    
+    def _stop_metrics(self):
+        """Stop the metrics exporters, writing out final results"""
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler.write(self.config.get_nested_setting(
+                "metrics", "profile_file", default="profile.folded"))
+        if self.metrics_summary is not None:
+            self.metrics_summary.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+    
+    def apply_target_changes(self):
+        """Apply target file changes reported by the store since the last call"""
+        while True:
+            try:
+                added, removed, changed = self._target_changes.get_nowait()
+            except queue.Empty:
+                return
+            
+            self.targets = self.config.get_targets()
+            self.current_target_index %= max(1, len(self.targets))
+            for target in removed + changed:
+                if self.pointing_cache is not None:
+                    self.pointing_cache.invalidate(target)
+                if self.scheduler is not None:
+                    self.scheduler.remove_target(target["name"])
+            if self.scheduler is not None:
+                for target in changed + added:
+                    self.scheduler.add_target(target)
+            if self.events is not None:
+                self.events.set_targets(self.targets)
+            logger.info(f"Targets updated: {len(added)} added, {len(removed)} removed, "
+                        f"{len(changed)} changed")
+    
     def get_next_target(self):
         """Get the next target in the rotation"""
+        self.apply_target_changes()
+        target = self._next_pass_target(self.clock.time())
+        if target is not None:
+            return target
+        if self.scheduler is not None:
+            target = self.scheduler.next_target(self.clock.time(), *self.gimbal.get_current_position())
+            if target is not None:
+                return target
+        
+        # Round robin when not scheduling or nothing is observable
         target = self.targets[self.current_target_index]
         self.current_target_index = (self.current_target_index + 1) % len(self.targets)
         return target
     
-    def calculate_target_position(self, target):
+    def _next_pass_target(self, when):
+        """A target of an interrupting type whose current pass has not been visited yet"""
+        if self.events is None or not self.interrupt_types:
+            return None
+        for current in self.events.passes_at(when):
+            target = self.events.targets[current.index]
+            key = (target["name"], current.start)
+            if target["type"] in self.interrupt_types and key not in self._visited_passes:
+                self._visited_passes.add(key)
+                logger.info(f"{target['name']} is passing, max elevation {current.max_elevation:.1f}°")
+                return target
+        return None
+    
+    def visible_targets(self, when=None):
+        """
+        Targets above their minimum elevation
+        
+        Args:
+            when: Unix timestamp, defaults to now
+            
+        Returns:
+            list: Target dictionaries
+        """
+        when = self.clock.time() if when is None else when
+        if self.events is not None:
+            return self.events.visible(when)
+        azimuth, elevation = self.plan_positions([when])
+        return [target for target, value in zip(self.targets, elevation[:, 0]) if value >= 0.0]
+    
+    def passing_targets(self, when=None):
+        """
+        Targets of the interrupting types (satellites by default) currently passing
+        
+        Returns:
+            list: (target, Pass) tuples
+        """
+        if self.events is None:
+            return []
+        when = self.clock.time() if when is None else when
+        return [(self.events.targets[current.index], current) for current in self.events.passes_at(when)
+                if self.events.targets[current.index]["type"] in self.interrupt_types]
+    
+    def calculate_target_position(self, target, when=None):
         """Calculate the position of a target relative to the device"""
+        with metrics.timer("solve", type=target["type"]):
+            return self._solve_target_position(target, when)
+    
+    @staticmethod
+    def precompute_path(config):
+        """Location of the precomputed pointing table"""
+        return Path(config.get_nested_setting("ephemeris", "data_directory", default=None) or "data") / \
+            config.get_nested_setting("precompute", "table_file", default="pointing.ptb")
+    
+    def _table_covering(self, when):
+        """
+        The precomputed table if it covers ``when``
+        
+        The file is reopened when it changes on disk, so a nightly rebuild
+        is picked up without restarting. Returns None when there is no
+        usable table, in which case positions are solved live.
+        """
+        table = self.pointing_table
+        if table is not None and table.covers(when):
+            return table
+        if self.pointing_table_path is None:
+            return None
+        try:
+            mtime = self.pointing_table_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if mtime == self._pointing_table_mtime:
+            return None
+        
+        self._pointing_table_mtime = mtime
+        table = PointingTable.open(self.pointing_table_path)
+        if table is not None and not table.matches_location(
+                self.astronomy.latitude, self.astronomy.longitude, self.astronomy.altitude):
+            logger.warning(f"Pointing table {self.pointing_table_path} is for another location, ignoring it")
+            table = None
+        elif table is not None and not table.matches_precision(self.astronomy):
+            logger.warning(f"Pointing table {self.pointing_table_path} was built with other precision "
+                           f"settings, ignoring it")
+            table = None
+        self.pointing_table = table
+        if table is None:
+            return None
+        if not table.covers(when):
+            logger.warning(f"Pointing table {self.pointing_table_path} is stale, solving live")
+            return None
+        logger.info(f"Using pointing table with {len(table)} targets from {self.pointing_table_path}")
+        return table
+    
+    def _solve_target_position(self, target, when=None):
+        moment = self.clock.time() if when is None else when
+        table = self._table_covering(moment)
+        if table is not None:
+            azimuth, elevation = table.get_position(target, moment)
+            if azimuth is not None:
+                return azimuth, elevation
+        
+        if self.pointing_cache is not None and target["type"] in [
+                "earth_location", "planet", "star", "satellite", "deep_space"]:
+            return self.pointing_cache.get_position(target, moment)
+        
         if target["type"] == "earth_location":
             return self.astronomy.calculate_earth_location_azimuth_elevation(
-                target["latitude"], target["longitude"]
+                target["latitude"], target["longitude"], altitude=target.get("altitude", 0.0)
             )
         elif target["type"] in ["planet", "star", "satellite", "deep_space"]:
-            return self.astronomy.calculate_celestial_azimuth_elevation(target["name"])
+            return self.astronomy.calculate_celestial_azimuth_elevation(
+                target["name"], moment, ra_hours=target.get("ra_hours"),
+                dec_degrees=target.get("dec_degrees"), target_type=target["type"],
+                norad_id=target.get("norad_id"))
         else:
             logger.warning(f"Unknown target type: {target['type']}")
             return None, None
     
+    def calculate_target_motion(self, target, when=None, step=1.0):
+        """
+        Calculate the position and angular rates of a target
+        
+        Args:
+            target: Target dictionary
+            when: Unix timestamp, defaults to now
+            step: Finite difference step in seconds
+            
+        Returns:
+            tuple: (azimuth, elevation, azimuth_rate, elevation_rate) in
+                degrees and degrees per second, or None
+        """
+        when = self.clock.time() if when is None else when
+        before = self.calculate_target_position(target, when - step / 2.0)
+        after = self.calculate_target_position(target, when + step / 2.0)
+        if None in before or None in after:
+            return None
+        
+        azimuth_rate = shortest_azimuth_delta(before[0], after[0]) / step
+        elevation_rate = (after[1] - before[1]) / step
+        azimuth = (before[0] + azimuth_rate * step / 2.0) % 360.0
+        elevation = (before[1] + after[1]) / 2.0
+        return azimuth, elevation, azimuth_rate, elevation_rate
+    
+    def track_step(self, target):
+        """
+        Re-aim at a moving target using its predicted position
+        
+        The target is predicted ``latency_seconds`` ahead to cover servo lag,
+        and the gimbal follows it at the target's own angular rate until the
+        next update. Updates come often enough that the target moves about
+        ``step_degrees`` between them, within the configured rate limits.
+        
+        Returns:
+            float: Seconds until the next tracking update
+        """
+        self.update_tilt()
+        motion = self.calculate_target_motion(target, self.clock.time() + self.tracking_latency)
+        if motion is None:
+            return 1.0 / self.tracking_min_rate
+        
+        azimuth, elevation, azimuth_rate, elevation_rate = motion
+        speed = math.hypot(azimuth_rate * math.cos(math.radians(elevation)), elevation_rate)
+        rate = min(self.tracking_max_rate, max(self.tracking_min_rate, speed / self.tracking_step))
+        period = 1.0 / rate
+        
+        if self.gimbal.distance_to(azimuth, elevation) > self.tracking_max_jump:
+            # Too far off to follow directly: slew there first
+            self.gimbal.move_to_position(azimuth, elevation, wait=True)
+        else:
+            self.gimbal.follow(azimuth, elevation, azimuth_rate, elevation_rate, period)
+        return period
+    
+    def dwell_time(self, target):
+        """Seconds to stay on a target"""
+        interval = self.config.get_nested_setting("behavior", "update_interval_seconds", default=60)
+        return target.get("dwell_seconds", interval)
+    
+    def dwell(self, target, interval):
+        """Stay on a target for the update interval, tracking it if it moves"""
+        if not self.tracking_enabled or target["type"] not in self.tracked_types:
+            self.clock.sleep(interval)
+            return
+        
+        end = self.clock.monotonic() + interval
+        self.gimbal.wait_until_idle(interval)
+        while True:
+            remaining = end - self.clock.monotonic()
+            if remaining <= 0:
+                break
+            self.clock.sleep(min(self.track_step(target), remaining))
+    
+    def plan_positions(self, times):
+        """
+        Precompute positions for every configured target over many times
+        
+        Args:
+            times: Times to solve for (see ``AstronomyCalculator.to_time``)
+            
+        Returns:
+            tuple: (azimuth, elevation) arrays of shape (len(targets), len(times))
+        """
+        return self.astronomy.calculate_batch_azimuth_elevation(self.targets, times)
+    
+    def update_tilt(self, orientation=None):
+        """
+        Pass the current base tilt to the pointing model
+        
+        Args:
+            orientation: (roll, pitch, yaw) in degrees, read from the IMU if
+                not given
+        """
+        if not self.tilt_compensation or not self.imu.has_sensor or self.gimbal.pointing_model is None:
+            return
+        roll, pitch, _ = orientation or self.imu.get_orientation()
+        if roll is not None:
+            self.gimbal.pointing_model.set_base_tilt(*PointingModel.tilt_from_imu(roll, pitch))
+    
     def move_to_target(self, target):
         """Move the gimbal to point at the specified target"""
-        azimuth, elevation = self.calculate_target_position(target)
+        self.update_tilt()
+        azimuth, elevation = self.calculate_target_position(target, self.clock.time())
         
         if azimuth is None or elevation is None:
             logger.error(f"Could not calculate position for target: {target['name']}")
@@ -87,6 +474,106 @@ class AnywharrowController:
         
         return success
     
+    def record_sighting(self, target, offset=(0.0, 0.0)):
+        """
+        Log the current pointing as a sighting of a target
+        
+        Args:
+            target: Target the arrow is lined up on
+            offset: (azimuth, elevation) nudge in degrees from the target's
+                computed position that lined the arrow up
+            
+        Returns:
+            dict: The sighting, or None if the target cannot be solved
+        """
+        when = self.clock.time()
+        true_az, true_el = self.calculate_target_position(target, when)
+        if true_az is None or true_el is None:
+            return None
+        setpoint_az, setpoint_el = (true_az + offset[0]) % 360.0, true_el + offset[1]
+        # What the servos were sent
+        command_az, command_el = (setpoint_az, setpoint_el) if self.gimbal.pointing_model is None else \
+            self.gimbal.pointing_model.apply(setpoint_az, setpoint_el)
+        tilt = None
+        roll, pitch, _ = self.imu.get_orientation()
+        if self.imu.has_sensor and roll is not None:
+            tilt = PointingModel.tilt_from_imu(roll, pitch)
+        return self.sightings.record(target["name"], when, true_az, true_el,
+                                     float(command_az) % 360.0, float(command_el), tilt)
+    
+    def refit_pointing_model(self):
+        """
+        Fit the pointing model to every logged sighting, save it and use it
+        
+        Returns:
+            PointingModel: The new model, or None with too few sightings
+        """
+        model = self.sightings.fit()
+        if model is None:
+            return None
+        path = PointingModel.model_path(self.config)
+        model.save(path)
+        self.gimbal.pointing_model = model
+        logger.info(f"Pointing model saved to {path}, RMS {model.rms_error:.3f}°")
+        return model
+    
+    def calibrate(self, read=input, step=0.5, min_elevation=10.0):
+        """
+        Interactive sighting session on the command line
+        
+        Visible targets are pointed at one after another. Nudge the arrow
+        onto each one and record it; the pointing model is refitted and
+        saved from all logged sightings when the session ends. Commands:
+        
+            a / d [degrees]   nudge azimuth down / up (default ``step``)
+            s / w [degrees]   nudge elevation down / up
+            ok                record a sighting and go to the next target
+            skip              go to the next target
+            fit               refit and save the model now
+            quit              refit and save if anything was recorded, and exit
+        
+        Args:
+            read: Prompt function returning one command line
+            step: Default nudge in degrees
+            min_elevation: Lowest target elevation to offer
+        """
+        if not self.initialize():
+            logger.error("Failed to initialize hardware. Exiting.")
+            return
+        nudges = {"a": (-1.0, 0.0), "d": (1.0, 0.0), "s": (0.0, -1.0), "w": (0.0, 1.0)}
+        recorded = 0
+        try:
+            for target in self.visible_targets():
+                offset = [0.0, 0.0]
+                while True:
+                    self.update_tilt()
+                    azimuth, elevation = self.calculate_target_position(target, self.clock.time())
+                    if azimuth is None or elevation is None or elevation < min_elevation:
+                        break
+                    self.gimbal.move_to_position((azimuth + offset[0]) % 360.0, elevation + offset[1],
+                                                 wait=True)
+                    words = read(f"{target['name']} offset {offset[0]:+.2f}° {offset[1]:+.2f}°> ").split()
+                    command = words[0].lower() if words else ""
+                    if command in nudges:
+                        amount = float(words[1]) if len(words) > 1 else step
+                        offset[0] += nudges[command][0] * amount
+                        offset[1] += nudges[command][1] * amount
+                    elif command == "ok":
+                        recorded += self.record_sighting(target, offset) is not None
+                        break
+                    elif command == "skip":
+                        break
+                    elif command == "fit":
+                        self.refit_pointing_model()
+                    elif command == "quit":
+                        return
+        except (KeyboardInterrupt, EOFError):
+            pass
+        finally:
+            if recorded:
+                self.refit_pointing_model()
+            self.cleanup()
+    
     def run(self):
         """Main control loop"""
         logger.info("Starting anywharrow control loop...")
@@ -103,12 +590,11 @@ class AnywharrowController:
                 
                 # Move to target
                 if self.move_to_target(target):
-                    # Wait for the specified interval
-                    interval = self.config.get_nested_setting("behavior", "update_interval_seconds", default=60)
-                    time.sleep(interval)
+                    # Wait for the target's dwell time
+                    self.dwell(target, self.dwell_time(target))
                 else:
                     # If movement failed, wait a bit and try next target
-                    time.sleep(5)
+                    self.clock.sleep(5)
                     
         except KeyboardInterrupt:
             logger.info("Shutting down anywharrow...")
@@ -119,10 +605,232 @@ class AnywharrowController:
     
     def cleanup(self):
         """Clean up resources"""
+        self.config.close()
         self.gimbal.cleanup()
         self.display.cleanup()
+        self.imu.cleanup()
+        if self.i2c_bus is not None:
+            self.i2c_bus.stop()
+            logger.info(f"I2C bus: {self.i2c_bus.get_stats()}")
+        self._stop_metrics()
         logger.info("Cleanup complete")
 
+class AsyncAnywharrowController(AnywharrowController):
+    """
+    Asyncio control core for the anywharrow device
+    
+    Solving, motion, display rendering and IMU polling run as concurrent
+    tasks. The next target is solved while the current one dwells, and a
+    slow display write never delays the next move. Blocking drivers run on
+    per-device executors through AsyncDevice.
+    """
+    
+    def __init__(self, config_path="config"):
+        super().__init__(config_path)
+        self.async_gimbal = AsyncDevice(self.gimbal)
+        self.async_display = AsyncDevice(self.display)
+        self.async_imu = AsyncDevice(self.imu)
+        self.solver_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solver")
+        self.orientation = (0.0, 0.0, 0.0)
+        self._tasks = []
+    
+    async def _solve_ahead(self, solved):
+        """
+        Pick and solve upcoming targets, staying one target ahead of the motion task
+        
+        Unsolvable targets are skipped here; the motion task re-solves each
+        queued target for its arrival time before moving.
+        """
+        loop = asyncio.get_running_loop()
+        failures = 0
+        while True:
+            # Target selection can batch-solve the whole list (schedule and
+            # pass rounds), and target changes touch the pointing cache, so
+            # both stay on the solver thread with the solves themselves
+            target, azimuth, elevation = await loop.run_in_executor(
+                self.solver_executor, self._pick_and_solve)
+            if azimuth is None or elevation is None:
+                logger.error(f"Could not calculate position for target: {target['name']}")
+                failures += 1
+                if failures >= len(self.targets):
+                    # Nothing can be solved right now; back off before retrying
+                    failures = 0
+                    await asyncio.sleep(5)
+                continue
+            failures = 0
+            await solved.put((target, azimuth, elevation))
+    
+    def _pick_and_solve(self):
+        """Choose the next target and solve it now, on the solver thread"""
+        target = self.get_next_target()
+        return (target, *self.calculate_target_position(target))
+    
+    def _arrival_position(self, target, azimuth, elevation):
+        """
+        Re-solve a target for when a move to it will end
+        
+        Args:
+            target: Target dictionary
+            azimuth, elevation: Earlier solution, used to estimate the move time
+            
+        Returns:
+            tuple: (azimuth, elevation) at the expected arrival, or (None, None)
+        """
+        start_az, start_el = self.gimbal.get_current_position()
+        arrival = self.clock.time() + self.gimbal.planner.move_time(start_az, start_el, azimuth, elevation)
+        return self.calculate_target_position(target, arrival)
+    
+    async def _motion(self, solved, shown):
+        """Move to each solved target and dwell there"""
+        loop = asyncio.get_running_loop()
+        while True:
+            target, azimuth, elevation = await solved.get()
+            # The queued solution is a whole visit old by now; fast movers
+            # such as satellites have moved on, so solve for the arrival time
+            azimuth, elevation = await loop.run_in_executor(
+                self.solver_executor, self._arrival_position, target, azimuth, elevation)
+            if azimuth is None or elevation is None:
+                logger.error(f"Could not calculate position for target: {target['name']}")
+                continue
+            logger.info(f"Moving to {target['name']}: Az={azimuth:.1f}°, El={elevation:.1f}°")
+            
+            if await self.async_gimbal.move_to_position(azimuth, elevation):
+                # Hand the label to the display task, replacing any stale one
+                if shown.full():
+                    shown.get_nowait()
+                shown.put_nowait(target)
+                logger.info(f"Successfully pointed to {target['name']}")
+                await self._dwell(target, self.dwell_time(target))
+            else:
+                await asyncio.sleep(5)
+    
+    async def _dwell(self, target, interval):
+        """Stay on a target for the update interval, tracking it if it moves"""
+        if not self.tracking_enabled or target["type"] not in self.tracked_types:
+            await asyncio.sleep(interval)
+            return
+        
+        loop = asyncio.get_running_loop()
+        end = loop.time() + interval
+        await self.async_gimbal.wait_until_idle(interval)
+        while True:
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            period = await loop.run_in_executor(self.solver_executor, self.track_step, target)
+            await asyncio.sleep(min(period, remaining))
+    
+    async def _display(self, shown):
+        """Render target labels as they arrive, scrolling long names in between"""
+        period = self.config.get_nested_setting("display", "scroll_interval_seconds", default=0.2)
+        while True:
+            try:
+                target = await asyncio.wait_for(shown.get(), period)
+            except asyncio.TimeoutError:
+                await self.async_display.scroll()
+                continue
+            await self.async_display.show_target(target["name"], target.get("description", ""))
+    
+    async def _poll_imu(self):
+        """Poll the IMU for base orientation, keeping the tilt compensation current"""
+        period = self.config.get_nested_setting("behavior", "imu_poll_interval_seconds", default=0.1)
+        while True:
+            orientation = await self.async_imu.get_orientation()
+            if orientation[0] is not None:
+                self.orientation = orientation
+                self.update_tilt(orientation)
+            await asyncio.sleep(period)
+    
+    async def run_async(self):
+        """Run the control tasks until cancelled"""
+        logger.info("Starting anywharrow asyncio control core...")
+        
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.initialize):
+            logger.error("Failed to initialize hardware. Exiting.")
+            return
+        
+        solved = asyncio.Queue(maxsize=1)
+        shown = asyncio.Queue(maxsize=1)
+        self._tasks = [
+            asyncio.create_task(self._solve_ahead(solved), name="solve"),
+            asyncio.create_task(self._motion(solved, shown), name="motion"),
+            asyncio.create_task(self._display(shown), name="display"),
+            asyncio.create_task(self._poll_imu(), name="imu"),
+        ]
+        try:
+            # Any task failing stops the controller
+            done, _ = await asyncio.wait(self._tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"Task {task.get_name()} failed: {task.exception()}")
+        finally:
+            await self.stop()
+    
+    async def stop(self):
+        """Cancel all control tasks"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    def run(self):
+        """Main control loop"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("Shutting down anywharrow...")
+        self.cleanup()
+    
+    def cleanup(self):
+        """Clean up resources"""
+        super().cleanup()
+        for device in (self.async_gimbal, self.async_display, self.async_imu):
+            device.shutdown(wait=False)
+        self.solver_executor.shutdown(wait=False)
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="anywharrow control program")
+    parser.add_argument("--config", default="config", help="Configuration directory")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="Run the asyncio control core instead of the sequential loop")
+    parser.add_argument("--precompute", nargs="?", type=float, const=-1.0, default=None, metavar="HOURS",
+                        help="Solve all targets for the coming hours into the pointing table and exit "
+                             "(default hours: from settings)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --precompute (default: from settings or CPU count)")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="Line the arrow up on visible targets by hand, then refit and save "
+                             "the pointing model")
+    parser.add_argument("--fleet-server", action="store_true",
+                        help="Serve pointing streams to fleet devices instead of driving servos")
+    parser.add_argument("--fleet-client", nargs="?", const="", default=None, metavar="ADDRESS",
+                        help="Drive the servos from a fleet server (host:port or unix:/path, "
+                             "default: from settings)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    controller = AnywharrowController()
-    controller.run()
+    args = parse_args()
+    if args.precompute is not None:
+        config = ConfigManager(args.config)
+        build_table(
+            config, AnywharrowController.precompute_path(config),
+            hours=args.precompute if args.precompute > 0 else
+            config.get_nested_setting("precompute", "hours", default=48),
+            step_seconds=config.get_nested_setting("precompute", "step_seconds", default=None),
+            workers=args.workers or config.get_nested_setting("precompute", "workers", default=None),
+            chunk_targets=config.get_nested_setting("precompute", "chunk_targets", default=16),
+        )
+    elif args.calibrate:
+        AnywharrowController(args.config).calibrate()
+    elif args.fleet_server:
+        from fleet.server import FleetServer
+        FleetServer.from_config(ConfigManager(args.config)).run()
+    elif args.fleet_client is not None:
+        from fleet.client import FleetDeviceController
+        FleetDeviceController(args.config, args.fleet_client or None).run()
+    elif args.asyncio:
+        AsyncAnywharrowController(args.config).run()
+    else:
+        AnywharrowController(args.config).run()
@@ -0,0 +1,351 @@
+"""
+Rise, culmination and set events for every target over a time horizon
+"""
+
+import logging
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Coarse sampling step per target type (seconds); fast movers need finer steps
+# so that short passes are not stepped over
+DEFAULT_STEP_SECONDS = {
+    "satellite": 30.0,
+    "planet": 300.0,
+    "star": 300.0,
+    "deep_space": 300.0,
+    "earth_location": 3600.0,
+}
+
+
+class Pass:
+    """
+    One interval during which a target is above its minimum elevation
+
+    ``start`` and ``end`` bound the interval within the computed horizon.
+    ``rise`` and ``set`` are the refined crossing times, or None when the
+    target was already up at the start of the horizon or still up at its
+    end.
+    """
+
+    __slots__ = ("index", "start", "end", "rise", "set", "culmination", "max_elevation")
+
+    def __init__(self, index: int, start: float, end: float, rise: Optional[float],
+                 set_time: Optional[float], culmination: float, max_elevation: float):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.rise = rise
+        self.set = set_time
+        self.culmination = culmination
+        self.max_elevation = max_elevation
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def contains(self, when: float) -> bool:
+        return self.start <= when <= self.end
+
+
+class IntervalIndex:
+    """
+    Static centered interval tree over passes
+
+    ``at(when)`` returns every pass containing a time in O(log n + k) for k
+    results: each node holds the passes that straddle its center, sorted by
+    start and by end, so only matching passes are visited below the root
+    path.
+    """
+
+    def __init__(self, passes: Sequence[Pass]):
+        self._root = self._build(list(passes))
+        self.size = len(passes)
+
+    def _build(self, passes: List[Pass]):
+        if not passes:
+            return None
+        bounds = sorted([p.start for p in passes] + [p.end for p in passes])
+        center = bounds[len(bounds) // 2]
+        left = [p for p in passes if p.end < center]
+        right = [p for p in passes if p.start > center]
+        here = [p for p in passes if p.start <= center <= p.end]
+        return (center,
+                sorted(here, key=lambda p: p.start),
+                sorted(here, key=lambda p: p.end, reverse=True),
+                self._build(left), self._build(right))
+
+    def at(self, when: float) -> List[Pass]:
+        """Passes in progress at a time"""
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if when < center:
+                for p in by_start:
+                    if p.start > when:
+                        break
+                    found.append(p)
+                node = left
+            else:
+                for p in by_end:
+                    if p.end < when:
+                        break
+                    found.append(p)
+                node = right
+        return found
+
+
+class EventEngine:
+    """
+    Precomputes when each target is above its minimum elevation
+
+    Every target is sampled over the horizon with the batch solver, at a
+    step chosen per target type. Sign changes of elevation minus the
+    target's floor bracket each rise and set, which are then refined with
+    the Illinois variant of regula falsi, all brackets of a group of targets
+    solved together per iteration. Culmination is the vertex of a parabola
+    through the highest sample and its neighbours.
+
+    Passes go into an ``IntervalIndex`` and rise/culmination/set events
+    into a sorted time array, so "what is up now" and "what happens next"
+    are answered by tree and binary search instead of solving targets. The
+    tables are rebuilt when a query falls ``refresh_hours`` past the start
+    of the horizon or after the target list changes.
+
+    Targets may set ``min_elevation``; otherwise the per-type value or
+    ``default_min_elevation`` (the geometric horizon) applies.
+    """
+
+    def __init__(self, astronomy, targets: Sequence[Dict[str, Any]], horizon_hours: float = 24.0,
+                 refresh_hours: float = 12.0, step_seconds: Optional[Dict[str, float]] = None,
+                 min_elevation: Optional[Dict[str, float]] = None,
+                 default_min_elevation: float = 0.0, tolerance_seconds: float = 1.0,
+                 chunk_size: int = 64, max_iterations: int = 20):
+        self.astronomy = astronomy
+        self.targets = list(targets)
+        self.horizon = horizon_hours * 3600.0
+        self.refresh = min(refresh_hours, horizon_hours) * 3600.0
+        self.step_seconds = dict(DEFAULT_STEP_SECONDS)
+        self.step_seconds.update(step_seconds or {})
+        self.min_elevation = min_elevation or {}
+        self.default_min_elevation = default_min_elevation
+        self.tolerance = tolerance_seconds
+        self.chunk_size = chunk_size
+        self.max_iterations = max_iterations
+
+        self.start: Optional[float] = None
+        self.passes: List[Pass] = []
+        self.index = IntervalIndex([])
+        self._by_target: Dict[int, List[Pass]] = {}
+        self.event_times = np.zeros(0)
+        self._events: List[Tuple[str, Pass]] = []
+        self.computations = 0
+
+    @classmethod
+    def from_config(cls, astronomy, config, targets: Sequence[Dict[str, Any]]) -> "EventEngine":
+        """Create an engine from the ``events`` section of settings.json"""
+        return cls(
+            astronomy, targets,
+            horizon_hours=config.get_nested_setting("events", "horizon_hours", default=24.0),
+            refresh_hours=config.get_nested_setting("events", "refresh_hours", default=12.0),
+            step_seconds=config.get_nested_setting("events", "step_seconds", default=None),
+            min_elevation=config.get_nested_setting("events", "min_elevation_degrees", default={}),
+            default_min_elevation=config.get_nested_setting(
+                "events", "default_min_elevation_degrees", default=0.0),
+            tolerance_seconds=config.get_nested_setting("events", "tolerance_seconds", default=1.0),
+        )
+
+    def floor(self, target: Dict[str, Any]) -> float:
+        """Minimum elevation of a target in degrees"""
+        return float(target.get("min_elevation",
+                                self.min_elevation.get(target.get("type"), self.default_min_elevation)))
+
+    def set_targets(self, targets: Sequence[Dict[str, Any]]):
+        """Replace the target list; events are recomputed on the next query"""
+        self.targets = list(targets)
+        self.start = None
+
+    # Computation
+
+    def compute(self, start: float):
+        """Find every pass of every target from ``start`` over the horizon"""
+        self.start = start
+        passes = []
+        groups: Dict[float, List[int]] = {}
+        for index, target in enumerate(self.targets):
+            step = self.step_seconds.get(target.get("type"), max(self.step_seconds.values()))
+            groups.setdefault(float(step), []).append(index)
+
+        for step, indices in groups.items():
+            times = start + np.arange(0.0, self.horizon + step, step)
+            for chunk in range(0, len(indices), self.chunk_size):
+                passes.extend(self._passes(indices[chunk:chunk + self.chunk_size], times))
+
+        passes.sort(key=lambda p: p.start)
+        self.passes = passes
+        self.index = IntervalIndex(passes)
+        self._by_target = {}
+        for p in passes:
+            self._by_target.setdefault(p.index, []).append(p)
+
+        events = []
+        for p in passes:
+            if p.rise is not None:
+                events.append((p.rise, "rise", p))
+            events.append((p.culmination, "culmination", p))
+            if p.set is not None:
+                events.append((p.set, "set", p))
+        events.sort(key=lambda event: event[0])
+        self.event_times = np.array([event[0] for event in events])
+        self._events = [(kind, p) for _, kind, p in events]
+        self.computations += 1
+        logger.info(f"Computed {len(passes)} passes of {len(self.targets)} targets "
+                    f"over {self.horizon / 3600.0:.0f} h")
+
+    def _elevation(self, indices: Sequence[int], rows: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """Elevation minus floor for target ``indices[rows[k]]`` at ``times[k]``"""
+        # Each target is solved only at its own times
+        result = np.empty(len(times))
+        for row in np.unique(rows):
+            mine = rows == row
+            target = self.targets[indices[row]]
+            _, elevation = self.astronomy.calculate_batch_azimuth_elevation([target], times[mine])
+            result[mine] = elevation[0] - self.floor(target)
+        return result
+
+    def _refine(self, indices: Sequence[int], rows: np.ndarray, a: np.ndarray, b: np.ndarray,
+                fa: np.ndarray, fb: np.ndarray) -> np.ndarray:
+        """Illinois root refinement of many bracketed crossings at once"""
+        a, b, fa, fb = a.copy(), b.copy(), fa.copy(), fb.copy()
+        for _ in range(self.max_iterations):
+            active = np.abs(b - a) > self.tolerance
+            if not active.any():
+                break
+            c = np.where(fb != fa, (a * fb - b * fa) / np.where(fb != fa, fb - fa, 1.0), 0.5 * (a + b))
+            fc = np.zeros_like(c)
+            fc[active] = self._elevation(indices, rows[active], c[active])
+            fc = np.where(np.isfinite(fc), fc, -1.0)
+
+            crossed = fc * fb < 0
+            a = np.where(active & crossed, b, a)
+            fa = np.where(active & crossed, fb, np.where(active, fa * 0.5, fa))
+            b = np.where(active, c, b)
+            fb = np.where(active, fc, fb)
+            done = active & (fc == 0)
+            a[done] = b[done]
+        return b
+
+    def _passes(self, indices: Sequence[int], times: np.ndarray) -> List[Pass]:
+        targets = [self.targets[i] for i in indices]
+        _, elevation = self.astronomy.calculate_batch_azimuth_elevation(targets, times)
+        floors = np.array([self.floor(target) for target in targets])
+        f = elevation - floors[:, np.newaxis]
+        # Unsolvable samples count as below the floor
+        f = np.where(np.isfinite(f), f, -1.0)
+        above = f >= 0.0
+
+        padded = np.pad(above, ((0, 0), (1, 1)), constant_values=False).astype(np.int8)
+        edges = np.diff(padded, axis=1)
+        start_rows, start_columns = np.nonzero(edges == 1)
+        end_rows, end_columns = np.nonzero(edges == -1)
+        end_columns = end_columns - 1
+        # nonzero is row-major, so starts and ends pair up in order
+
+        last = len(times) - 1
+        rises = start_columns > 0
+        sets = end_columns < last
+        rows = np.concatenate([start_rows[rises], end_rows[sets]])
+        low = np.concatenate([start_columns[rises] - 1, end_columns[sets] + 1])
+        high = np.concatenate([start_columns[rises], end_columns[sets]])
+        crossings = np.zeros(0)
+        if len(rows):
+            crossings = self._refine(indices, rows, times[low], times[high],
+                                     f[rows, low], f[rows, high])
+        rise_times = np.full(len(start_rows), np.nan)
+        rise_times[rises] = crossings[:rises.sum()]
+        set_times = np.full(len(end_rows), np.nan)
+        set_times[sets] = crossings[rises.sum():]
+
+        # Culmination: parabola through the highest sample and its neighbours
+        step = times[1] - times[0] if len(times) > 1 else 0.0
+        peaks = np.array([start + int(np.argmax(f[row, start:end + 1]))
+                          for row, start, end in zip(start_rows, start_columns, end_columns)], dtype=int)
+        culminations = times[peaks] if len(peaks) else np.zeros(0)
+        interior = (peaks > 0) & (peaks < last)
+        if interior.any():
+            y0 = f[start_rows[interior], peaks[interior] - 1]
+            y1 = f[start_rows[interior], peaks[interior]]
+            y2 = f[start_rows[interior], peaks[interior] + 1]
+            curvature = y0 - 2.0 * y1 + y2
+            shift = np.where(curvature < 0, 0.5 * (y0 - y2) / np.where(curvature < 0, curvature, -1.0), 0.0)
+            culminations = culminations.copy()
+            culminations[interior] += np.clip(shift, -0.5, 0.5) * step
+        max_elevation = f[start_rows, peaks] if len(peaks) else np.zeros(0)
+        if interior.any():
+            refined = self._elevation(indices, start_rows[interior], culminations[interior])
+            max_elevation = max_elevation.copy()
+            max_elevation[interior] = np.fmax(max_elevation[interior], refined)
+
+        passes = []
+        for k, row in enumerate(start_rows):
+            rise = None if np.isnan(rise_times[k]) else float(rise_times[k])
+            set_time = None if np.isnan(set_times[k]) else float(set_times[k])
+            floor = self.floor(self.targets[indices[row]])
+            passes.append(Pass(
+                indices[row],
+                times[0] if rise is None else rise,
+                times[-1] if set_time is None else set_time,
+                rise, set_time, float(culminations[k]), float(max_elevation[k] + floor)))
+        return passes
+
+    # Queries
+
+    def _ensure(self, when: float):
+        if self.start is None or not self.start <= when <= self.start + self.refresh:
+            self.compute(when)
+
+    def passes_at(self, when: float) -> List[Pass]:
+        """Passes in progress at a Unix time"""
+        self._ensure(when)
+        return self.index.at(when)
+
+    def visible(self, when: float) -> List[Dict[str, Any]]:
+        """Targets above their minimum elevation at a Unix time, in target order"""
+        return [self.targets[p.index] for p in sorted(self.passes_at(when), key=lambda p: p.index)]
+
+    def is_visible(self, index: int, when: float) -> bool:
+        self._ensure(when)
+        return any(p.contains(when) for p in self._by_target.get(index, []))
+
+    def upcoming(self, when: float, limit: int = 10) -> List[Tuple[float, str, Dict[str, Any]]]:
+        """
+        Next rise, culmination and set events after a time
+
+        Returns:
+            list: (time, kind, target) tuples in time order
+        """
+        self._ensure(when)
+        first = int(np.searchsorted(self.event_times, when, side="right"))
+        return [(float(self.event_times[k]), self._events[k][0], self.targets[self._events[k][1].index])
+                for k in range(first, min(first + limit, len(self._events)))]
+
+    def next_pass(self, index: int, when: float) -> Optional[Pass]:
+        """The pass of a target in progress at, or next after, a time"""
+        self._ensure(when)
+        passes = self._by_target.get(index, [])
+        position = bisect_right([p.end for p in passes], when)
+        return passes[position] if position < len(passes) else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get event engine statistics"""
+        return {
+            "targets": len(self.targets),
+            "passes": len(self.passes),
+            "events": len(self._events),
+            "computations": self.computations,
+            "horizon_start": self.start,
+        }
@@ -0,0 +1,346 @@
+"""
+Offline pointing tables: solve every target ahead of time, look up at runtime
+
+File layout (little-endian):
+    header    magic, version, coverage and metadata location (HEADER, 64 bytes)
+    groups    one float32 block per sampling step, shape (targets, samples, 2)
+              holding azimuth and elevation in degrees, 64-byte aligned
+    metadata  JSON: observer location, precision settings, groups, and
+              per-target rows
+
+Building fans chunks of targets out over a ProcessPoolExecutor; each worker
+process opens the ephemeris once and solves its chunks with the batch
+solver. The runtime side maps the file and interpolates between samples, so
+it does no ephemeris math at all while the table covers the current time.
+``TableSolver`` gives batch users (the scheduler and event engine) the same
+lookups, solving live whatever the table does not cover.
+"""
+
+import os
+import json
+import time
+import struct
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from positioning.astronomy import AstronomyCalculator
+from positioning.pointing_cache import target_key
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ANYWPTB\x00"
+VERSION = 1
+# magic, version, start, end, created, metadata offset, metadata size
+HEADER = struct.Struct("<8sIxxxxdddQQ")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+# Sampling step per target type (seconds). Satellites curve across the sky
+# within seconds, everything else is close to linear over a minute.
+DEFAULT_STEP_SECONDS = {
+    "satellite": 2.0,
+    "planet": 60.0,
+    "star": 60.0,
+    "deep_space": 60.0,
+    "earth_location": 3600.0,
+}
+
+
+def target_fingerprint(target: Dict[str, Any]) -> str:
+    """Hash of everything that defines a target, to detect edits after a build"""
+    return hashlib.blake2b(json.dumps(target, sort_keys=True).encode("utf-8"),
+                           digest_size=8).hexdigest()
+
+
+def precision_settings(astronomy: AstronomyCalculator) -> Dict[str, Any]:
+    """Settings besides the location that change solved positions"""
+    return {
+        "tiers": dict(sorted(astronomy.precision.items())),
+        "temperature_c": float(astronomy.temperature_c),
+        "pressure_mbar": float(astronomy.pressure_mbar),
+    }
+
+
+# Per-process calculator, created once by the pool initializer
+_worker_astronomy: Optional[AstronomyCalculator] = None
+
+
+def _init_worker(location: Dict[str, float], ephemeris_file: str, data_directory: Optional[str],
+                 precision: Dict[str, Any]):
+    global _worker_astronomy
+    _worker_astronomy = AstronomyCalculator(
+        location["latitude"], location["longitude"], location["altitude"],
+        ephemeris_file, data_directory, precision.get("tiers"),
+        precision.get("temperature_c", 10.0), precision.get("pressure_mbar"))
+
+
+def _solve_chunk(targets: List[Dict[str, Any]], times: np.ndarray) -> np.ndarray:
+    azimuth, elevation = _worker_astronomy.calculate_batch_azimuth_elevation(targets, times)
+    return np.stack([azimuth, elevation], axis=-1).astype(np.float32)
+
+
+def build_table(config, path, hours: float = 48.0, start: Optional[float] = None,
+                step_seconds: Optional[Dict[str, float]] = None, workers: Optional[int] = None,
+                chunk_targets: int = 16, targets: Optional[Sequence[Dict[str, Any]]] = None) -> int:
+    """
+    Solve every target over the coming hours and write a pointing table
+
+    Args:
+        config: ConfigManager supplying the location, ephemeris and targets
+        path: Table file to write (replaced atomically)
+        hours: Hours covered from ``start``
+        start: Unix time of the first sample, defaults to now
+        step_seconds: Sampling step per target type
+        workers: Worker processes, defaults to the CPU count
+        chunk_targets: Targets solved per task
+        targets: Targets to solve, defaults to the configured list
+
+    Returns:
+        int: Number of targets written
+    """
+    path = Path(path)
+    start = time.time() if start is None else float(start)
+    end = start + hours * 3600.0
+    steps = dict(DEFAULT_STEP_SECONDS)
+    steps.update(step_seconds or {})
+    targets = list(config.get_targets() if targets is None else targets)
+    location = {key: float(config.get_nested_setting("device", "location", key, default=0.0))
+                for key in ("latitude", "longitude", "altitude")}
+    # Nothing is loaded here, the calculator only resolves the settings
+    precision = precision_settings(AstronomyCalculator.from_config(config))
+
+    # Group targets by sampling step, one block per group
+    groups: Dict[float, List[int]] = {}
+    for index, target in enumerate(targets):
+        step = float(steps.get(target.get("type"), max(steps.values())))
+        groups.setdefault(step, []).append(index)
+
+    offset = HEADER_SIZE
+    layout = []
+    for step, indices in sorted(groups.items()):
+        samples = int(np.ceil((end - start) / step)) + 1
+        layout.append({"step": step, "samples": samples, "offset": offset, "rows": len(indices)})
+        offset += len(indices) * samples * 2 * 4
+        offset += -offset % ALIGNMENT
+
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, 'w+b') as f:
+        f.truncate(offset)
+    blocks = [np.memmap(temporary, dtype="<f4", mode='r+', offset=group["offset"],
+                        shape=(group["rows"], group["samples"], 2)) for group in layout]
+
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(), initializer=_init_worker,
+            initargs=(location,
+                      config.get_nested_setting("ephemeris", "file", default="de421.bsp"),
+                      config.get_nested_setting("ephemeris", "data_directory", default=None),
+                      config.get_nested_setting("precision", default={}))) as pool:
+        futures = {}
+        for block, group, (step, indices) in zip(blocks, layout, sorted(groups.items())):
+            times = start + np.arange(group["samples"]) * step
+            for first in range(0, len(indices), chunk_targets):
+                chunk = [targets[i] for i in indices[first:first + chunk_targets]]
+                futures[pool.submit(_solve_chunk, chunk, times)] = (block, first)
+        for future in as_completed(futures):
+            block, first = futures[future]
+            result = future.result()
+            block[first:first + len(result)] = result
+
+    rows = {}
+    for number, (step, indices) in enumerate(sorted(groups.items())):
+        for row, index in enumerate(indices):
+            rows[target_key(targets[index])] = [number, row, target_fingerprint(targets[index])]
+    metadata = json.dumps({"location": location, "precision": precision, "groups": layout,
+                           "targets": rows}).encode("utf-8")
+
+    for block in blocks:
+        block.flush()
+    del blocks
+    created = time.time()
+    with open(temporary, 'r+b') as f:
+        f.seek(offset)
+        f.write(metadata)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, start, end, created, offset, len(metadata)))
+        f.flush()
+        os.fsync(f.fileno())
+    temporary.replace(path)
+    logger.info(f"Precomputed {len(targets)} targets over {hours:.0f} h in "
+                f"{time.perf_counter() - wall_start:.1f} s to {path}")
+    return len(targets)
+
+
+class PointingTable:
+    """
+    Memory-mapped pointing table written by ``build_table``
+
+    Lookups find the target's row through the metadata, read the two
+    samples around the requested time straight from the mapping, and
+    interpolate linearly (azimuth the short way round). Only the pages
+    actually touched are read from disk.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            magic, version, start, end, created, metadata_offset, metadata_size = \
+                HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path} is not a version {VERSION} pointing table")
+            f.seek(metadata_offset)
+            metadata = json.loads(f.read(metadata_size))
+        self.start = start
+        self.end = end
+        self.created = created
+        self.location = metadata["location"]
+        self.precision = metadata.get("precision")
+        self.groups = metadata["groups"]
+        self.rows: Dict[str, List] = metadata["targets"]
+        self.blocks = [np.memmap(self.path, dtype="<f4", mode='r', offset=group["offset"],
+                                 shape=(group["rows"], group["samples"], 2))
+                       if group["rows"] else None for group in self.groups]
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, path) -> Optional["PointingTable"]:
+        """Open a table if the file exists and is readable"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            return cls(path)
+        except Exception as e:
+            logger.error(f"Failed to open pointing table {path}: {e}")
+            return None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def matches_location(self, latitude: float, longitude: float, altitude: float = 0.0) -> bool:
+        return (abs(self.location["latitude"] - latitude) < 1e-6
+                and abs(self.location["longitude"] - longitude) < 1e-6
+                and abs(self.location["altitude"] - altitude) < 1e-3)
+
+    def matches_precision(self, astronomy: AstronomyCalculator) -> bool:
+        """Check that the table was solved with the calculator's tiers and weather"""
+        return self.precision == precision_settings(astronomy)
+
+    def covers(self, when: float) -> bool:
+        return self.start <= when <= self.end
+
+    def get_position(self, target: Dict[str, Any], when: float) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Interpolated azimuth and elevation of a target
+
+        Returns:
+            tuple: (azimuth, elevation) in degrees, or (None, None) if the
+                target is not in the table, was edited since the build, or
+                the time is outside the table
+        """
+        entry = self.rows.get(target_key(target))
+        if entry is None or not self.start <= when <= self.end \
+                or entry[2] != target_fingerprint(target):
+            self.misses += 1
+            return None, None
+        number, row = entry[0], entry[1]
+        group = self.groups[number]
+        x = (when - self.start) / group["step"]
+        i = min(int(x), group["samples"] - 2)
+        fraction = x - i
+        (az0, el0), (az1, el1) = self.blocks[number][row, i:i + 2].astype(float)
+        if np.isnan(az0) or np.isnan(az1):
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        delta = (az1 - az0 + 180.0) % 360.0 - 180.0
+        return (az0 + delta * fraction) % 360.0, el0 + (el1 - el0) * fraction
+
+    def get_positions(self, target: Dict[str, Any], times: np.ndarray):
+        """
+        Interpolated azimuths and elevations of a target at many times
+
+        Returns:
+            tuple: (azimuth, elevation, covered) arrays; ``covered`` is False
+                where the table cannot answer (target not in the table or
+                edited since the build, time outside the table)
+        """
+        times = np.asarray(times, dtype=float)
+        azimuth = np.full(times.shape, np.nan)
+        elevation = np.full(times.shape, np.nan)
+        entry = self.rows.get(target_key(target))
+        if entry is None or entry[2] != target_fingerprint(target):
+            covered = np.zeros(times.shape, dtype=bool)
+        else:
+            covered = (times >= self.start) & (times <= self.end)
+            number, row = entry[0], entry[1]
+            group = self.groups[number]
+            x = (times[covered] - self.start) / group["step"]
+            i = np.minimum(x.astype(int), group["samples"] - 2)
+            fraction = x - i
+            samples = self.blocks[number][row]
+            first = samples[i].astype(float)
+            second = samples[i + 1].astype(float)
+            delta = (second[:, 0] - first[:, 0] + 180.0) % 360.0 - 180.0
+            azimuth[covered] = (first[:, 0] + delta * fraction) % 360.0
+            elevation[covered] = first[:, 1] + (second[:, 1] - first[:, 1]) * fraction
+        self.hits += int(covered.sum())
+        self.misses += int(covered.size - covered.sum())
+        return azimuth, elevation, covered
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get lookup counters and coverage"""
+        return {
+            "targets": len(self.rows),
+            "start": self.start,
+            "end": self.end,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class TableSolver:
+    """
+    Batch solver that answers from a pointing table where it can
+
+    Stands in for ``AstronomyCalculator`` with users that only call
+    ``calculate_batch_azimuth_elevation`` (the scheduler and event engine).
+    ``table_for(when)`` returns the table to use for a solve starting at
+    ``when``, or None; targets and times the table does not cover are
+    solved live by ``astronomy``.
+    """
+
+    def __init__(self, astronomy: AstronomyCalculator, table_for):
+        self.astronomy = astronomy
+        self.table_for = table_for
+
+    def calculate_batch_azimuth_elevation(self, targets, times, refract=True):
+        """Same as ``AstronomyCalculator.calculate_batch_azimuth_elevation``"""
+        times = np.atleast_1d(np.asarray(self.astronomy.to_unix(times), dtype=float))
+        # Tables hold refracted elevations only
+        table = self.table_for(float(times[0])) if refract and len(times) and len(targets) else None
+        if table is None:
+            return self.astronomy.calculate_batch_azimuth_elevation(targets, times, refract)
+
+        azimuth = np.full((len(targets), len(times)), np.nan)
+        elevation = np.full((len(targets), len(times)), np.nan)
+        covered = np.zeros((len(targets), len(times)), dtype=bool)
+        for i, target in enumerate(targets):
+            azimuth[i], elevation[i], covered[i] = table.get_positions(target, times)
+
+        live = np.flatnonzero(~covered.all(axis=1))
+        if len(live):
+            columns = np.flatnonzero(~covered[live].all(axis=0))
+            live_az, live_el = self.astronomy.calculate_batch_azimuth_elevation(
+                [targets[i] for i in live], times[columns])
+            missing = ~covered[np.ix_(live, columns)]
+            rows, cols = live[np.nonzero(missing)[0]], columns[np.nonzero(missing)[1]]
+            azimuth[rows, cols] = live_az[missing]
+            elevation[rows, cols] = live_el[missing]
+        return azimuth, elevation
@@ -0,0 +1,345 @@
+"""
+Target scheduling that minimizes gimbal travel between targets
+"""
+
+import copy
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from kinematics.trajectory import AxisLimits, TrajectoryPlanner
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleEntry:
+    """One planned visit: a target, when to start slewing, and how long to stay"""
+
+    def __init__(self, index: int, start: float, slew: float, dwell: float):
+        self.index = index
+        self.start = start
+        self.slew = slew
+        self.dwell = dwell
+
+    @property
+    def end(self) -> float:
+        return self.start + self.slew + self.dwell
+
+
+def _slew_times(limits: AxisLimits, distances: np.ndarray) -> np.ndarray:
+    """Vectorized ``AxisLimits.trapezoid_time``"""
+    distances = np.abs(distances)
+    v, a = limits.max_velocity, limits.max_acceleration
+    return np.where(distances <= v * v / a,
+                    2.0 * np.sqrt(distances / a),
+                    distances / v + v / a)
+
+
+class SchedulePlan:
+    """
+    Target list and positions over the planning horizon
+
+    Solving the horizon is the expensive part of scheduling and depends
+    only on the observer's location, so schedulers at one location share a
+    plan (``TargetScheduler.share``) and keep only their own queue.
+    """
+
+    def __init__(self, targets: List[Dict[str, Any]], floors: np.ndarray):
+        self.targets = targets
+        self.floors = floors
+        self.removed = np.zeros(len(targets), dtype=bool)
+        self.times: Optional[np.ndarray] = None
+        self.azimuth = np.zeros((0, 0))
+        self.elevation = np.zeros((0, 0))
+
+
+def _shared(name: str) -> property:
+    """Attribute kept in the scheduler's ``SchedulePlan``"""
+    return property(lambda self: getattr(self.plan, name),
+                    lambda self, value: setattr(self.plan, name, value))
+
+
+class TargetScheduler:
+    """
+    Orders targets to keep slews short and skip targets that are not visible
+
+    Positions for every target are precomputed in one batch over a planning
+    horizon. The schedule is built in rounds: each round takes the targets
+    that are observable now, picks by priority what fits the round, and
+    orders them as an open travelling-salesman path from the current
+    pointing, using nearest neighbour followed by 2-opt. Edge costs are
+    slew times from the axis limits, with azimuth wrapped the short way.
+
+    Targets may set ``priority`` (default 1), ``dwell_seconds`` and
+    ``min_elevation``; without one, the floor for the target's type in
+    ``min_elevation`` applies, or else ``default_min_elevation`` (the
+    geometric horizon). Targets left out of a round gain one priority per
+    round they wait, so nothing is starved.
+    """
+
+    targets = _shared("targets")
+    floors = _shared("floors")
+    removed = _shared("removed")
+    times = _shared("times")
+    azimuth = _shared("azimuth")
+    elevation = _shared("elevation")
+
+    def __init__(self, astronomy, targets: List[Dict[str, Any]],
+                 planner: Optional[TrajectoryPlanner] = None,
+                 default_dwell: float = 60.0, horizon_hours: float = 6.0,
+                 step_seconds: float = 60.0, round_seconds: Optional[float] = None,
+                 min_elevation: Optional[Dict[str, float]] = None,
+                 default_min_elevation: float = 0.0):
+        self.astronomy = astronomy
+        self.planner = planner or TrajectoryPlanner()
+        self.default_dwell = default_dwell
+        self.horizon = horizon_hours * 3600.0
+        self.step = step_seconds
+        self.round_seconds = round_seconds
+        self.min_elevation = min_elevation or {}
+        self.default_min_elevation = default_min_elevation
+
+        self.plan = SchedulePlan(list(targets), np.array([self.floor(target) for target in targets],
+                                                          dtype=float))
+        self.waiting = np.zeros(len(self.targets))
+        self.queue = deque()
+        self.rounds = 0
+        self.planned_travel = 0.0
+
+    @classmethod
+    def from_config(cls, astronomy, planner: TrajectoryPlanner, config,
+                    targets: List[Dict[str, Any]]) -> "TargetScheduler":
+        """Create a scheduler from the ``scheduling`` section of settings.json"""
+        return cls(
+            astronomy, targets, planner,
+            default_dwell=config.get_nested_setting("behavior", "update_interval_seconds", default=60),
+            horizon_hours=config.get_nested_setting("scheduling", "horizon_hours", default=6.0),
+            step_seconds=config.get_nested_setting("scheduling", "step_seconds", default=60.0),
+            round_seconds=config.get_nested_setting("scheduling", "round_seconds", default=None),
+            min_elevation=config.get_nested_setting("scheduling", "min_elevation_degrees", default={}),
+            default_min_elevation=config.get_nested_setting(
+                "scheduling", "default_min_elevation_degrees", default=0.0),
+        )
+
+    def share(self) -> "TargetScheduler":
+        """
+        Scheduler for another device at the same location
+
+        It shares this one's plan, so targets are solved over the horizon
+        once for both and target changes apply to both, but it keeps its
+        own queue and waiting counts.
+        """
+        other = copy.copy(self)
+        other.waiting = np.zeros(len(self.targets))
+        other.queue = deque()
+        other.rounds = 0
+        other.planned_travel = 0.0
+        return other
+
+    def dwell_time(self, target: Dict[str, Any]) -> float:
+        """Seconds to stay on a target"""
+        return float(target.get("dwell_seconds", self.default_dwell))
+
+    def floor(self, target: Dict[str, Any]) -> float:
+        """Minimum elevation in degrees at which a target is observable"""
+        return float(target.get("min_elevation", self.min_elevation.get(target.get("type"),
+                                                                        self.default_min_elevation)))
+
+    def precompute(self, start: float):
+        """Solve every target over the planning horizon in one batch"""
+        self.times = start + np.arange(0.0, self.horizon + self.step, self.step)
+        if self.targets:
+            self.azimuth, self.elevation = self.astronomy.calculate_batch_azimuth_elevation(
+                self.targets, self.times)
+        else:
+            self.azimuth = self.elevation = np.zeros((0, len(self.times)))
+        logger.info(f"Precomputed {len(self.targets)} targets over {self.horizon / 3600.0:.1f} h")
+
+    def _column(self, when: float) -> int:
+        if self.times is None or not self.times[0] <= when <= self.times[-1]:
+            self.precompute(when)
+        return int(round((when - self.times[0]) / self.step))
+
+    def _observable(self, column: int) -> np.ndarray:
+        """Targets with a known position above their minimum elevation"""
+        elevation = self.elevation[:, column]
+        return np.isfinite(elevation) & (elevation >= self.floors) & ~self.removed
+
+    def _is_observable(self, index: int, column: int) -> bool:
+        """``_observable`` for a single target"""
+        elevation = self.elevation[index, column]
+        return bool(np.isfinite(elevation) and elevation >= self.floors[index] and not self.removed[index])
+
+    def slew_costs(self, from_az, from_el, to_az, to_el) -> np.ndarray:
+        """Slew times in seconds between directions, broadcasting the inputs"""
+        delta_az = (np.asarray(to_az) - np.asarray(from_az) + 180.0) % 360.0 - 180.0
+        delta_el = np.asarray(to_el) - np.asarray(from_el)
+        return np.maximum(_slew_times(self.planner.azimuth_limits, delta_az),
+                          _slew_times(self.planner.elevation_limits, delta_el))
+
+    def _order(self, candidates: np.ndarray, column: int, azimuth: float, elevation: float) -> List[int]:
+        """Open TSP path through the candidates from the current pointing"""
+        az = self.azimuth[candidates, column]
+        el = self.elevation[candidates, column]
+        costs = self.slew_costs(az[:, np.newaxis], el[:, np.newaxis], az, el)
+        start_costs = self.slew_costs(azimuth, elevation, az, el)
+
+        # Nearest neighbour
+        n = len(candidates)
+        visited = np.zeros(n, dtype=bool)
+        order = np.empty(n, dtype=int)
+        current = int(np.argmin(start_costs))
+        for k in range(n):
+            order[k] = current
+            visited[current] = True
+            if k + 1 < n:
+                current = int(np.argmin(np.where(visited, np.inf, costs[current])))
+
+        # 2-opt: reverse order[i:j + 1] for the j that shortens the path most,
+        # for each i in turn, until a pass finds nothing. Slew costs are
+        # symmetric, so only the two edges at the ends of a segment change.
+        improved = True
+        while improved and n > 2:
+            improved = False
+            for i in range(n - 1):
+                j = np.arange(i + 1, n)
+                before = start_costs[order[i]] if i == 0 else costs[order[i - 1], order[i]]
+                new_before = start_costs[order[j]] if i == 0 else costs[order[i - 1], order[j]]
+                following = order[np.minimum(j + 1, n - 1)]
+                after = np.where(j + 1 < n, costs[order[j], following], 0.0)
+                new_after = np.where(j + 1 < n, costs[order[i], following], 0.0)
+                gain = before + after - new_before - new_after
+                best = int(np.argmax(gain))
+                if gain[best] > 1e-9:
+                    order[i:j[best] + 1] = order[i:j[best] + 1][::-1].copy()
+                    improved = True
+        return [int(candidates[k]) for k in order]
+
+    def plan_round(self, when: float, azimuth: float, elevation: float) -> int:
+        """
+        Plan the next round of visits
+
+        Args:
+            when: Unix time the round starts
+            azimuth: Current azimuth in degrees
+            elevation: Current elevation in degrees
+
+        Returns:
+            int: Number of visits planned
+        """
+        column = self._column(when)
+        # Targets added through another scheduler sharing the plan
+        self.waiting = np.append(self.waiting, np.zeros(len(self.targets) - len(self.waiting)))
+        candidates = np.flatnonzero(self._observable(column))
+        if not len(candidates):
+            return 0
+
+        if self.round_seconds is not None:
+            # Highest effective priority first, until the round is full
+            priority = np.array([self.targets[i].get("priority", 1) for i in candidates]) \
+                + self.waiting[candidates]
+            chosen, budget = [], self.round_seconds
+            for index in candidates[np.argsort(-priority, kind="stable")]:
+                dwell = self.dwell_time(self.targets[index])
+                if chosen and dwell > budget:
+                    continue
+                chosen.append(index)
+                budget -= dwell
+            self.waiting[candidates] += 1
+            candidates = np.array(sorted(chosen))
+        self.waiting[candidates] = 0
+
+        start = when
+        planned = 0
+        for index in self._order(candidates, column, azimuth, elevation):
+            slot = self._column(start) if start <= self.times[-1] else column
+            if not self._is_observable(index, slot):
+                continue
+            target_az, target_el = self.azimuth[index, slot], self.elevation[index, slot]
+            slew = float(self.slew_costs(azimuth, elevation, target_az, target_el))
+            entry = ScheduleEntry(index, start, slew, self.dwell_time(self.targets[index]))
+            self.queue.append(entry)
+            self.planned_travel += slew
+            azimuth, elevation, start = target_az, target_el, entry.end
+            planned += 1
+
+        self.rounds += 1
+        return planned
+
+    def next_target(self, when: float, azimuth: float, elevation: float) -> Optional[Dict[str, Any]]:
+        """
+        Get the next target to point at
+
+        Args:
+            when: Current Unix time
+            azimuth: Current azimuth in degrees
+            elevation: Current elevation in degrees
+
+        Returns:
+            dict: Target dictionary, or None if nothing is observable
+        """
+        if not self.queue and not self.plan_round(when, azimuth, elevation):
+            return None
+        return self.targets[self.queue.popleft().index]
+
+    def add_target(self, target: Dict[str, Any]):
+        """
+        Add a target without replanning the whole schedule
+
+        Only the new target is solved over the horizon, and it is inserted
+        where it lengthens the queued path the least.
+        """
+        self.targets.append(target)
+        self.waiting = np.append(self.waiting, np.zeros(len(self.targets) - len(self.waiting)))
+        self.removed = np.append(self.removed, False)
+        self.floors = np.append(self.floors, self.floor(target))
+        if self.times is None:
+            return
+        azimuth, elevation = self.astronomy.calculate_batch_azimuth_elevation([target], self.times)
+        self.azimuth = np.vstack([self.azimuth, azimuth])
+        self.elevation = np.vstack([self.elevation, elevation])
+
+        index = len(self.targets) - 1
+        entries = list(self.queue)
+        if not entries:
+            return
+        column = self._column(entries[0].start)
+        if not self._is_observable(index, column):
+            return
+
+        rows = [entry.index for entry in entries]
+        az, el = self.azimuth[rows, column], self.elevation[rows, column]
+        new_az, new_el = self.azimuth[index, column], self.elevation[index, column]
+        # Extra travel for inserting after each queued entry
+        into = self.slew_costs(az, el, new_az, new_el)
+        out_of = np.append(self.slew_costs(new_az, new_el, az[1:], el[1:]), 0.0)
+        direct = np.append(self.slew_costs(az[:-1], el[:-1], az[1:], el[1:]), 0.0)
+        position = int(np.argmin(into + out_of - direct)) + 1
+
+        previous = entries[position - 1]
+        entry = ScheduleEntry(index, previous.end, float(into[position - 1]), self.dwell_time(target))
+        self.queue.insert(position, entry)
+        shift = entry.end - previous.end
+        for later in entries[position:]:
+            later.start += shift
+
+    def remove_target(self, name: str) -> bool:
+        """Drop a target from future rounds and the queue"""
+        for index, target in enumerate(self.targets):
+            if not self.removed[index] and target.get("name", "").lower() == name.lower():
+                self.queue = deque(entry for entry in self.queue if entry.index != index)
+                # Keep indices stable; the target just never becomes observable
+                self.removed[index] = True
+                return True
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduling statistics"""
+        return {
+            "targets": len(self.targets),
+            "rounds": self.rounds,
+            "queued": len(self.queue),
+            "planned_slew_seconds": self.planned_travel,
+        }
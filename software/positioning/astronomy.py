@@ -2,104 +2,480 @@
 Astronomy calculations for celestial and terrestrial positioning
 """
 
+import time
+from datetime import datetime
+from pathlib import Path
+
 import numpy as np
-from skyfield.api import load, Topos
-from astropy.coordinates import SkyCoord, AltAz, EarthLocation
-from astropy.time import Time
-import astropy.units as u
+from skyfield.api import load, Loader, wgs84, Star
+
+from positioning.satellites import SatelliteTracker
+from positioning.catalog import StarCatalog, KIND_NAMES
+from positioning.geodesy import (TerrestrialSolver, horizon_matrix, enu_to_azel, radec_to_unit,
+                                 refraction_degrees, standard_pressure_mbar)
+
+# de421 segment names for the solar system bodies we can point at. The outer
+# planets only exist as system barycenters in de421.
+PLANET_SEGMENTS = {
+    'sun': 'sun',
+    'moon': 'moon',
+    'mercury': 'mercury',
+    'venus': 'venus',
+    'mars': 'mars',
+    'jupiter': 'jupiter barycenter',
+    'saturn': 'saturn barycenter',
+    'uranus': 'uranus barycenter',
+    'neptune': 'neptune barycenter',
+}
+
+# Precision tiers, cheapest first:
+#   geometric            - position vectors only: no aberration, light time,
+#                          nutation or refraction (the catalog and SGP4 fast paths)
+#   geometric_refracted  - geometric position raised by atmospheric refraction
+#   apparent             - Skyfield's full apparent place
+#   refracted            - apparent place raised by atmospheric refraction
+PRECISION_TIERS = ("geometric", "geometric_refracted", "apparent", "refracted")
+GEOMETRIC_TIERS = ("geometric", "geometric_refracted")
+REFRACTED_TIERS = ("geometric_refracted", "refracted")
+
+# Cheapest tiers within 0.5° (benchmarks/precision_benchmark.py, sampled
+# every 30 s so rises and sets are covered): refraction alone is 0.48° at
+# the horizon, so everything seen through the atmosphere needs it.
+DEFAULT_PRECISION = {
+    "planet": "refracted",
+    "star": "geometric_refracted",
+    "deep_space": "geometric_refracted",
+    "satellite": "geometric_refracted",
+    "earth_location": "geometric",
+}
 
 class AstronomyCalculator:
     """Handles astronomical calculations for target positioning"""
     
-    def __init__(self):
-        # Load ephemeris data
-        self.eph = load('de421.bsp')
-        self.ts = load.timescale()
+    def __init__(self, latitude=0.0, longitude=0.0, altitude=0.0,
+                 ephemeris_file='de421.bsp', data_directory=None, precision=None,
+                 temperature_c=10.0, pressure_mbar=None):
+        # Ephemeris and timescale are loaded on first use so that startup does
+        # not pay for them. Skyfield opens the SPK file through jplephem, which
+        # memory-maps it and only reads a segment's coefficients the first time
+        # that body is computed.
+        self.ephemeris_file = ephemeris_file
+        self.data_directory = data_directory
+        self.loader = Loader(data_directory, verbose=False) if data_directory else load
+        self._eph = None
+        self._ts = None
+        self._observer = None
+        self._satellites = None
+        self._catalog = None
+        
+        # Observer (device) location
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.topos = wgs84.latlon(latitude, longitude, elevation_m=altitude)
+        self.terrestrial = TerrestrialSolver(latitude, longitude, altitude)
+        
+        # Precision tier per target type. Earth locations are always
+        # geometric; satellites have no separate apparent place, so their
+        # apparent tier is the same as geometric.
+        self.precision = dict(DEFAULT_PRECISION)
+        self.precision.update(precision or {})
+        for target_type, tier in self.precision.items():
+            if tier not in PRECISION_TIERS:
+                raise ValueError(f"Unknown precision tier {tier!r} for {target_type}, "
+                                 f"expected one of {PRECISION_TIERS}")
+        self.set_weather(temperature_c, pressure_mbar)
+    
+    @classmethod
+    def from_config(cls, config):
+        """Create a calculator from the ``device``, ``ephemeris`` and ``precision`` sections of settings.json"""
+        return cls(
+            latitude=config.get_nested_setting("device", "location", "latitude", default=0.0),
+            longitude=config.get_nested_setting("device", "location", "longitude", default=0.0),
+            altitude=config.get_nested_setting("device", "location", "altitude", default=0.0),
+            ephemeris_file=config.get_nested_setting("ephemeris", "file", default="de421.bsp"),
+            data_directory=config.get_nested_setting("ephemeris", "data_directory", default=None),
+            precision=config.get_nested_setting("precision", "tiers", default=None),
+            temperature_c=config.get_nested_setting("precision", "temperature_c", default=10.0),
+            pressure_mbar=config.get_nested_setting("precision", "pressure_mbar", default=None),
+        )
+    
+    def for_location(self, latitude, longitude, altitude=0.0):
+        """
+        Calculator for another observer that shares this one's data
+        
+        The ephemeris kernel, timescale, satellite elements and catalog
+        columns are shared rather than loaded again, so one process can
+        solve for many device locations at little extra memory.
+        
+        Args:
+            latitude (float): Observer latitude in degrees
+            longitude (float): Observer longitude in degrees
+            altitude (float): Observer height above the ellipsoid in meters
+            
+        Returns:
+            AstronomyCalculator: Calculator for the new location
+        """
+        other = AstronomyCalculator(latitude, longitude, altitude,
+                                    self.ephemeris_file, self.data_directory, self.precision,
+                                    self.temperature_c, self._pressure_setting)
+        other.loader = self.loader
+        other._eph = self.eph
+        other._ts = self.ts
+        other._satellites = self.satellites.for_location(latitude, longitude, altitude)
+        other._catalog = self.catalog.for_location(latitude, longitude)
+        return other
+    
+    def set_weather(self, temperature_c=10.0, pressure_mbar=None):
+        """
+        Set the local conditions used by the refracted tier
         
-        # Get current time
-        self.now = self.ts.now()
+        Args:
+            temperature_c (float): Air temperature in degrees Celsius
+            pressure_mbar (float): Air pressure in millibars; defaults to the
+                standard atmosphere at the device's altitude
+        """
+        self.temperature_c = temperature_c
+        self._pressure_setting = pressure_mbar
+        self.pressure_mbar = (float(standard_pressure_mbar(self.altitude))
+                              if pressure_mbar is None else pressure_mbar)
+    
+    def tier(self, target_type):
+        """Precision tier used for a target type"""
+        return self.precision.get(target_type, "apparent")
+    
+    def refract(self, target_type, elevation):
+        """Apply refraction to elevation(s) if the type's tier asks for it"""
+        if self.tier(target_type) not in REFRACTED_TIERS:
+            return elevation
+        return elevation + refraction_degrees(elevation, self.temperature_c, self.pressure_mbar)
+    
+    @property
+    def eph(self):
+        """Ephemeris kernel, opened on first access"""
+        if self._eph is None:
+            self._eph = self.loader(self.ephemeris_file)
+        return self._eph
+    
+    @property
+    def ts(self):
+        """Timescale using the builtin leap second and Delta T tables"""
+        if self._ts is None:
+            self._ts = self.loader.timescale(builtin=True)
+        return self._ts
+    
+    @property
+    def observer(self):
+        """Barycentric observer (Earth plus device location), built once"""
+        if self._observer is None:
+            self._observer = self.eph['earth'] + self.topos
+        return self._observer
+    
+    @property
+    def satellites(self):
+        """Satellite tracker reading TLE files from the data directory"""
+        if self._satellites is None:
+            self._satellites = SatelliteTracker(
+                self.data_directory or "data", self.latitude, self.longitude, self.altitude)
+        return self._satellites
+    
+    @property
+    def catalog(self):
+        """Star and deep-sky catalog, memory-mapped from the data directory if present"""
+        if self._catalog is None:
+            self._catalog = StarCatalog.open(
+                Path(self.data_directory or "data") / "catalog", self.latitude, self.longitude)
+        return self._catalog
+    
+    def to_time(self, when=None):
+        """
+        Convert a time specification to a Skyfield Time
+        
+        Args:
+            when: None (now), a Skyfield Time, a datetime, a Unix timestamp
+                or a sequence/array of datetimes or Unix timestamps
+                
+        Returns:
+            Time: Skyfield Time (scalar or array)
+        """
+        if when is None:
+            return self.ts.now()
+        if hasattr(when, 'tt'):
+            return when
+        if isinstance(when, datetime):
+            return self.ts.from_datetime(when)
+        if len(np.shape(when)) and len(when) and isinstance(when[0], datetime):
+            return self.ts.from_datetimes(list(when))
+        # Split into whole days so Skyfield applies the leap seconds for the
+        # actual date rather than those in force at the 1970 epoch
+        seconds = np.asarray(when, dtype=float)
+        days = np.floor(seconds / 86400.0)
+        return self.ts.utc(1970, 1, 1 + days, 0, 0, seconds - days * 86400.0)
+    
+    def to_unix(self, when=None):
+        """
+        Convert a time specification to Unix timestamp(s)
         
-    def calculate_celestial_azimuth_elevation(self, target_name):
+        Args:
+            when: Any value accepted by ``to_time``
+            
+        Returns:
+            float or ndarray: Seconds since the Unix epoch (UTC)
+        """
+        if when is None:
+            return time.time()
+        if hasattr(when, 'tt'):
+            stamps = [d.timestamp() for d in np.atleast_1d(when.utc_datetime())]
+            return np.array(stamps) if np.ndim(when.tt) else stamps[0]
+        if isinstance(when, datetime):
+            return when.timestamp()
+        if len(np.shape(when)) and len(when) and isinstance(when[0], datetime):
+            return np.array([d.timestamp() for d in when])
+        return np.asarray(when, dtype=float)
+    
+    def calculate_celestial_azimuth_elevation(self, target_name, when=None, ra_hours=None,
+                                              dec_degrees=None, target_type="star", norad_id=None):
         """
         Calculate azimuth and elevation for celestial objects
         
         Args:
             target_name (str): Name of celestial object
+            when: Time to solve for (see ``to_time``), defaults to now
+            ra_hours (float): Right ascension (J2000) to use if the name is
+                not a planet, satellite or catalog object
+            dec_degrees (float): Declination (J2000) for the same case
+            target_type (str): Type whose precision tier applies to those
+                coordinates
+            norad_id (int): NORAD catalog number of a satellite, preferred
+                over the name as in the batch path
             
         Returns:
             tuple: (azimuth, elevation) in degrees
         """
         try:
             # Get the celestial object
-            if target_name.lower() in ['mars', 'jupiter', 'saturn', 'venus', 'mercury']:
-                planet = self.eph[target_name.capitalize()]
-                # Calculate position relative to Earth
-                earth = self.eph['earth']
-                astrometric = earth.at(self.now).observe(planet)
-                alt, az, distance = astrometric.apparent().altaz()
-                
-                return float(az.degrees), float(alt.degrees)
+            if target_name.lower() in PLANET_SEGMENTS:
+                seconds = self.to_unix(when)
+                azimuth, elevation = self._planet_position(
+                    target_name, self.to_time(when), seconds)
+                return float(azimuth), float(elevation)
             
-            elif target_name.lower() == 'international space station':
-                # ISS position calculation (simplified)
-                # In practice, you'd use TLE data for accurate ISS tracking
-                return self._calculate_iss_position()
+            elif self.satellites.find(target_name, norad_id) is not None:
+                azimuth, elevation = self.satellites.get_position(
+                    target_name, self.to_unix(when), norad_id)
+                if elevation is not None:
+                    elevation = float(self.refract("satellite", elevation))
+                return azimuth, elevation
             
             else:
-                # For stars and other objects, use AstroPy
-                return self._calculate_star_position(target_name)
+                # For stars and deep-sky objects, use the local catalog
+                return self._calculate_star_position(
+                    target_name, when, self._coordinates(ra_hours, dec_degrees), target_type)
                 
         except Exception as e:
             print(f"Error calculating celestial position for {target_name}: {e}")
             return None, None
     
-    def calculate_earth_location_azimuth_elevation(self, latitude, longitude):
+    def calculate_earth_location_azimuth_elevation(self, latitude, longitude, when=None,
+                                                   altitude=0.0):
         """
         Calculate azimuth and elevation for Earth locations
         
         Args:
             latitude (float): Target latitude in degrees
             longitude (float): Target longitude in degrees
+            when: Unused, terrestrial targets do not move relative to the device
+            altitude (float): Target height above the ellipsoid in meters
             
         Returns:
             tuple: (azimuth, elevation) in degrees
         """
         try:
-            # Create target location
-            target = Topos(latitude, longitude)
-            
-            # Get observer location (device location)
-            # This should be set from device configuration
-            observer_lat = 0.0  # TODO: Get from config
-            observer_lon = 0.0  # TODO: Get from config
-            observer = Topos(observer_lat, observer_lon)
-            
-            # Calculate position
-            astrometric = observer.at(self.now).observe(target)
-            alt, az, distance = astrometric.apparent().altaz()
-            
-            return float(az.degrees), float(alt.degrees)
+            return self.terrestrial.get_position(latitude, longitude, altitude)
             
         except Exception as e:
             print(f"Error calculating Earth location position: {e}")
             return None, None
     
-    def _calculate_iss_position(self):
-        """Calculate ISS position (simplified)"""
-        # This is a placeholder - real ISS tracking requires TLE data
-        # For now, return a fixed position for testing
-        return 45.0, 30.0  # Azimuth, Elevation
+    def calculate_batch_azimuth_elevation(self, targets, times, refract=True):
+        """
+        Calculate azimuth and elevation for a whole target list over many times
+        
+        Each solar system body is solved once over the full time array, and the
+        observer position is computed once and shared between all bodies, so a
+        day of positions costs a handful of array operations per target.
+        
+        Args:
+            targets (list): Target dictionaries as loaded from targets.json
+            times: Times to solve for (see ``to_time``)
+            refract (bool): Apply refraction where the tier asks for it; with
+                False, ``refract`` can be applied to the elevations later
+                (targets without a vectorized path are always refracted)
+            
+        Returns:
+            tuple: (azimuth, elevation) arrays of shape (len(targets), len(times))
+                in degrees, NaN where a position could not be calculated
+        """
+        t = self.to_time(times)
+        n_times = int(np.size(t.tt))
+        azimuth = np.full((len(targets), n_times), np.nan)
+        elevation = np.full((len(targets), n_times), np.nan)
+        
+        # All satellites are propagated together in a single SGP4 call
+        satellite_rows = []
+        satellite_indices = []
+        for i, target in enumerate(targets):
+            if target.get("type") == "satellite":
+                index = self.satellites.find(target.get("name"), target.get("norad_id"))
+                if index is not None:
+                    satellite_rows.append(i)
+                    satellite_indices.append(index)
+        if satellite_indices:
+            azimuth[satellite_rows], elevation[satellite_rows] = self.satellites.propagate(
+                satellite_indices, self.to_unix(times))
+            if refract:
+                elevation[satellite_rows] = self.refract("satellite", elevation[satellite_rows])
+        
+        # Geometric catalog objects are converted together, one matrix
+        # product per time; higher tiers get full apparent places. Objects
+        # missing from the catalog use the target's own RA/Dec, if it has one.
+        catalog_rows = []
+        geometric_rows = []
+        geometric_indices = []
+        coordinate_rows = []
+        coordinates = []
+        observer_at = None
+        for i, target in enumerate(targets):
+            if target.get("type") in ("star", "deep_space"):
+                row = self.catalog.find(target.get("name", ""))
+                if row is None:
+                    position = self._coordinates(target.get("ra_hours"), target.get("dec_degrees"))
+                    if position is None:
+                        continue
+                else:
+                    position = (float(self.catalog.ra[row]), float(self.catalog.dec[row]))
+                catalog_rows.append(i)
+                if self.tier(target["type"]) not in GEOMETRIC_TIERS:
+                    if observer_at is None:
+                        observer_at = self.observer.at(t)
+                    azimuth[i], elevation[i] = self._apparent_star(*position, observer_at)
+                    if refract:
+                        elevation[i] = self.refract(target["type"], elevation[i])
+                elif row is None:
+                    coordinate_rows.append(i)
+                    coordinates.append(position)
+                else:
+                    geometric_rows.append(i)
+                    geometric_indices.append(row)
+        if geometric_indices:
+            azimuth[geometric_rows], elevation[geometric_rows] = self.catalog.altaz(
+                geometric_indices, self.to_unix(times))
+        if coordinate_rows:
+            azimuth[coordinate_rows], elevation[coordinate_rows] = self._geometric_star(
+                np.array(coordinates), self.to_unix(times))
+        if refract:
+            for i in geometric_rows + coordinate_rows:
+                elevation[i] = self.refract(targets[i]["type"], elevation[i])
+        
+        # Terrestrial targets are fixed, so one solve covers every time
+        earth_rows = [i for i, target in enumerate(targets)
+                      if target.get("type") == "earth_location"]
+        if earth_rows:
+            earth_azimuth, earth_elevation = self.terrestrial.solve(
+                [targets[i]["latitude"] for i in earth_rows],
+                [targets[i]["longitude"] for i in earth_rows],
+                [targets[i].get("altitude", 0.0) for i in earth_rows])
+            azimuth[earth_rows] = earth_azimuth[:, np.newaxis]
+            elevation[earth_rows] = earth_elevation[:, np.newaxis]
+        
+        solved_rows = set(satellite_rows) | set(catalog_rows) | set(earth_rows)
+        
+        for i, target in enumerate(targets):
+            name = target.get("name", "")
+            target_type = target.get("type")
+            if i in solved_rows:
+                continue
+            try:
+                if target_type == "planet" and name.lower() in PLANET_SEGMENTS:
+                    if observer_at is None:
+                        observer_at = self.observer.at(t)
+                    azimuth[i], elevation[i] = self._planet_position(
+                        name, t, self.to_unix(times), observer_at, refract)
+                else:
+                    # No vectorized path for this target: solve each time on its own
+                    for j, when in enumerate(np.atleast_1d(self.to_unix(times))):
+                        azimuth[i, j], elevation[i, j] = self._nan_none(
+                            self.calculate_celestial_azimuth_elevation(name, float(when)))
+            except Exception as e:
+                print(f"Error calculating batch positions for {name}: {e}")
+        
+        return azimuth, elevation
+    
+    @staticmethod
+    def _nan_none(position):
+        """Map a (None, None) position to NaNs for array storage"""
+        return tuple(np.nan if value is None else value for value in position)
     
-    def _calculate_star_position(self, star_name):
-        """Calculate star position using AstroPy"""
+    def _planet_position(self, name, t, seconds, observer_at=None, refract=True):
+        """
+        Azimuth and elevation of a solar system body at the planet tier
+        
+        The geometric tier skips light time, aberration and nutation: the
+        barycentric difference vector goes through the same precession and
+        sidereal time rotation as catalog stars.
+        """
+        planet = self.eph[PLANET_SEGMENTS[name.lower()]]
+        if observer_at is None:
+            observer_at = self.observer.at(t)
+        if self.tier("planet") in GEOMETRIC_TIERS:
+            vector = planet.at(t).position.au - observer_at.position.au
+            matrices = horizon_matrix(self.latitude, self.longitude, seconds)
+            azimuth, elevation = enu_to_azel((matrices @ vector.T[..., np.newaxis])[..., 0])
+        else:
+            alt, az, distance = observer_at.observe(planet).apparent().altaz()
+            azimuth, elevation = az.degrees, alt.degrees
+        return azimuth, self.refract("planet", elevation) if refract else elevation
+    
+    @staticmethod
+    def _coordinates(ra_hours, dec_degrees):
+        """(RA, Dec) in degrees, or None unless both are given and not NaN"""
+        if ra_hours is None or dec_degrees is None:
+            return None
+        ra_degrees, dec_degrees = 15.0 * float(ra_hours), float(dec_degrees)
+        if np.isnan(ra_degrees) or np.isnan(dec_degrees):
+            return None
+        return ra_degrees, dec_degrees
+    
+    def _apparent_star(self, ra_degrees, dec_degrees, observer_at):
+        """Apparent azimuth and elevation of a fixed object at J2000 RA/Dec"""
+        star = Star(ra_hours=ra_degrees / 15.0, dec_degrees=dec_degrees)
+        alt, az, distance = observer_at.observe(star).apparent().altaz()
+        return az.degrees, alt.degrees
+    
+    def _geometric_star(self, coordinates, seconds):
+        """Geometric azimuth and elevation, shape (n, n_times), of (n, 2) RA/Dec degrees"""
+        matrices = horizon_matrix(self.latitude, self.longitude, np.atleast_1d(seconds))
+        vectors = radec_to_unit(coordinates[:, 0], coordinates[:, 1])
+        return enu_to_azel(np.einsum('tij,nj->nti', matrices, vectors))
+    
+    def _calculate_star_position(self, star_name, when=None, coordinates=None, target_type="star"):
+        """
+        Calculate star or deep-sky object position from the catalog, or from
+        (RA, Dec) in degrees when the catalog does not have it
+        """
         try:
-            # This is a simplified version
-            # Real implementation would use proper star catalogs
-            if star_name.lower() == 'vega':
-                # Vega coordinates (simplified)
-                return 45.0, 60.0  # Azimuth, Elevation
+            row = self.catalog.find(star_name)
+            if row is None:
+                if coordinates is None:
+                    return None, None
             else:
-                return None, None
+                coordinates = (float(self.catalog.ra[row]), float(self.catalog.dec[row]))
+                target_type = KIND_NAMES[int(self.catalog.kind[row])]
+            if self.tier(target_type) in GEOMETRIC_TIERS:
+                azimuth, elevation = self._geometric_star(np.array([coordinates]), self.to_unix(when))
+                return float(azimuth[0, 0]), float(self.refract(target_type, elevation[0, 0]))
+            azimuth, elevation = self._apparent_star(*coordinates, self.observer.at(self.to_time(when)))
+            return float(azimuth), float(self.refract(target_type, elevation))
         except Exception as e:
             print(f"Error calculating star position: {e}")
             return None, None
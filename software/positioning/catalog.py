@@ -0,0 +1,293 @@
+"""
+Indexed star and deep-sky catalog with columnar storage
+"""
+
+import csv
+import copy
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from positioning.geodesy import radec_to_unit, horizon_matrix, enu_to_azel
+
+logger = logging.getLogger(__name__)
+
+KIND_CODES = {"star": 0, "deep_space": 1}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+COLUMNS = ("ra", "dec", "magnitude", "kind")
+
+# Built-in catalog used when no catalog directory has been generated:
+# (names, kind, RA J2000 deg, Dec J2000 deg, visual magnitude)
+BUILTIN_OBJECTS = [
+    (("Sirius",), "star", 101.2872, -16.7161, -1.46),
+    (("Canopus",), "star", 95.9880, -52.6957, -0.74),
+    (("Rigil Kentaurus", "Alpha Centauri"), "star", 219.9021, -60.8340, -0.27),
+    (("Arcturus",), "star", 213.9153, 19.1824, -0.05),
+    (("Vega",), "star", 279.2347, 38.7837, 0.03),
+    (("Capella",), "star", 79.1723, 45.9980, 0.08),
+    (("Rigel",), "star", 78.6345, -8.2016, 0.13),
+    (("Procyon",), "star", 114.8255, 5.2250, 0.34),
+    (("Achernar",), "star", 24.4285, -57.2368, 0.46),
+    (("Betelgeuse",), "star", 88.7929, 7.4071, 0.50),
+    (("Hadar",), "star", 210.9559, -60.3730, 0.61),
+    (("Altair",), "star", 297.6958, 8.8683, 0.76),
+    (("Acrux",), "star", 186.6496, -63.0991, 0.76),
+    (("Aldebaran",), "star", 68.9802, 16.5093, 0.86),
+    (("Antares",), "star", 247.3519, -26.4320, 0.96),
+    (("Spica",), "star", 201.2983, -11.1613, 0.97),
+    (("Pollux",), "star", 116.3290, 28.0262, 1.14),
+    (("Fomalhaut",), "star", 344.4127, -29.6222, 1.16),
+    (("Deneb",), "star", 310.3580, 45.2803, 1.25),
+    (("Mimosa",), "star", 191.9303, -59.6888, 1.25),
+    (("Regulus",), "star", 152.0930, 11.9672, 1.40),
+    (("Adhara",), "star", 104.6565, -28.9721, 1.50),
+    (("Castor",), "star", 113.6494, 31.8883, 1.58),
+    (("Shaula",), "star", 263.4022, -37.1038, 1.62),
+    (("Gacrux",), "star", 187.7915, -57.1132, 1.63),
+    (("Bellatrix",), "star", 81.2828, 6.3497, 1.64),
+    (("Elnath",), "star", 81.5730, 28.6075, 1.65),
+    (("Miaplacidus",), "star", 138.3000, -69.7172, 1.67),
+    (("Alnilam",), "star", 84.0534, -1.2019, 1.69),
+    (("Alnair",), "star", 332.0583, -46.9610, 1.74),
+    (("Alnitak",), "star", 85.1897, -1.9426, 1.77),
+    (("Alioth",), "star", 193.5073, 55.9598, 1.77),
+    (("Dubhe",), "star", 165.9320, 61.7510, 1.79),
+    (("Mirfak",), "star", 51.0807, 49.8612, 1.79),
+    (("Wezen",), "star", 107.0979, -26.3932, 1.83),
+    (("Kaus Australis",), "star", 276.0430, -34.3846, 1.85),
+    (("Alkaid",), "star", 206.8852, 49.3133, 1.86),
+    (("Polaris", "North Star"), "star", 37.9546, 89.2641, 1.98),
+    (("Alphard",), "star", 141.8968, -8.6586, 1.98),
+    (("Hamal",), "star", 31.7934, 23.4624, 2.00),
+    (("Alpheratz",), "star", 2.0969, 29.0904, 2.06),
+    (("Kochab",), "star", 222.6764, 74.1555, 2.08),
+    (("Rasalhague",), "star", 263.7336, 12.5600, 2.08),
+    (("Algol",), "star", 47.0422, 40.9556, 2.12),
+    (("Denebola",), "star", 177.2649, 14.5721, 2.13),
+    (("Andromeda Galaxy", "M31"), "deep_space", 10.6847, 41.2690, 3.44),
+    (("Orion Nebula", "M42"), "deep_space", 83.8221, -5.3911, 4.0),
+    (("Pleiades", "M45"), "deep_space", 56.7500, 24.1167, 1.6),
+    (("Beehive Cluster", "M44"), "deep_space", 130.1000, 19.6667, 3.7),
+    (("Hercules Cluster", "M13"), "deep_space", 250.4235, 36.4613, 5.8),
+    (("Triangulum Galaxy", "M33"), "deep_space", 23.4621, 30.6599, 5.7),
+    (("Whirlpool Galaxy", "M51"), "deep_space", 202.4696, 47.1952, 8.4),
+    (("Ring Nebula", "M57"), "deep_space", 283.3963, 33.0292, 8.8),
+    (("Bode's Galaxy", "M81"), "deep_space", 148.8882, 69.0653, 6.9),
+    (("Sombrero Galaxy", "M104"), "deep_space", 189.9976, -11.6231, 8.0),
+    (("Lagoon Nebula", "M8"), "deep_space", 270.9042, -24.3867, 6.0),
+    (("Dumbbell Nebula", "M27"), "deep_space", 299.9016, 22.7211, 7.5),
+    (("Crab Nebula", "M1"), "deep_space", 83.6331, 22.0145, 8.4),
+    (("Omega Centauri",), "deep_space", 201.6968, -47.4795, 3.9),
+    (("Large Magellanic Cloud", "LMC"), "deep_space", 80.8938, -69.7561, 0.9),
+    (("Small Magellanic Cloud", "SMC"), "deep_space", 13.1867, -72.8286, 2.7),
+    (("Galactic Center", "Sagittarius A*"), "deep_space", 266.4168, -29.0078, 25.0),
+]
+
+
+class StarCatalog:
+    """
+    Fixed-object catalog held as NumPy columns
+
+    Objects are looked up by name through a hash index and by direction
+    through a k-d tree on J2000 unit vectors. Alt/az for the whole catalog
+    (or any subset of rows) is one matrix product per time.
+
+    The index, unit vectors and tree are built on first use, so loading a
+    memory-mapped catalog reads no rows until they are needed. They are
+    shared with the catalogs made by ``for_location``.
+    """
+
+    def __init__(self, ra: np.ndarray, dec: np.ndarray, magnitude: np.ndarray,
+                 kind: np.ndarray, names: List[List[str]],
+                 latitude: float = 0.0, longitude: float = 0.0):
+        self.ra = ra
+        self.dec = dec
+        self.magnitude = magnitude
+        self.kind = kind
+        self.names = names
+        self.latitude = latitude
+        self.longitude = longitude
+
+        self._derived: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.ra)
+
+    @classmethod
+    def builtin(cls, latitude: float = 0.0, longitude: float = 0.0) -> "StarCatalog":
+        """Create the catalog from the built-in bright star and Messier subset"""
+        names = [list(entry[0]) for entry in BUILTIN_OBJECTS]
+        kind = np.array([KIND_CODES[entry[1]] for entry in BUILTIN_OBJECTS], dtype=np.uint8)
+        ra = np.array([entry[2] for entry in BUILTIN_OBJECTS])
+        dec = np.array([entry[3] for entry in BUILTIN_OBJECTS])
+        magnitude = np.array([entry[4] for entry in BUILTIN_OBJECTS], dtype=np.float32)
+        return cls(ra, dec, magnitude, kind, names, latitude, longitude)
+
+    @classmethod
+    def from_csv(cls, path, latitude: float = 0.0, longitude: float = 0.0) -> "StarCatalog":
+        """
+        Build a catalog from a CSV dump (e.g. a Hipparcos or bright star extract)
+
+        Expected columns: name, ra (degrees), dec (degrees), magnitude and
+        optionally type ("star" or "deep_space") and aliases (";"-separated).
+        """
+        names, ra, dec, magnitude, kind = [], [], [], [], []
+        with open(path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                aliases = [alias for alias in row.get("aliases", "").split(";") if alias]
+                names.append([row["name"]] + aliases)
+                ra.append(float(row["ra"]))
+                dec.append(float(row["dec"]))
+                magnitude.append(float(row.get("magnitude") or 99.0))
+                kind.append(KIND_CODES[row.get("type") or "star"])
+        return cls(np.array(ra), np.array(dec), np.array(magnitude, dtype=np.float32),
+                   np.array(kind, dtype=np.uint8), names, latitude, longitude)
+
+    @classmethod
+    def load(cls, directory, latitude: float = 0.0, longitude: float = 0.0) -> "StarCatalog":
+        """Memory-map a catalog directory written by ``save``"""
+        directory = Path(directory)
+        columns = {column: np.load(directory / f"{column}.npy", mmap_mode='r')
+                   for column in COLUMNS}
+        with open(directory / "names.json", 'r') as f:
+            names = json.load(f)
+        return cls(columns["ra"], columns["dec"], columns["magnitude"], columns["kind"],
+                   names, latitude, longitude)
+
+    @classmethod
+    def open(cls, directory, latitude: float = 0.0, longitude: float = 0.0) -> "StarCatalog":
+        """Load a catalog directory if present, otherwise use the built-in catalog"""
+        directory = Path(directory)
+        if (directory / "names.json").exists():
+            try:
+                catalog = cls.load(directory, latitude, longitude)
+                logger.info(f"Loaded {len(catalog)} catalog objects from {directory}")
+                return catalog
+            except Exception as e:
+                logger.error(f"Failed to load catalog from {directory}: {e}")
+        return cls.builtin(latitude, longitude)
+
+    def save(self, directory):
+        """Write the catalog as one .npy file per column plus a name table"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for column in COLUMNS:
+            np.save(directory / f"{column}.npy", np.ascontiguousarray(getattr(self, column)))
+        with open(directory / "names.json", 'w') as f:
+            json.dump(self.names, f)
+
+    def for_location(self, latitude: float, longitude: float) -> "StarCatalog":
+        """Catalog for another observer sharing this one's columns and indexes"""
+        other = copy.copy(self)
+        other.latitude = latitude
+        other.longitude = longitude
+        return other
+
+    @property
+    def unit_vectors(self) -> np.ndarray:
+        """J2000 unit vectors of every row, computed on first use"""
+        if "unit_vectors" not in self._derived:
+            self._derived["unit_vectors"] = radec_to_unit(self.ra, self.dec)
+        return self._derived["unit_vectors"]
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """Row of each lower-case name and alias, built on first lookup"""
+        if "index" not in self._derived:
+            index: Dict[str, int] = {}
+            for row, aliases in enumerate(self.names):
+                for alias in aliases:
+                    index.setdefault(alias.lower(), row)
+            self._derived["index"] = index
+        return self._derived["index"]
+
+    def find(self, name: str) -> Optional[int]:
+        """Find a catalog row by name or alias (case-insensitive)"""
+        return self.index.get(name.lower())
+
+    def altaz(self, rows: Optional[Sequence[int]] = None, seconds=None):
+        """
+        Calculate azimuth and elevation for catalog objects
+
+        Args:
+            rows: Catalog rows, defaults to the whole catalog
+            seconds: Unix timestamp(s), defaults to now
+
+        Returns:
+            tuple: (azimuth, elevation) arrays of shape (len(rows), n_times)
+                in degrees
+        """
+        seconds = np.atleast_1d(time.time() if seconds is None else seconds)
+        if rows is None:
+            vectors = self.unit_vectors
+        elif "unit_vectors" in self._derived:
+            vectors = self.unit_vectors[np.asarray(rows)]
+        else:
+            # A few rows need not read the whole catalog
+            rows = np.asarray(rows)
+            vectors = radec_to_unit(self.ra[rows], self.dec[rows])
+        matrices = horizon_matrix(self.latitude, self.longitude, seconds)
+        enu = np.einsum('tij,nj->nti', matrices, vectors)
+        return enu_to_azel(enu)
+
+    def get_position(self, name: str, when: Optional[float] = None):
+        """
+        Calculate azimuth and elevation of one catalog object
+
+        Returns:
+            tuple: (azimuth, elevation) in degrees, or (None, None)
+        """
+        row = self.find(name)
+        if row is None:
+            return None, None
+        azimuth, elevation = self.altaz([row], when)
+        return float(azimuth[0, 0]), float(elevation[0, 0])
+
+    def visible(self, when: Optional[float] = None, min_elevation: float = 0.0,
+                limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find the brightest objects currently above an elevation limit
+
+        The k-d tree is queried for the cap of sky above ``min_elevation``
+        around the local zenith, so only those rows are converted to alt/az.
+
+        Args:
+            when: Unix timestamp, defaults to now
+            min_elevation: Minimum elevation in degrees
+            limit: Maximum number of objects to return
+            kind: Optional filter, "star" or "deep_space"
+
+        Returns:
+            list: Dicts with name, type, magnitude, azimuth and elevation,
+                brightest first
+        """
+        matrix = horizon_matrix(self.latitude, self.longitude,
+                                time.time() if when is None else when)
+        zenith = matrix.T @ np.array([0.0, 0.0, 1.0])
+        chord = 2.0 * np.sin(np.radians(90.0 - min_elevation) / 2.0)
+        rows = np.array(self.tree.query_ball_point(zenith, chord), dtype=int)
+        if kind is not None:
+            rows = rows[self.kind[rows] == KIND_CODES[kind]]
+        rows = rows[np.argsort(self.magnitude[rows], kind='stable')][:limit]
+
+        azimuth, elevation = enu_to_azel(self.unit_vectors[rows] @ matrix.T)
+        return [{
+            "name": self.names[row][0],
+            "type": KIND_NAMES[int(self.kind[row])],
+            "magnitude": float(self.magnitude[row]),
+            "azimuth": float(az),
+            "elevation": float(el),
+        } for row, az, el in zip(rows, azimuth, elevation)]
+
+    @property
+    def tree(self):
+        """k-d tree on J2000 unit vectors, built on first spatial query"""
+        if "tree" not in self._derived:
+            from scipy.spatial import cKDTree
+            self._derived["tree"] = cKDTree(self.unit_vectors)
+        return self._derived["tree"]
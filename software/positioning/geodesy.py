@@ -0,0 +1,280 @@
+"""
+Closed-form geodesy helpers: WGS84 ECEF, ENU and Earth rotation
+
+All functions take and return NumPy arrays and broadcast over leading
+dimensions, so whole target lists and time series are solved in one call.
+Distances are in kilometers and angles in degrees unless noted.
+"""
+
+import numpy as np
+
+# WGS84 ellipsoid
+WGS84_A_KM = 6378.137
+WGS84_F = 1.0 / 298.257223563
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+DAY_S = 86400.0
+
+
+def unix_to_jd(seconds):
+    """
+    Convert Unix timestamps to a split Julian date
+
+    Returns:
+        tuple: (whole, fraction) arrays whose sum is the UTC Julian date
+    """
+    days = np.asarray(seconds, dtype=float) / DAY_S
+    whole = np.floor(days)
+    return whole + UNIX_EPOCH_JD, days - whole
+
+
+def gmst_radians(jd_whole, jd_fraction=0.0):
+    """
+    Greenwich mean sidereal time (IAU 1982) in radians
+
+    UTC is accepted in place of UT1; the <0.9 s difference is a few
+    thousandths of a degree of Earth rotation.
+    """
+    t = (jd_whole - J2000_JD + jd_fraction) / 36525.0
+    g = 67310.54841 + (8640184.812866 + (0.093104 + (-6.2e-6) * t) * t) * t
+    return (np.mod(jd_whole, 1.0) + jd_fraction + np.mod(g / DAY_S, 1.0)) % 1.0 * 2.0 * np.pi
+
+
+def geodetic_to_ecef(latitude, longitude, altitude_m=0.0):
+    """
+    Convert WGS84 geodetic coordinates to Earth-centered Earth-fixed
+
+    Args:
+        latitude: Latitude(s) in degrees
+        longitude: Longitude(s) in degrees
+        altitude_m: Height(s) above the ellipsoid in meters
+
+    Returns:
+        ndarray: ECEF positions in kilometers, shape (..., 3)
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    h = np.asarray(altitude_m, dtype=float) / 1000.0
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = WGS84_A_KM / np.sqrt(1.0 - WGS84_E2 * sin_lat * sin_lat)
+    return np.stack([
+        (n + h) * cos_lat * np.cos(lon),
+        (n + h) * cos_lat * np.sin(lon),
+        (n * (1.0 - WGS84_E2) + h) * sin_lat,
+    ], axis=-1)
+
+
+def enu_matrix(latitude, longitude):
+    """
+    Rotation from ECEF to local east/north/up axes at a geodetic location
+
+    Returns:
+        ndarray: 3x3 matrix whose rows are the east, north and up unit vectors
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+    return np.array([
+        [-sin_lon, cos_lon, 0.0],
+        [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+        [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat],
+    ])
+
+
+def enu_to_azel(enu):
+    """
+    Convert local east/north/up vectors to azimuth and elevation
+
+    Args:
+        enu: Vectors of shape (..., 3), any length
+
+    Returns:
+        tuple: (azimuth, elevation) arrays in degrees, azimuth in 0-360
+    """
+    east, north, up = enu[..., 0], enu[..., 1], enu[..., 2]
+    azimuth = np.degrees(np.arctan2(east, north)) % 360.0
+    elevation = np.degrees(np.arctan2(up, np.hypot(east, north)))
+    return azimuth, elevation
+
+
+def ecef_to_azel(target_ecef, observer_ecef, rotation):
+    """
+    Line-of-sight azimuth and elevation from an observer to ECEF targets
+
+    Args:
+        target_ecef: Target positions, shape (..., 3)
+        observer_ecef: Observer position, shape (3,)
+        rotation: ECEF to ENU matrix for the observer (see ``enu_matrix``)
+
+    Returns:
+        tuple: (azimuth, elevation) arrays in degrees
+    """
+    enu = (np.asarray(target_ecef) - observer_ecef) @ rotation.T
+    return enu_to_azel(enu)
+
+
+def rotate_z(vectors, angle):
+    """
+    Rotate vectors of shape (..., 3) about the z axis by angle(s) in radians
+
+    Used to take TEME/equatorial vectors into the Earth-fixed frame by
+    rotating through -GMST.
+    """
+    cos_a = np.cos(angle)
+    sin_a = np.sin(angle)
+    x, y, z = vectors[..., 0], vectors[..., 1], vectors[..., 2]
+    return np.stack([cos_a * x - sin_a * y, sin_a * x + cos_a * y,
+                     np.broadcast_to(z, np.broadcast(x, cos_a).shape)], axis=-1)
+
+
+def _frame_rotation_z(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    zero, one = np.zeros_like(c), np.ones_like(c)
+    return np.stack([np.stack([c, s, zero], axis=-1),
+                     np.stack([-s, c, zero], axis=-1),
+                     np.stack([zero, zero, one], axis=-1)], axis=-2)
+
+
+def _frame_rotation_y(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c]])
+
+
+def precession_matrix(jd):
+    """
+    IAU 1976 precession from the J2000 equator and equinox to date
+
+    Args:
+        jd: Julian date (scalar); UTC is close enough to TT for pointing
+
+    Returns:
+        ndarray: 3x3 matrix taking J2000 unit vectors to mean-of-date
+    """
+    t = (jd - J2000_JD) / 36525.0
+    arcsec = np.pi / (180.0 * 3600.0)
+    zeta = (2306.2181 * t + 0.30188 * t ** 2 + 0.017998 * t ** 3) * arcsec
+    z = (2306.2181 * t + 1.09468 * t ** 2 + 0.018203 * t ** 3) * arcsec
+    theta = (2004.3109 * t - 0.42665 * t ** 2 - 0.041833 * t ** 3) * arcsec
+    return _frame_rotation_z(-z) @ _frame_rotation_y(theta) @ _frame_rotation_z(-zeta)
+
+
+def radec_to_unit(ra_degrees, dec_degrees):
+    """Unit vectors of shape (..., 3) for right ascension/declination in degrees"""
+    ra = np.radians(ra_degrees)
+    dec = np.radians(dec_degrees)
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+def horizon_matrix(latitude, longitude, seconds):
+    """
+    Rotation from J2000 equatorial unit vectors to local east/north/up
+
+    Combines precession to date, Earth rotation (GMST) and the observer's
+    horizon frame. Nutation, aberration and refraction are neglected, which
+    keeps the error for fixed stars well under 0.05 degrees. For arrays of
+    times precession is evaluated once at the mean time, since it moves
+    the sky by well under an arcsecond per day.
+
+    Args:
+        latitude: Observer geodetic latitude in degrees
+        longitude: Observer longitude in degrees
+        seconds: Unix timestamp(s)
+
+    Returns:
+        ndarray: Matrix of shape (..., 3, 3), one per timestamp
+    """
+    jd_whole, jd_fraction = unix_to_jd(seconds)
+    earth_rotation = _frame_rotation_z(gmst_radians(jd_whole, jd_fraction))
+    return (enu_matrix(latitude, longitude) @ earth_rotation
+            @ precession_matrix(np.mean(jd_whole + jd_fraction)))
+
+
+def standard_pressure_mbar(altitude_m):
+    """Pressure of the standard atmosphere at a height above sea level"""
+    return 1013.25 * (1.0 - 2.25577e-5 * np.asarray(altitude_m, dtype=float)) ** 5.25588
+
+
+def refraction_degrees(elevation, temperature_c=10.0, pressure_mbar=1010.0):
+    """
+    Atmospheric refraction for a true (unrefracted) elevation
+
+    Saemundsson's formula, scaled for temperature and pressure. Objects
+    appear higher by the returned amount. It is zero more than one degree
+    below the horizon, where the formula no longer applies.
+
+    Args:
+        elevation: True elevation(s) in degrees
+        temperature_c: Air temperature in degrees Celsius
+        pressure_mbar: Air pressure in millibars
+
+    Returns:
+        ndarray: Refraction in degrees
+    """
+    elevation = np.asarray(elevation, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arcmin = 1.02 / np.tan(np.radians(elevation + 10.3 / (elevation + 5.11)))
+    arcmin *= (pressure_mbar / 1010.0) * (283.0 / (273.0 + temperature_c))
+    return np.where((elevation >= -1.0) & (elevation <= 89.9), arcmin / 60.0, 0.0)
+
+
+class TerrestrialSolver:
+    """
+    Line-of-sight pointing from the device to places on Earth
+
+    Targets are converted to ECEF and the straight line from the observer is
+    expressed in the observer's east/north/up frame, so distant places come
+    out below the horizon, pointing through the Earth. Terrestrial targets
+    never move, so every solution is cached by coordinates.
+    """
+
+    def __init__(self, latitude: float = 0.0, longitude: float = 0.0, altitude: float = 0.0):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.observer_ecef = geodetic_to_ecef(latitude, longitude, altitude)
+        self.rotation = enu_matrix(latitude, longitude)
+        self._cache = {}
+
+    @classmethod
+    def from_config(cls, config) -> "TerrestrialSolver":
+        """Create a solver for the device location in settings.json"""
+        return cls(
+            config.get_nested_setting("device", "location", "latitude", default=0.0),
+            config.get_nested_setting("device", "location", "longitude", default=0.0),
+            config.get_nested_setting("device", "location", "altitude", default=0.0),
+        )
+
+    def solve(self, latitudes, longitudes, altitudes=0.0):
+        """
+        Calculate azimuth and elevation for many terrestrial targets at once
+
+        Args:
+            latitudes: Target latitudes in degrees
+            longitudes: Target longitudes in degrees
+            altitudes: Target heights above the ellipsoid in meters
+
+        Returns:
+            tuple: (azimuth, elevation) arrays in degrees
+        """
+        targets = geodetic_to_ecef(latitudes, longitudes, altitudes)
+        return ecef_to_azel(targets, self.observer_ecef, self.rotation)
+
+    def get_position(self, latitude: float, longitude: float, altitude: float = 0.0):
+        """
+        Calculate azimuth and elevation for one terrestrial target (cached)
+
+        Returns:
+            tuple: (azimuth, elevation) in degrees
+        """
+        key = (latitude, longitude, altitude)
+        position = self._cache.get(key)
+        if position is None:
+            azimuth, elevation = self.solve(latitude, longitude, altitude)
+            position = (float(azimuth), float(elevation))
+            self._cache[key] = position
+        return position
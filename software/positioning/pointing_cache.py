@@ -0,0 +1,255 @@
+"""
+Interpolating cache of pointing solutions in front of AstronomyCalculator
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.polynomial import chebyshev
+
+logger = logging.getLogger(__name__)
+
+# Span of sky covered by one fitted window, per target type (seconds)
+DEFAULT_WINDOW_SECONDS = {
+    "satellite": 60.0,
+    "planet": 2 * 3600.0,
+    "star": 6 * 3600.0,
+    "deep_space": 6 * 3600.0,
+    "earth_location": 24 * 3600.0,
+}
+
+
+def target_key(target: Dict[str, Any]) -> str:
+    """Identity of a target's position: its type and lower-cased name"""
+    return f"{target.get('type', '')}:{target.get('name', '').lower()}"
+
+
+class PointingWindow:
+    """Chebyshev fit of azimuth and elevation for one target over a time span"""
+
+    def __init__(self, start: float, end: float, az_coef: np.ndarray,
+                 el_coef: np.ndarray, max_error: float):
+        self.start = start
+        self.end = end
+        self.az_coef = az_coef
+        self.el_coef = el_coef
+        self.max_error = max_error
+
+    def covers(self, when: float) -> bool:
+        """Check whether a Unix timestamp falls inside this window"""
+        return self.start <= when <= self.end
+
+    def evaluate(self, when) -> Tuple[Any, Any]:
+        """Evaluate azimuth and elevation (degrees) at Unix timestamp(s)"""
+        x = (2.0 * (np.asarray(when, dtype=float) - self.start)
+             / (self.end - self.start) - 1.0)
+        azimuth = chebyshev.chebval(x, self.az_coef) % 360.0
+        elevation = chebyshev.chebval(x, self.el_coef)
+        return azimuth, elevation
+
+
+class PointingCache:
+    """
+    Caches target positions as short-span Chebyshev polynomials
+
+    A miss samples the target with the batch solver at Chebyshev nodes over a
+    window sized for the target type, fits azimuth and elevation, and checks
+    the fit against extra solves between the nodes. Windows that miss the
+    tolerance are halved and refitted; if none does after several halvings the
+    query is solved directly and nothing is cached. Queries inside a window
+    are answered by polynomial evaluation without touching the ephemeris.
+
+    Elevations are fitted before refraction, which is added on evaluation:
+    its steep rise at the horizon does not fit a low-degree polynomial.
+
+    The span that last fitted is remembered per target and the next fit
+    starts from it (twice it, once it fitted first time), so a target that
+    needs short windows does not pay for the failed halvings on every miss.
+    A target that fits no window at all, or cannot be solved, is solved
+    directly for one window length of its type before fitting is tried
+    again.
+    """
+
+    def __init__(self, astronomy, tolerance_degrees: float = 0.1, degree: int = 8,
+                 window_seconds: Optional[Dict[str, float]] = None,
+                 max_entries: int = 256):
+        self.astronomy = astronomy
+        self.tolerance = tolerance_degrees
+        self.degree = degree
+        self.window_seconds = dict(DEFAULT_WINDOW_SECONDS)
+        self.window_seconds.update(window_seconds or {})
+        self.max_entries = max_entries
+
+        self.windows: "OrderedDict[str, PointingWindow]" = OrderedDict()
+        # Span to start the next fit from, and "solve directly until" times
+        self._spans: Dict[str, float] = {}
+        self._direct_until: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.fits = 0
+        self.direct = 0
+        self.max_error = 0.0
+
+    @classmethod
+    def from_config(cls, astronomy, config) -> "PointingCache":
+        """Create a cache using the ``pointing_cache`` section of settings.json"""
+        return cls(
+            astronomy,
+            tolerance_degrees=config.get_nested_setting("pointing_cache", "tolerance_degrees", default=0.1),
+            degree=config.get_nested_setting("pointing_cache", "degree", default=8),
+            window_seconds=config.get_nested_setting("pointing_cache", "window_seconds", default=None),
+            max_entries=config.get_nested_setting("pointing_cache", "max_entries", default=256),
+        )
+
+    def get_position(self, target: Dict[str, Any], when: Optional[float] = None):
+        """
+        Get the azimuth and elevation of a target
+
+        Args:
+            target: Target dictionary as loaded from targets.json
+            when: Unix timestamp, defaults to now
+
+        Returns:
+            tuple: (azimuth, elevation) in degrees, or (None, None)
+        """
+        when = time.time() if when is None else float(when)
+        key = self._key(target)
+
+        window = self.windows.get(key)
+        if window is not None and window.covers(when):
+            self.hits += 1
+            self.windows.move_to_end(key)
+            return self._evaluate(target, window, when)
+
+        self.misses += 1
+        if when < self._direct_until.get(key, -np.inf):
+            # Known not to fit around now: no point trying again yet
+            self.direct += 1
+            azimuth, elevation = self.astronomy.calculate_batch_azimuth_elevation([target], [when])
+            return self._position(azimuth[0, 0], elevation[0, 0])
+        # A miss costs a fit anyway, so drop windows that have run out here
+        self.evict_expired(when)
+        window, position = self._fit(target, when)
+        if window is None:
+            # No window within tolerance: answer with the fit's own solve of ``when``
+            self.direct += 1
+            return position
+
+        self.windows[key] = window
+        self.windows.move_to_end(key)
+        while len(self.windows) > self.max_entries:
+            self.windows.popitem(last=False)
+
+        return self._evaluate(target, window, when)
+
+    @staticmethod
+    def _position(azimuth: float, elevation: float):
+        if np.isnan(azimuth) or np.isnan(elevation):
+            return None, None
+        return float(azimuth), float(elevation)
+
+    def _evaluate(self, target: Dict[str, Any], window: PointingWindow, when: float):
+        azimuth, elevation = window.evaluate(when)
+        return float(azimuth), float(self.astronomy.refract(target.get("type"), elevation))
+
+    def invalidate(self, target: Optional[Dict[str, Any]] = None):
+        """Drop the window for one target, or every window"""
+        if target is None:
+            self.windows.clear()
+            self._spans.clear()
+            self._direct_until.clear()
+        else:
+            key = self._key(target)
+            self.windows.pop(key, None)
+            self._spans.pop(key, None)
+            self._direct_until.pop(key, None)
+
+    def evict_expired(self, when: Optional[float] = None) -> int:
+        """Drop windows that end before the given time, returning the count"""
+        when = time.time() if when is None else when
+        expired = [key for key, window in self.windows.items() if window.end < when]
+        for key in expired:
+            del self.windows[key]
+        for key in [key for key, until in self._direct_until.items() if until < when]:
+            del self._direct_until[key]
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the worst fit error seen (degrees)"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "fits": self.fits,
+            "direct_solves": self.direct,
+            "windows": len(self.windows),
+            "max_error_degrees": self.max_error,
+            "tolerance_degrees": self.tolerance,
+        }
+
+    def _key(self, target: Dict[str, Any]) -> str:
+        return target_key(target)
+
+    def _fit(self, target: Dict[str, Any], start: float):
+        """
+        Fit a window starting at ``start``, shrinking it until it is accurate
+
+        Returns:
+            tuple: (PointingWindow, None), or (None, (azimuth, elevation) at
+                ``start``) if the target cannot be solved or no window met
+                the tolerance
+        """
+        key = self._key(target)
+        window_seconds = self.window_seconds.get(target.get("type"), 3600.0)
+        span = min(window_seconds, self._spans.get(key, window_seconds))
+        # Seven halvings of the full window at most, wherever the fit starts
+        min_span = window_seconds / 2 ** 7
+        n_nodes = self.degree + 1
+
+        # Chebyshev nodes on [-1, 1] plus the midpoints between them for
+        # checking, and the start itself to answer from if nothing fits
+        nodes = np.cos(np.pi * (np.arange(n_nodes) + 0.5) / n_nodes)[::-1]
+        checks = (nodes[:-1] + nodes[1:]) / 2.0
+        x = np.concatenate([nodes, checks, [-1.0]])
+        n_checked = len(x) - 1
+
+        attempt = 0
+        while span >= min_span:
+            times = start + (x + 1.0) * span / 2.0
+            azimuth, elevation = self.astronomy.calculate_batch_azimuth_elevation(
+                [target], times, refract=False)
+            azimuth, elevation = azimuth[0], elevation[0]
+            position = self._position(azimuth[-1], self.astronomy.refract(target.get("type"), elevation[-1]))
+            if np.isnan(azimuth).any() or np.isnan(elevation).any():
+                self._direct_until[key] = start + window_seconds
+                return None, position
+            azimuth, elevation = azimuth[:n_checked], elevation[:n_checked]
+
+            unwrapped = np.unwrap(azimuth, period=360.0)
+            az_coef = chebyshev.chebfit(x[:n_nodes], unwrapped[:n_nodes], self.degree)
+            el_coef = chebyshev.chebfit(x[:n_nodes], elevation[:n_nodes], self.degree)
+            self.fits += 1
+
+            # Angular error at the check points, azimuth scaled onto the sky
+            az_error = np.abs(chebyshev.chebval(checks, az_coef) - unwrapped[n_nodes:])
+            el_error = np.abs(chebyshev.chebval(checks, el_coef) - elevation[n_nodes:])
+            az_error *= np.cos(np.radians(elevation[n_nodes:]))
+            error = float(np.max(np.hypot(az_error, el_error)))
+
+            if error <= self.tolerance:
+                self.max_error = max(self.max_error, error)
+                # Let a span shrunk for a hard stretch grow back
+                self._spans[key] = min(window_seconds, 2.0 * span) if attempt == 0 else span
+                return PointingWindow(start, start + span, az_coef, el_coef, error), None
+            span /= 2.0
+            attempt += 1
+
+        logger.warning(f"Pointing fit for {target.get('name')} exceeds tolerance "
+                       f"({error:.3f}° > {self.tolerance:.3f}°), solving directly")
+        self._spans[key] = min_span
+        self._direct_until[key] = start + window_seconds
+        return None, position
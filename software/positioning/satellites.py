@@ -0,0 +1,195 @@
+"""
+Offline satellite tracking from local TLE files with vectorized SGP4
+"""
+
+import copy
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sgp4.api import Satrec, SatrecArray
+
+from positioning.geodesy import (unix_to_jd, gmst_radians, geodetic_to_ecef,
+                                 enu_matrix, ecef_to_azel, rotate_z)
+
+logger = logging.getLogger(__name__)
+
+TLE_PATTERNS = ("*.tle", "*.txt")
+
+# Common target names that do not match the name line in published TLE sets
+NORAD_ALIASES = {
+    "international space station": 25544,
+    "iss": 25544,
+    "hubble space telescope": 20580,
+    "tiangong": 48274,
+}
+
+
+class SatelliteTracker:
+    """
+    Propagates many TLE satellites at once and converts to local az/el
+
+    All satellites are held in one SGP4 ``SatrecArray`` so a single call
+    propagates every requested satellite over every requested time in C.
+    TEME positions are rotated into the Earth-fixed frame by GMST and then
+    into the observer's local horizon frame with NumPy.
+    """
+
+    def __init__(self, data_directory: str = "data", latitude: float = 0.0,
+                 longitude: float = 0.0, altitude: float = 0.0):
+        self.data_directory = Path(data_directory)
+        self.names: List[str] = []
+        self.norad_ids: List[int] = []
+        self._satrecs: List[Satrec] = []
+        self._by_name: Dict[str, int] = {}
+        self._by_id: Dict[int, int] = {}
+        self._arrays: Dict[Tuple[int, ...], SatrecArray] = {}
+        self._loaded = False
+
+        self.observer_ecef = geodetic_to_ecef(latitude, longitude, altitude)
+        self.rotation = enu_matrix(latitude, longitude)
+
+    def for_location(self, latitude: float, longitude: float,
+                     altitude: float = 0.0) -> "SatelliteTracker":
+        """
+        Tracker for another observer sharing this one's elements
+
+        Satellites added to either tracker afterwards are seen by both.
+        """
+        if not self._loaded:
+            self.load()
+        other = copy.copy(self)
+        other.observer_ecef = geodetic_to_ecef(latitude, longitude, altitude)
+        other.rotation = enu_matrix(latitude, longitude)
+        return other
+
+    def load(self) -> int:
+        """
+        Load every TLE file in the data directory
+
+        Returns:
+            int: Number of satellites loaded
+        """
+        self._loaded = True
+        if not self.data_directory.is_dir():
+            logger.warning(f"TLE directory not found: {self.data_directory}")
+            return 0
+
+        for pattern in TLE_PATTERNS:
+            for path in sorted(self.data_directory.glob(pattern)):
+                try:
+                    self._load_file(path)
+                except Exception as e:
+                    logger.error(f"Failed to read TLE file {path}: {e}")
+
+        logger.info(f"Loaded {len(self._satrecs)} satellites from {self.data_directory}")
+        return len(self._satrecs)
+
+    def _load_file(self, path: Path):
+        """Parse a 2-line or 3-line TLE file"""
+        name = None
+        line1 = None
+        with open(path, 'r') as f:
+            for raw in f:
+                line = raw.rstrip()
+                if not line:
+                    continue
+                if line.startswith("1 ") and len(line) >= 69:
+                    line1 = line
+                elif line.startswith("2 ") and line1 is not None:
+                    self.add_tle(name or line1[2:7].strip(), line1, line)
+                    name = None
+                    line1 = None
+                else:
+                    name = line[2:].strip() if line.startswith("0 ") else line.strip()
+
+    def add_tle(self, name: str, line1: str, line2: str) -> int:
+        """
+        Add (or replace) a satellite from its TLE lines
+
+        Returns:
+            int: Index of the satellite in the tracker
+        """
+        satrec = Satrec.twoline2rv(line1, line2)
+        norad_id = int(satrec.satnum)
+        index = self._by_id.get(norad_id)
+        if index is None:
+            index = len(self._satrecs)
+            self._satrecs.append(satrec)
+            self.names.append(name)
+            self.norad_ids.append(norad_id)
+        else:
+            self._satrecs[index] = satrec
+            self.names[index] = name
+
+        self._by_id[norad_id] = index
+        self._by_name[name.lower()] = index
+        self._arrays.clear()
+        return index
+
+    def find(self, name: Optional[str] = None, norad_id: Optional[int] = None) -> Optional[int]:
+        """Find a satellite index by NORAD catalog number or name (case-insensitive)"""
+        if not self._loaded:
+            self.load()
+        if norad_id is None and name is not None:
+            norad_id = NORAD_ALIASES.get(name.lower())
+        if norad_id is not None and int(norad_id) in self._by_id:
+            return self._by_id[int(norad_id)]
+        if name is not None:
+            return self._by_name.get(name.lower())
+        return None
+
+    def propagate(self, indices: Sequence[int], seconds) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate azimuth and elevation for several satellites over many times
+
+        Args:
+            indices: Satellite indices as returned by ``find``
+            seconds: Unix timestamp(s)
+
+        Returns:
+            tuple: (azimuth, elevation) arrays of shape (len(indices), n_times)
+                in degrees, NaN where SGP4 reported an error
+        """
+        jd, fraction = unix_to_jd(np.atleast_1d(seconds))
+        error, position, _ = self._array(tuple(indices)).sgp4(jd, fraction)
+
+        ecef = rotate_z(position, -gmst_radians(jd, fraction))
+        azimuth, elevation = ecef_to_azel(ecef, self.observer_ecef, self.rotation)
+        failed = error != 0
+        azimuth[failed] = np.nan
+        elevation[failed] = np.nan
+        return azimuth, elevation
+
+    def get_position(self, name: str, when: Optional[float] = None,
+                     norad_id: Optional[int] = None) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Calculate azimuth and elevation of one satellite
+
+        Args:
+            name: Satellite name
+            when: Unix timestamp, defaults to now
+            norad_id: Optional NORAD catalog number, preferred over the name
+
+        Returns:
+            tuple: (azimuth, elevation) in degrees, or (None, None)
+        """
+        index = self.find(name, norad_id)
+        if index is None:
+            return None, None
+        azimuth, elevation = self.propagate([index], time.time() if when is None else when)
+        if np.isnan(azimuth[0, 0]):
+            return None, None
+        return float(azimuth[0, 0]), float(elevation[0, 0])
+
+    def _array(self, indices: Tuple[int, ...]) -> SatrecArray:
+        """SatrecArray for a set of satellites, built once per distinct set"""
+        array = self._arrays.get(indices)
+        if array is None:
+            if len(self._arrays) >= 64:
+                self._arrays.clear()
+            array = SatrecArray([self._satrecs[i] for i in indices])
+            self._arrays[indices] = array
+        return array
@@ -0,0 +1,125 @@
+"""
+Simulated hardware backends for running the controller without a device
+"""
+
+import math
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from kinematics.trajectory import shortest_azimuth_delta
+from hardware.imu import STANDARD_GRAVITY
+
+logger = logging.getLogger(__name__)
+
+
+class _SimulatedAxis:
+    """One servo axis: command latency, a rate limit and gear backlash"""
+
+    def __init__(self, max_rate_dps: float, backlash_degrees: float, wrap: bool):
+        self.max_rate = max_rate_dps
+        self.half_backlash = backlash_degrees / 2.0
+        self.wrap = wrap
+        self.motor = 0.0
+        self.output = 0.0
+        self.target = 0.0
+
+    def _delta(self, start: float, end: float) -> float:
+        return shortest_azimuth_delta(start, end) if self.wrap else end - start
+
+    def step(self, dt: float):
+        """Move the motor toward the target for dt seconds"""
+        limit = self.max_rate * dt
+        self.motor += max(-limit, min(limit, self._delta(self.motor, self.target)))
+        # The output shaft only moves once the motor has taken up the slack
+        slack = self._delta(self.output, self.motor)
+        if slack > self.half_backlash:
+            self.output += slack - self.half_backlash
+        elif slack < -self.half_backlash:
+            self.output += slack + self.half_backlash
+        if self.wrap:
+            self.motor %= 360.0
+            self.output %= 360.0
+
+
+class SimulatedServo:
+    """
+    Servo pair driven by the gimbal's setpoint writes
+
+    Commands take effect after ``latency`` seconds, the motors move at most
+    ``max_rate_dps`` toward them, and the output shafts lag the motors by
+    up to half the backlash on each direction reversal. The state is
+    advanced lazily to the clock whenever a command is written or the
+    position is read.
+    """
+
+    def __init__(self, clock, max_rate_dps: float = 300.0, latency: float = 0.02,
+                 backlash_degrees: float = 0.2):
+        self.clock = clock
+        self.latency = latency
+        self.azimuth = _SimulatedAxis(max_rate_dps, backlash_degrees, wrap=True)
+        self.elevation = _SimulatedAxis(max_rate_dps, backlash_degrees, wrap=False)
+        self._pending: List[Tuple[float, float, float]] = []
+        self._time = clock.monotonic()
+        self.writes = 0
+
+    def write(self, azimuth: float, elevation: float):
+        """Accept one setpoint, in degrees"""
+        now = self.clock.monotonic()
+        self._advance(now)
+        self._pending.append((now + self.latency, azimuth, elevation))
+        self.writes += 1
+
+    def _advance(self, until: float):
+        while self._pending and self._pending[0][0] <= until:
+            applied, azimuth, elevation = self._pending.pop(0)
+            self._step(applied - self._time)
+            self._time = applied
+            self.azimuth.target = azimuth % 360.0
+            self.elevation.target = elevation
+        self._step(until - self._time)
+        self._time = until
+
+    def _step(self, dt: float):
+        if dt > 0:
+            self.azimuth.step(dt)
+            self.elevation.step(dt)
+
+    def get_position(self) -> Tuple[float, float]:
+        """Actual output shaft angles (azimuth, elevation) now"""
+        self._advance(self.clock.monotonic())
+        return self.azimuth.output, self.elevation.output
+
+
+class SimulatedIMU:
+    """
+    Accelerometer and gyroscope of a stationary, possibly tilted base
+
+    Exposes the ``acceleration`` (m/s^2) and ``gyro`` (rad/s) attributes of
+    the real sensor driver, with white noise and a constant gyro bias.
+    """
+
+    def __init__(self, roll: float = 0.0, pitch: float = 0.0, accel_noise: float = 0.05,
+                 gyro_noise_dps: float = 0.1, gyro_bias_dps: Tuple[float, float, float] = (0.5, -0.3, 0.2),
+                 seed: Optional[int] = None):
+        self.roll = roll
+        self.pitch = pitch
+        self.accel_noise = accel_noise
+        self.gyro_noise = math.radians(gyro_noise_dps)
+        self.gyro_bias = np.radians(gyro_bias_dps)
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def acceleration(self) -> Tuple[float, float, float]:
+        roll, pitch = math.radians(self.roll), math.radians(self.pitch)
+        gravity = STANDARD_GRAVITY * np.array([
+            -math.sin(pitch),
+            math.sin(roll) * math.cos(pitch),
+            math.cos(roll) * math.cos(pitch),
+        ])
+        return tuple(gravity + self._rng.normal(0.0, self.accel_noise, 3))
+
+    @property
+    def gyro(self) -> Tuple[float, float, float]:
+        return tuple(self.gyro_bias + self._rng.normal(0.0, self.gyro_noise, 3))
@@ -0,0 +1,49 @@
+"""
+Shared fixtures: an observer at the benchmark reference location
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SOFTWARE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOFTWARE))
+
+from benchmarks.pointing_benchmark import DEFAULT_REFERENCES, REFERENCE_TLE, parse_epoch
+from positioning.astronomy import AstronomyCalculator
+
+# Ephemeris of the default configuration, only needed for planets
+EPHEMERIS = SOFTWARE.parent / "data" / "de421.bsp"
+
+
+@pytest.fixture(scope="session")
+def references():
+    """Reference positions with their Unix ``times`` added"""
+    with open(DEFAULT_REFERENCES, 'r') as f:
+        data = json.load(f)
+    count = len(next(iter(data["targets"].values()))["azimuth"])
+    data["times"] = parse_epoch(data["epoch"]) + np.arange(count) * data["step_seconds"]
+    return data
+
+
+@pytest.fixture
+def astronomy(tmp_path, references):
+    """Calculator at the reference observer with the reference ISS elements and no TLE files"""
+    observer = references["observer"]
+    calculator = AstronomyCalculator(observer["latitude"], observer["longitude"], observer["altitude"],
+                                     data_directory=str(tmp_path))
+    calculator.satellites.add_tle(*REFERENCE_TLE)
+    return calculator
+
+
+@pytest.fixture
+def planet_astronomy(references):
+    """Calculator at the reference observer, skipped unless the ephemeris is downloaded"""
+    if not EPHEMERIS.exists():
+        pytest.skip(f"{EPHEMERIS} not downloaded")
+    observer = references["observer"]
+    return AstronomyCalculator(observer["latitude"], observer["longitude"], observer["altitude"],
+                               data_directory=str(EPHEMERIS.parent))
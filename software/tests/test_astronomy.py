@@ -0,0 +1,90 @@
+"""
+Batch solver against the fixed reference positions and the single-target path
+"""
+
+import numpy as np
+import pytest
+from skyfield.earthlib import refract
+
+from benchmarks.pointing_benchmark import SAMPLE_TARGETS, angular_separation
+from positioning.astronomy import REFRACTED_TIERS
+
+TOLERANCE = 0.05
+
+TARGETS = {target["type"]: target for target in SAMPLE_TARGETS}
+
+
+def reference_position(astronomy, references, target):
+    """Reference azimuth and elevation, refracted when the type's tier is"""
+    reference = references["targets"][target["name"]]
+    elevation = np.array(reference["elevation"])
+    if astronomy.tier(target["type"]) in REFRACTED_TIERS:
+        elevation = refract(elevation, astronomy.temperature_c, astronomy.pressure_mbar)
+    return np.array(reference["azimuth"]), elevation
+
+
+@pytest.mark.parametrize("kind", ["star", "deep_space", "satellite", "earth_location"])
+def test_batch_matches_references(astronomy, references, kind):
+    target = TARGETS[kind]
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation([target], references["times"])
+    reference_az, reference_el = reference_position(astronomy, references, target)
+    errors = angular_separation(azimuth[0], elevation[0], reference_az, reference_el)
+    assert np.max(errors) < TOLERANCE
+
+
+def test_batch_planet_matches_references(planet_astronomy, references):
+    target = TARGETS["planet"]
+    azimuth, elevation = planet_astronomy.calculate_batch_azimuth_elevation([target], references["times"])
+    reference_az, reference_el = reference_position(planet_astronomy, references, target)
+    errors = angular_separation(azimuth[0], elevation[0], reference_az, reference_el)
+    assert np.max(errors) < TOLERANCE
+
+
+def test_batch_rows_match_single_solves(astronomy, references):
+    targets = [TARGETS[kind] for kind in ("star", "deep_space", "satellite")]
+    times = references["times"][::6]
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation(targets, times)
+    assert azimuth.shape == elevation.shape == (len(targets), len(times))
+    for row, target in enumerate(targets):
+        for column, when in enumerate(times):
+            single = astronomy.calculate_celestial_azimuth_elevation(
+                target["name"], when, target_type=target["type"])
+            assert angular_separation(azimuth[row, column], elevation[row, column], *single) < 1e-3
+
+
+def test_unrefracted_batch_refracts_to_the_same_positions(astronomy, references):
+    target = TARGETS["star"]
+    times = references["times"]
+    _, refracted = astronomy.calculate_batch_azimuth_elevation([target], times)
+    _, unrefracted = astronomy.calculate_batch_azimuth_elevation([target], times, refract=False)
+    np.testing.assert_allclose(astronomy.refract("star", unrefracted[0]), refracted[0], atol=1e-9)
+    assert np.all(refracted[0] >= unrefracted[0])
+
+
+def test_unknown_targets_are_nan(astronomy, references):
+    targets = [{"name": "Nowhere", "type": "star"}, TARGETS["star"]]
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation(targets, references["times"][:4])
+    assert np.isnan(azimuth[0]).all() and np.isnan(elevation[0]).all()
+    assert not np.isnan(azimuth[1]).any()
+
+
+def test_targets_missing_from_the_catalog_use_their_own_coordinates(astronomy, references):
+    vega = astronomy.catalog.find("Vega")
+    renamed = {"name": "Not In Catalog", "type": "star",
+               "ra_hours": float(astronomy.catalog.ra[vega]) / 15.0,
+               "dec_degrees": float(astronomy.catalog.dec[vega])}
+    times = references["times"][:8]
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation([renamed, TARGETS["star"]], times)
+    np.testing.assert_allclose(azimuth[0], azimuth[1], atol=1e-9)
+    np.testing.assert_allclose(elevation[0], elevation[1], atol=1e-9)
+
+
+def test_satellites_are_found_by_norad_id_on_both_paths(astronomy, references):
+    renamed = {"name": "Space Station", "type": "satellite", "norad_id": 25544}
+    times = references["times"][:4]
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation([renamed, TARGETS["satellite"]], times)
+    np.testing.assert_allclose(azimuth[0], azimuth[1], atol=1e-9)
+    for column, when in enumerate(times):
+        single = astronomy.calculate_celestial_azimuth_elevation(
+            renamed["name"], when, target_type="satellite", norad_id=renamed["norad_id"])
+        assert angular_separation(azimuth[0, column], elevation[0, column], *single) < 1e-3
@@ -0,0 +1,80 @@
+"""
+Pointing model and servo lookup tables fitted from logged sightings
+"""
+
+import numpy as np
+import pytest
+
+from kinematics.calibration import PointingModel, ServoLUT, SightingLog
+
+TRUE_MODEL = {"IA": 0.8, "IE": -0.3, "AN": 0.2, "AW": -0.1, "CA": 0.15}
+
+
+def elevation_servo_error(command):
+    """Angle the simulated elevation servo misses by for a command"""
+    return 0.6 * np.sin(np.radians(2.0 * command))
+
+
+def servo_command(target):
+    """Command that makes the simulated elevation servo reach ``target``"""
+    command = target
+    for _ in range(20):
+        command = target - elevation_servo_error(command)
+    return command
+
+
+@pytest.fixture
+def log(tmp_path):
+    generator = np.random.default_rng(0)
+    truth = PointingModel(TRUE_MODEL)
+    log = SightingLog(tmp_path / "sightings.jsonl")
+    for _ in range(300):
+        azimuth, elevation = generator.uniform(0.0, 360.0), generator.uniform(5.0, 80.0)
+        command_az, command_el = truth.apply(azimuth, elevation)
+        log.record("Star", 0.0, azimuth, elevation, float(command_az) + generator.normal(0.0, 0.02),
+                   float(servo_command(command_el)) + generator.normal(0.0, 0.02))
+    return log
+
+
+def test_fit_recovers_the_mount_model(log):
+    model = log.fit()
+    for term in ("IA", "AN", "AW", "CA"):
+        assert model.parameters[term] == pytest.approx(TRUE_MODEL[term], abs=0.05)
+
+
+def test_lookup_table_takes_out_servo_nonlinearity(log):
+    model = log.fit()
+    assert model.elevation_lut
+    generator = np.random.default_rng(1)
+    azimuth, elevation = generator.uniform(0.0, 360.0, 500), generator.uniform(5.0, 80.0, 500)
+    target_el = PointingModel(TRUE_MODEL).apply(azimuth, elevation)[1]
+
+    def worst_error(model):
+        command_el = model.apply(azimuth, elevation)[1]
+        return np.abs(command_el + elevation_servo_error(command_el) - target_el).max()
+
+    with_table = worst_error(model)
+    model.elevation_lut = ServoLUT()
+    assert with_table < 0.5 * worst_error(model)
+
+
+def test_too_few_sightings_do_not_fit(tmp_path):
+    log = SightingLog(tmp_path / "sightings.jsonl")
+    log.record("Star", 0.0, 10.0, 20.0, 10.5, 20.5)
+    assert log.fit() is None
+
+
+def test_azimuth_table_is_continuous_across_north():
+    generator = np.random.default_rng(2)
+    target = generator.uniform(0.0, 360.0, 400)
+    table = ServoLUT.fit(target, target + 0.3 * np.sin(np.radians(target)), 0.0, 360.0, wrap=True)
+    assert table.command_for(0.0) == pytest.approx(table.command_for(360.0) - 360.0)
+    assert table.command_for(90.0) == pytest.approx(90.3, abs=0.05)
+
+
+def test_model_round_trips_with_its_tables(log, tmp_path):
+    model = log.fit()
+    model.save(tmp_path / "calibration.json")
+    loaded = PointingModel.load(tmp_path / "calibration.json")
+    np.testing.assert_allclose(loaded.apply([10.0, 200.0], [20.0, 60.0]),
+                               model.apply([10.0, 200.0], [20.0, 60.0]))
@@ -0,0 +1,28 @@
+"""
+Star catalog: lazily derived indexes on a memory-mapped catalog
+"""
+
+import numpy as np
+
+from positioning.catalog import StarCatalog
+
+WHEN = 1390262400.0
+
+
+def test_loading_reads_no_rows(tmp_path):
+    StarCatalog.builtin().save(tmp_path)
+    catalog = StarCatalog.load(tmp_path, 51.5, 0.0)
+    assert catalog._derived == {}
+
+    vega = StarCatalog.builtin(51.5, 0.0).get_position("Vega", WHEN)
+    assert np.allclose(catalog.get_position("vega", WHEN), vega)
+    assert "unit_vectors" not in catalog._derived
+
+
+def test_derived_indexes_are_shared_between_locations(tmp_path):
+    StarCatalog.builtin().save(tmp_path)
+    catalog = StarCatalog.load(tmp_path)
+    other = catalog.for_location(-33.9, 151.2)
+    assert other.visible(WHEN, limit=3)
+    assert catalog._derived["tree"] is other._derived["tree"]
+    assert catalog.find("M31") == other.find("Andromeda Galaxy")
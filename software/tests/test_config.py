@@ -0,0 +1,55 @@
+"""
+ConfigManager with broken files and a read-only target database
+"""
+
+import json
+
+from utils.config import ConfigManager
+from utils.target_db import import_catalog
+
+TARGETS = [{"name": "Mars", "type": "planet"}, {"name": "Vega", "type": "star"}]
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_unreadable_settings_keep_the_targets(tmp_path):
+    write(tmp_path / "settings.json", '{"device": ')
+    write(tmp_path / "targets.json", json.dumps({"targets": TARGETS}))
+    config = ConfigManager(str(tmp_path))
+    assert config.settings == {}
+    assert config.list_target_names() == ["Mars", "Vega"]
+
+
+def test_unreadable_targets_leave_an_empty_list(tmp_path):
+    write(tmp_path / "targets.json", '{"targets": [')
+    config = ConfigManager(str(tmp_path))
+    assert config.get_targets() == []
+    assert config.get_target(0) is None
+    assert config.get_target_by_name("Mars") is None
+    assert config.get_target_index("Mars") is None
+    assert config.list_target_names() == []
+
+
+def test_unreadable_journal_keeps_the_file(tmp_path):
+    write(tmp_path / "targets.json", json.dumps({"targets": TARGETS}))
+    journal = tmp_path / "targets.json.journal"
+    journal.mkdir()
+    assert ConfigManager(str(tmp_path)).list_target_names() == ["Mars", "Vega"]
+
+
+def test_database_targets_are_read_only(tmp_path, caplog):
+    write(tmp_path / "targets.json", json.dumps({"targets": TARGETS}))
+    import_catalog([{"name": "Sirius", "type": "star", "ra_hours": 6.75, "dec_degrees": -16.7}],
+                   tmp_path / "targets.tdb")
+    config = ConfigManager(str(tmp_path))
+    assert config.get_target(2)["name"] == "Sirius"
+
+    assert config.remove_target(2) is None
+    assert "read-only" in caplog.text
+    assert config.list_target_names() == ["Mars", "Vega", "Sirius"]
+
+    assert config.remove_target(0)["name"] == "Mars"
+    assert config.list_target_names() == ["Vega", "Sirius"]
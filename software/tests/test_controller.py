@@ -0,0 +1,50 @@
+"""
+Controller solves under a simulated clock
+"""
+
+import json
+import shutil
+
+import pytest
+
+from main import AnywharrowController
+from hardware.framebuffer import HeadlessBackend
+from simulation.backends import SimulatedServo
+from utils.clock import SimulatedClock
+
+from conftest import SOFTWARE
+
+VEGA = {"name": "Vega", "type": "star", "description": "Alpha Lyrae"}
+
+
+@pytest.fixture
+def config_path(tmp_path, references):
+    """Repository settings at the reference observer, with data in the test directory"""
+    path = tmp_path / "config"
+    shutil.copytree(SOFTWARE.parent / "config", path)
+    with open(path / "settings.json", 'r') as f:
+        settings = json.load(f)
+    settings["device"]["location"] = dict(references["observer"])
+    settings["ephemeris"]["data_directory"] = str(tmp_path / "data")
+    with open(path / "settings.json", 'w') as f:
+        json.dump(settings, f)
+    with open(path / "targets.json", 'w') as f:
+        json.dump({"targets": [VEGA]}, f)
+    return path
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_solves_at_the_simulated_time(config_path, references, cache):
+    clock = SimulatedClock(references["times"][0])
+    controller = AnywharrowController(str(config_path), clock=clock, servo=SimulatedServo(clock),
+                                      display_backend=HeadlessBackend())
+    try:
+        if not cache:
+            controller.pointing_cache = None
+        clock.sleep(3 * 3600.0)
+        expected = controller.astronomy.calculate_celestial_azimuth_elevation("Vega", clock.time())
+        azimuth, elevation = controller.calculate_target_position(VEGA)
+        assert azimuth == pytest.approx(expected[0], abs=0.05)
+        assert elevation == pytest.approx(expected[1], abs=0.05)
+    finally:
+        controller.cleanup()
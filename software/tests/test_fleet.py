@@ -0,0 +1,57 @@
+"""
+Fleet server: scheduling plans shared by the devices at one location
+"""
+
+import json
+import shutil
+
+import pytest
+
+from fleet.server import FleetServer
+from utils.config import ConfigManager
+
+from conftest import SOFTWARE
+
+VEGA = {"name": "Vega", "type": "star", "description": "Alpha Lyrae"}
+
+
+@pytest.fixture
+def server(tmp_path, astronomy):
+    """Server for a Vega-only target list; stars need no planetary kernel"""
+    astronomy._eph = object()
+    path = tmp_path / "config"
+    shutil.copytree(SOFTWARE.parent / "config", path)
+    with open(path / "targets.json", 'w') as f:
+        json.dump({"targets": [VEGA]}, f)
+    return FleetServer(ConfigManager(str(path)), astronomy=astronomy)
+
+
+def hello(device, latitude, longitude=0.0):
+    return {"op": "hello", "device": device,
+            "location": {"latitude": latitude, "longitude": longitude, "altitude": 0.0}}
+
+
+def test_devices_in_one_building_share_a_plan(server):
+    first = server.register(hello("a", 51.47791, -0.00141))
+    second = server.register(hello("b", 51.47793, -0.00138))
+    elsewhere = server.register(hello("c", 40.7, -74.0))
+
+    assert first.scheduler.plan is second.scheduler.plan
+    assert first.scheduler.queue is not second.scheduler.queue
+    assert elsewhere.scheduler.plan is not first.scheduler.plan
+    assert server.get_stats()["locations"] == 2
+
+
+def test_plans_are_dropped_with_their_last_device(server):
+    first = server.register(hello("a", 51.5))
+    second = server.register(hello("b", 51.5))
+    server.unregister(first)
+    assert server.get_stats()["locations"] == 1
+    server.unregister(second)
+    assert server.get_stats()["locations"] == 0
+
+
+def test_reconnecting_elsewhere_releases_the_old_plan(server):
+    server.register(hello("a", 51.5))
+    server.register(hello("a", 40.7))
+    assert list(server.schedulers) == [(40.7, 0.0, 0.0)]
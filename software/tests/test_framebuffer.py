@@ -0,0 +1,31 @@
+"""
+SSD1306 backend bus traffic
+"""
+
+from hardware.framebuffer import SSD1306Backend
+
+
+class RecordingBus:
+    def __init__(self):
+        self.writes = []
+
+    def writeto(self, address, data):
+        self.writes.append((address, bytes(data)))
+
+
+def test_page_write_is_one_command_and_one_data_transaction():
+    bus = RecordingBus()
+    SSD1306Backend(bus, 0x3C).write_page(2, 10, bytes([0xFF, 0x81, 0xFF]))
+    assert bus.writes == [
+        (0x3C, bytes([0x00, 0x21, 10, 12, 0x22, 2, 2])),
+        (0x3C, bytes([0x40, 0xFF, 0x81, 0xFF])),
+    ]
+
+
+def test_initialization_is_one_command_stream():
+    bus = RecordingBus()
+    SSD1306Backend(bus, 0x3C, height=32).initialize()
+    assert len(bus.writes) == 1
+    stream = bus.writes[0][1]
+    assert stream[0] == 0x00 and stream[1] == 0xAE and stream[-1] == 0xAF
+    assert stream[stream.index(0xA8) + 1] == 31
@@ -0,0 +1,151 @@
+"""
+Pointing cache: accuracy against the batch solver, refraction on evaluation
+and window bookkeeping
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.pointing_benchmark import SAMPLE_TARGETS, angular_separation
+from positioning.pointing_cache import PointingCache
+
+TARGETS = {target["type"]: target for target in SAMPLE_TARGETS}
+
+
+def cached_positions(cache, target, times):
+    return np.array([cache.get_position(target, when) for when in times], dtype=float)
+
+
+@pytest.mark.parametrize("kind", ["star", "deep_space", "satellite", "earth_location"])
+def test_cache_matches_batch_solver(astronomy, references, kind):
+    target = TARGETS[kind]
+    cache = PointingCache(astronomy, tolerance_degrees=0.05)
+    start = references["times"][0]
+    times = start + np.linspace(0.0, 2 * cache.window_seconds[kind], 301)
+    cached = cached_positions(cache, target, times)
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation([target], times)
+    errors = angular_separation(cached[:, 0], cached[:, 1], azimuth[0], elevation[0])
+    assert np.max(errors) <= cache.tolerance
+    stats = cache.get_stats()
+    assert stats["hits"] > stats["misses"] >= 1
+    assert stats["max_error_degrees"] <= cache.tolerance
+
+
+def test_refraction_is_added_on_evaluation(astronomy, references):
+    target = TARGETS["star"]
+    cache = PointingCache(astronomy, tolerance_degrees=0.05)
+    times = references["times"][0] + np.arange(0.0, 86400.0, 60.0)
+    _, unrefracted = astronomy.calculate_batch_azimuth_elevation([target], times, refract=False)
+    # Minutes where Vega is within a few degrees of the horizon, where
+    # refraction changes fastest
+    horizon = times[np.abs(unrefracted[0]) < 3.0]
+    assert len(horizon)
+    cached = cached_positions(cache, target, horizon)
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation([target], horizon)
+    errors = angular_separation(cached[:, 0], cached[:, 1], azimuth[0], elevation[0])
+    assert np.max(errors) <= cache.tolerance
+    window = cache.windows[cache._key(target)]
+    _, fitted = window.evaluate(horizon[-1])
+    assert cached[-1, 1] == pytest.approx(astronomy.refract("star", fitted))
+
+
+def test_geometric_tier_is_not_refracted(astronomy, references):
+    astronomy.precision["star"] = "geometric"
+    target = TARGETS["star"]
+    cache = PointingCache(astronomy)
+    when = references["times"][0]
+    _, elevation = cache.get_position(target, when)
+    window = cache.windows[cache._key(target)]
+    assert elevation == pytest.approx(float(window.evaluate(when)[1]))
+
+
+def test_unsolvable_target_is_not_cached(astronomy, references):
+    cache = PointingCache(astronomy)
+    assert cache.get_position({"name": "Nowhere", "type": "star"}, references["times"][0]) == (None, None)
+    assert not cache.windows
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_invalidate_and_evict(astronomy, references):
+    cache = PointingCache(astronomy)
+    start = references["times"][0]
+    for kind in ("star", "satellite"):
+        cache.get_position(TARGETS[kind], start)
+    assert len(cache.windows) == 2
+
+    cache.invalidate(TARGETS["star"])
+    assert list(cache.windows) == [cache._key(TARGETS["satellite"])]
+
+    cache.get_position(TARGETS["star"], start)
+    # The satellite window is much shorter than the star's
+    assert cache.evict_expired(start + cache.window_seconds["satellite"] + 1.0) == 1
+    assert list(cache.windows) == [cache._key(TARGETS["star"])]
+
+    cache.invalidate()
+    assert not cache.windows
+
+
+def test_least_recently_used_window_is_dropped(astronomy, references):
+    cache = PointingCache(astronomy, max_entries=2)
+    start = references["times"][0]
+    for kind in ("star", "deep_space", "earth_location"):
+        cache.get_position(TARGETS[kind], start)
+    assert list(cache.windows) == [cache._key(TARGETS["deep_space"]), cache._key(TARGETS["earth_location"])]
+
+
+class CountingAstronomy:
+    """Calculator wrapper counting batch solves"""
+
+    def __init__(self, astronomy):
+        self.astronomy = astronomy
+        self.solves = 0
+
+    def calculate_batch_azimuth_elevation(self, *args, **kwargs):
+        self.solves += 1
+        return self.astronomy.calculate_batch_azimuth_elevation(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.astronomy, name)
+
+
+def test_unsolvable_target_is_solved_once_per_query(astronomy, references):
+    counting = CountingAstronomy(astronomy)
+    cache = PointingCache(counting)
+    target = {"name": "Nowhere", "type": "star"}
+    for when in references["times"][0] + np.arange(5.0):
+        assert cache.get_position(target, when) == (None, None)
+    assert counting.solves == 5
+    assert cache.fits == 0
+
+
+def test_target_that_never_fits_is_solved_directly(astronomy, references):
+    counting = CountingAstronomy(astronomy)
+    cache = PointingCache(counting, tolerance_degrees=1e-9)
+    target = TARGETS["satellite"]
+    start = references["times"][0]
+    times = start + np.arange(0.0, 30.0, 1.0)
+    cached = cached_positions(cache, target, times)
+    azimuth, elevation = astronomy.calculate_batch_azimuth_elevation([target], times)
+    np.testing.assert_allclose(cached[:, 0], azimuth[0], atol=1e-6)
+    np.testing.assert_allclose(cached[:, 1], elevation[0], atol=1e-6)
+    # One round of halvings, then one solve per query for the rest of the window
+    assert counting.solves == cache.fits + len(times) - 1
+    assert cache.fits <= 8
+
+    # After a window length fitting is tried again, from the shortest span only
+    fits = cache.fits
+    cache.get_position(target, start + cache.window_seconds["satellite"] + 1.0)
+    assert cache.fits == fits + 1
+
+
+def test_fit_starts_from_the_span_that_worked(astronomy, references):
+    cache = PointingCache(astronomy, tolerance_degrees=0.001, window_seconds={"satellite": 1200.0})
+    target = TARGETS["satellite"]
+    start = references["times"][0]
+    cache.get_position(target, start)
+    first = cache.fits
+    window = cache.windows[cache._key(target)]
+    assert first > 1
+    cache.get_position(target, window.end + 0.5)
+    # At most one try at twice the last span before it fits again
+    assert cache.fits - first <= 2
@@ -0,0 +1,73 @@
+"""
+Target scheduler: elevation floors and incremental target changes
+"""
+
+import numpy as np
+
+from planning.scheduler import TargetScheduler
+
+
+class FixedSky:
+    """Batch solver returning each target's ``elevation`` at every time"""
+
+    def calculate_batch_azimuth_elevation(self, targets, times):
+        elevation = np.array([[target["elevation"]] * len(times) for target in targets], dtype=float)
+        azimuth = np.array([[10.0 * i] * len(times) for i in range(len(targets))], dtype=float)
+        return azimuth, elevation
+
+
+def scheduler(targets, **kwargs):
+    return TargetScheduler(FixedSky(), targets, horizon_hours=1.0, **kwargs)
+
+
+def planned_names(schedule):
+    schedule.plan_round(0.0, 0.0, 0.0)
+    return sorted(schedule.targets[entry.index]["name"] for entry in schedule.queue)
+
+
+def test_floors_by_target_type_and_default():
+    targets = [
+        {"name": "low star", "type": "star", "elevation": 5.0},
+        {"name": "high star", "type": "star", "elevation": 15.0},
+        {"name": "own floor", "type": "star", "elevation": 5.0, "min_elevation": 2.0},
+        {"name": "below horizon", "type": "planet", "elevation": -1.0},
+        {"name": "planet", "type": "planet", "elevation": 1.0},
+    ]
+    schedule = scheduler(targets, min_elevation={"star": 10.0})
+    assert planned_names(schedule) == ["high star", "own floor", "planet"]
+
+
+def test_added_targets_get_their_floor():
+    schedule = scheduler([{"name": "a", "type": "star", "elevation": 20.0}], min_elevation={"star": 10.0})
+    schedule.plan_round(0.0, 0.0, 0.0)
+    schedule.add_target({"name": "too low", "type": "star", "elevation": 5.0})
+    schedule.add_target({"name": "b", "type": "star", "elevation": 30.0})
+    assert [schedule.targets[entry.index]["name"] for entry in schedule.queue][1:] == ["b"]
+    assert list(schedule.floors) == [10.0, 10.0, 10.0]
+
+
+def test_removed_targets_are_not_planned():
+    targets = [{"name": name, "type": "star", "elevation": 20.0} for name in ("a", "b", "c")]
+    schedule = scheduler(targets)
+    assert schedule.remove_target("B")
+    assert planned_names(schedule) == ["a", "c"]
+
+
+def test_shared_plan_is_solved_once_with_separate_queues():
+    class CountingSky(FixedSky):
+        solves = 0
+
+        def calculate_batch_azimuth_elevation(self, targets, times):
+            CountingSky.solves += 1
+            return super().calculate_batch_azimuth_elevation(targets, times)
+
+    first = TargetScheduler(CountingSky(), [{"name": "a", "elevation": 20.0},
+                                            {"name": "b", "elevation": 30.0}], horizon_hours=1.0)
+    second = first.share()
+    assert first.next_target(0.0, 0.0, 0.0)["name"] == "a"
+    assert second.next_target(0.0, 0.0, 0.0)["name"] == "a"
+    assert CountingSky.solves == 1
+
+    second.add_target({"name": "c", "elevation": 40.0})
+    first.queue.clear()
+    assert planned_names(first) == ["a", "b", "c"]
@@ -0,0 +1,157 @@
+"""
+Target store: journal replay, the journal's base hash and outside edits
+"""
+
+import os
+import json
+
+import pytest
+
+from utils.target_store import TargetStore
+
+TARGETS = [
+    {"name": "Mars", "type": "planet"},
+    {"name": "Vega", "type": "star"},
+    {"name": "ISS (ZARYA)", "type": "satellite", "norad_id": 25544},
+]
+
+
+def write_targets(path, targets):
+    with open(path, 'w') as f:
+        json.dump({"targets": targets}, f)
+    # A later mtime even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "targets.json"
+    write_targets(path, TARGETS)
+    return path
+
+
+def test_lookups(path):
+    store = TargetStore(path)
+    assert len(store) == 3
+    assert store.names() == ["Mars", "Vega", "ISS (ZARYA)"]
+    assert store.get_by_name("vega")["type"] == "star"
+    assert store.get_by_norad_id(25544)["name"] == "ISS (ZARYA)"
+    assert [target["name"] for target in store.get_by_type("planet")] == ["Mars"]
+    assert store.index_of("ISS (ZARYA)") == 2
+    assert store.get(3) is None
+
+
+def test_journal_is_replayed_without_compaction(path):
+    store = TargetStore(path)
+    store.add({"name": "Sirius", "type": "star"})
+    store.update("Mars", {"name": "Mars", "type": "planet", "description": "Red"})
+    store.remove("Vega")
+    store.sync()
+
+    # The file itself is untouched until compaction
+    with open(path, 'r') as f:
+        assert json.load(f)["targets"] == TARGETS
+
+    reloaded = TargetStore(path)
+    assert reloaded.names() == ["Mars", "ISS (ZARYA)", "Sirius"]
+    assert reloaded.get_by_name("Mars")["description"] == "Red"
+
+
+def test_journal_starts_with_the_file_hash(path):
+    store = TargetStore(path)
+    store.add({"name": "Sirius", "type": "star"})
+    store.sync()
+    with open(store.journal_path, 'r') as f:
+        header = json.loads(f.readline())
+    assert header["op"] == "base"
+    assert header["hash"] == store._file_hash
+
+
+def test_journal_of_an_edited_file_is_discarded(path):
+    store = TargetStore(path)
+    store.add({"name": "Sirius", "type": "star"})
+    store.sync()
+    write_targets(path, TARGETS[:1])
+
+    reloaded = TargetStore(path)
+    assert reloaded.names() == ["Mars"]
+    assert not reloaded.journal_path.exists()
+
+
+def test_torn_journal_line_is_ignored(path):
+    store = TargetStore(path)
+    store.add({"name": "Sirius", "type": "star"})
+    store.sync()
+    with open(store.journal_path, 'a') as f:
+        f.write('{"op": "add", "target": {"name": "Can')
+
+    assert TargetStore(path).names() == ["Mars", "Vega", "ISS (ZARYA)", "Sirius"]
+
+
+def test_compaction_rewrites_the_file(path):
+    store = TargetStore(path, compact_after=2)
+    store.add({"name": "Sirius", "type": "star"})
+    store.remove("Mars")
+    assert not store.journal_path.exists()
+    with open(path, 'r') as f:
+        assert [target["name"] for target in json.load(f)["targets"]] == ["Vega", "ISS (ZARYA)", "Sirius"]
+
+
+def test_close_compacts(path):
+    store = TargetStore(path)
+    store.add({"name": "Sirius", "type": "star"})
+    store.close()
+    assert not store.journal_path.exists()
+    assert TargetStore(path).names() == ["Mars", "Vega", "ISS (ZARYA)", "Sirius"]
+
+
+def test_outside_edits_are_applied_as_deltas(path):
+    store = TargetStore(path)
+    changes = []
+    store.subscribe(lambda added, removed, changed: changes.append((added, removed, changed)))
+    kept = store.get_by_name("ISS (ZARYA)")
+
+    edited = [{"name": "Mars", "type": "planet", "description": "Red"}, TARGETS[2],
+              {"name": "Sirius", "type": "star"}]
+    write_targets(path, edited)
+    assert store.check_for_changes()
+
+    added, removed, changed = changes[-1]
+    assert [target["name"] for target in added] == ["Sirius"]
+    assert [target["name"] for target in removed] == ["Vega"]
+    assert [target["name"] for target in changed] == ["Mars"]
+    assert store.names() == ["Mars", "ISS (ZARYA)", "Sirius"]
+    # Unchanged targets keep their objects
+    assert store.get_by_name("ISS (ZARYA)") is kept
+
+
+def test_outside_edit_replaces_pending_journal(path):
+    store = TargetStore(path)
+    store.add({"name": "Sirius", "type": "star"})
+    store.sync()
+    write_targets(path, TARGETS[:2])
+    assert store.check_for_changes()
+    assert store.names() == ["Mars", "Vega"]
+    assert not store.journal_path.exists()
+
+
+def test_touch_without_changes_is_ignored(path):
+    store = TargetStore(path)
+    write_targets(path, TARGETS)
+    assert not store.check_for_changes()
+    assert store.names() == ["Mars", "Vega", "ISS (ZARYA)"]
+
+
+def test_unreadable_file_keeps_the_current_targets(path):
+    store = TargetStore(path)
+    with open(path, 'w') as f:
+        f.write('{"targets": [')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 20_000_000))
+    assert not store.check_for_changes()
+    assert store.names() == ["Mars", "Vega", "ISS (ZARYA)"]
+
+    write_targets(path, TARGETS[:1])
+    assert store.check_for_changes()
+    assert store.names() == ["Mars"]
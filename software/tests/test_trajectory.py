@@ -0,0 +1,77 @@
+"""
+Trajectory planner: endpoints, azimuth wrap and kinematic limits
+"""
+
+import numpy as np
+import pytest
+
+from kinematics.trajectory import AxisLimits, TrajectoryPlanner, shortest_azimuth_delta
+
+# Finite differences of the sampled setpoints may overshoot a limit slightly
+SLACK = 1.01
+
+MOVES = [
+    (0.0, 0.0, 180.0, 80.0),
+    (350.0, 10.0, 10.0, 12.0),
+    (10.0, 45.0, 200.0, 5.0),
+    (0.0, 0.0, 90.0, 0.0),
+    (0.0, 0.0, 0.5, 0.2),
+]
+
+
+@pytest.fixture
+def planner():
+    return TrajectoryPlanner(AxisLimits(120.0, 240.0, 1200.0), AxisLimits(60.0, 120.0, 600.0),
+                             rate_hz=50.0)
+
+
+def derivatives(positions, dt):
+    velocity = np.diff(positions) / dt
+    acceleration = np.diff(velocity) / dt
+    return velocity, acceleration, np.diff(acceleration) / dt
+
+
+@pytest.mark.parametrize("move", MOVES)
+def test_plan_stays_within_limits(planner, move):
+    trajectory = planner.plan(*move)
+    dt = 1.0 / planner.rate_hz
+    for positions, limits in ((np.unwrap(trajectory.azimuth, period=360.0), planner.azimuth_limits),
+                              (trajectory.elevation, planner.elevation_limits)):
+        velocity, acceleration, jerk = derivatives(positions, dt)
+        assert np.abs(velocity).max() <= limits.max_velocity * SLACK
+        assert np.abs(acceleration).max() <= limits.max_acceleration * SLACK
+        assert np.abs(jerk).max() <= limits.max_jerk * SLACK
+
+
+@pytest.mark.parametrize("move", MOVES)
+def test_plan_reaches_the_target(planner, move):
+    start_az, start_el, target_az, target_el = move
+    trajectory = planner.plan(*move)
+    assert len(trajectory.azimuth) == len(trajectory.elevation) == len(trajectory.times)
+    assert trajectory.azimuth[0] == pytest.approx(start_az % 360.0)
+    assert trajectory.elevation[0] == pytest.approx(start_el)
+    assert shortest_azimuth_delta(trajectory.azimuth[-1], target_az) == pytest.approx(0.0, abs=1e-9)
+    assert trajectory.elevation[-1] == pytest.approx(target_el)
+    assert planner.move_time(*move) == pytest.approx(trajectory.duration, abs=0.25)
+
+
+def test_azimuth_wraps_the_short_way(planner):
+    trajectory = planner.plan(350.0, 0.0, 10.0, 0.0)
+    path = np.unwrap(trajectory.azimuth, period=360.0)
+    assert np.all(np.diff(path) >= -1e-9)
+    assert path[-1] - path[0] == pytest.approx(20.0)
+    assert np.all((trajectory.azimuth >= 0.0) & (trajectory.azimuth < 360.0))
+
+
+def test_min_duration_stretches_the_move(planner):
+    fastest = planner.plan(0.0, 0.0, 30.0, 10.0)
+    stretched = planner.plan(0.0, 0.0, 30.0, 10.0, min_duration=5.0)
+    assert fastest.duration < 5.0 <= stretched.duration + 1.0 / planner.rate_hz
+    assert stretched.azimuth[-1] == pytest.approx(30.0)
+
+
+def test_zero_move_is_a_single_setpoint(planner):
+    trajectory = planner.plan(123.0, 45.0, 123.0, 45.0)
+    assert len(trajectory) == 1
+    assert trajectory.azimuth[0] == pytest.approx(123.0)
+    assert trajectory.elevation[0] == pytest.approx(45.0)
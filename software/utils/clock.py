@@ -0,0 +1,56 @@
+"""
+Clocks for the control loop: the system clock and a simulated one
+"""
+
+import time
+import threading
+
+
+class SystemClock:
+    """Wall-clock time, used on the device"""
+
+    simulated = False
+
+    def time(self) -> float:
+        """Unix time in seconds"""
+        return time.time()
+
+    def monotonic(self) -> float:
+        """Monotonic seconds for measuring intervals"""
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """
+    Virtual time that only advances when something sleeps
+
+    Lets the control loop run faster than real time: a sleep returns
+    immediately after moving the clock forward.
+    """
+
+    simulated = True
+
+    def __init__(self, start: float = 0.0):
+        self._start = start
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        """Simulated Unix time in seconds"""
+        return self._start + self._elapsed
+
+    def monotonic(self) -> float:
+        """Simulated seconds since the clock was created"""
+        return self._elapsed
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.advance(seconds)
+
+    def advance(self, seconds: float):
+        """Move simulated time forward"""
+        with self._lock:
+            self._elapsed += seconds
@@ -7,6 +7,9 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from utils.target_store import TargetStore
+from utils.target_db import TargetDatabase, TargetView
+
 logger = logging.getLogger(__name__)
 
 class ConfigManager:
@@ -14,31 +17,49 @@ class ConfigManager:
     
     def __init__(self, config_path: str = "config"):
         self.config_path = Path(config_path)
-        self.targets = []
+        self.store: Optional[TargetStore] = None
+        self.database: Optional[TargetDatabase] = None
         self.settings = {}
         
         self._load_config()
     
+    @property
+    def targets(self) -> List[Dict[str, Any]]:
+        """All targets: targets.json first, then the target database"""
+        targets = self.store.all() if self.store is not None else []
+        if self.database is None:
+            return targets
+        return TargetView(targets, self.database)
+    
     def _load_config(self):
         """Load configuration from files"""
         try:
-            # Load targets
-            targets_file = self.config_path / "targets.json"
-            if targets_file.exists():
-                with open(targets_file, 'r') as f:
-                    data = json.load(f)
-                    self.targets = data.get("targets", [])
-            
             # Load device settings
             settings_file = self.config_path / "settings.json"
             if settings_file.exists():
                 with open(settings_file, 'r') as f:
                     self.settings.update(json.load(f))
-            
-            logger.info(f"Loaded {len(self.targets)} targets from configuration")
-            
         except Exception as e:
             logger.error(f"Failed to load configuration: {e}")
+        
+        # Load targets into the indexed store; it starts empty if the
+        # target file cannot be read, so the accessors always have one
+        self.store = TargetStore(
+            self.config_path / "targets.json",
+            batch_size=self.get_nested_setting("target_store", "journal_batch_size", default=100),
+            compact_after=self.get_nested_setting("target_store", "compact_after", default=1000),
+        )
+        logger.info(f"Loaded {len(self.store)} targets from configuration")
+        
+        try:
+            # Large catalogs come from a memory-mapped database, if present
+            database_file = self.config_path / self.get_nested_setting(
+                "target_store", "database", default="targets.tdb")
+            if database_file.exists():
+                self.database = TargetDatabase(database_file)
+                logger.info(f"Mapped {len(self.database)} targets from {database_file}")
+        except Exception as e:
+            logger.error(f"Failed to load target database: {e}")
     
     def get_targets(self) -> List[Dict[str, Any]]:
         """Get list of targets"""
@@ -46,27 +67,46 @@ class ConfigManager:
     
     def get_target(self, index: int) -> Optional[Dict[str, Any]]:
         """Get specific target by index"""
-        if 0 <= index < len(self.targets):
-            return self.targets[index]
-        return None
+        if index < len(self.store) or self.database is None:
+            return self.store.get(index)
+        return self.database.get(index - len(self.store))
     
     def get_target_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """Get target by name (case-insensitive)"""
-        for target in self.targets:
-            if target.get("name", "").lower() == name.lower():
-                return target
-        return None
+        target = self.store.get_by_name(name)
+        if target is None and self.database is not None:
+            target = self.database.get_by_name(name)
+        return target
+    
+    def get_target_by_norad_id(self, norad_id: int) -> Optional[Dict[str, Any]]:
+        """Get a satellite target by NORAD catalog number"""
+        target = self.store.get_by_norad_id(norad_id)
+        if target is None and self.database is not None:
+            target = self.database.get_by_norad_id(norad_id)
+        return target
+    
+    def get_targets_by_type(self, target_type: str) -> List[Dict[str, Any]]:
+        """Get all targets of one type"""
+        targets = self.store.get_by_type(target_type)
+        if self.database is not None:
+            targets += self.database.get_by_type(target_type)
+        return targets
     
     def get_target_index(self, name: str) -> Optional[int]:
         """Get the index of a target by name"""
-        for i, target in enumerate(self.targets):
-            if target.get("name", "").lower() == name.lower():
-                return i
-        return None
+        index = self.store.index_of(name)
+        if index is None and self.database is not None:
+            index = self.database.index_of(name)
+            if index is not None:
+                index += len(self.store)
+        return index
     
     def list_target_names(self) -> List[str]:
         """Get list of all target names"""
-        return [target.get("name", "") for target in self.targets]
+        names = self.store.names()
+        if self.database is not None:
+            names.extend(self.database.names())
+        return names
     
     def get_setting(self, key: str, default: Any = None) -> Any:
         """Get a configuration setting"""
@@ -87,26 +127,28 @@ class ConfigManager:
         self.settings[key] = value
     
     def add_target(self, target: Dict[str, Any]):
-        """Add a new target"""
-        self.targets.append(target)
-        self._save_targets()
-    
-    def remove_target(self, index: int):
-        """Remove a target by index"""
-        if 0 <= index < len(self.targets):
-            del self.targets[index]
-            self._save_targets()
-    
-    def _save_targets(self):
-        """Save targets to file"""
-        try:
-            targets_file = self.config_path / "targets.json"
-            data = {"targets": self.targets}
-            
-            with open(targets_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                
-            logger.info("Targets saved to configuration")
-            
-        except Exception as e:
-            logger.error(f"Failed to save targets: {e}")
+        """Add a new target (journaled; see ``save_targets``)"""
+        self.store.add(target)
+    
+    def remove_target(self, index: int) -> Optional[Dict[str, Any]]:
+        """
+        Remove a target by index (journaled; see ``save_targets``)
+        
+        Only targets from targets.json can be removed; the target database
+        is read-only.
+        
+        Returns:
+            dict: The removed target, or None
+        """
+        if index >= len(self.store) and self.database is not None:
+            logger.warning(f"Target {index} is in the read-only target database, not removed")
+            return None
+        return self.store.remove_at(index)
+    
+    def save_targets(self):
+        """Write all journaled target changes back to targets.json"""
+        self.store.compact()
+    
+    def close(self):
+        """Stop watching for target changes and save pending ones"""
+        self.store.close()
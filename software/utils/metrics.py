@@ -0,0 +1,350 @@
+"""
+Lightweight metrics, Prometheus export and a sampling profiler
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import traceback
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Metric key: (name, sorted label pairs)
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _NullTimer:
+    """Timer used while metrics are disabled; does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "key", "start")
+
+    def __init__(self, registry: "MetricsRegistry", key: Key):
+        self.registry = registry
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class _Series:
+    """Count, sum and a ring of recent samples for percentiles"""
+
+    __slots__ = ("count", "total", "maximum", "samples")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples = np.zeros(window)
+
+    def add(self, value: float):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def recent(self) -> np.ndarray:
+        return self.samples[:min(self.count, len(self.samples))]
+
+
+class MetricsRegistry:
+    """
+    Timers, counters and gauges for the control pipeline
+
+    Instrumented code calls ``timer``, ``observe``, ``increment`` and
+    ``set_gauge`` unconditionally. While the registry is disabled these
+    return immediately (``timer`` hands back a shared no-op context
+    manager), so the hooks can stay in hot paths. Percentiles are taken
+    over the most recent ``window`` samples of each series.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = 2048):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._series: Dict[Key, _Series] = {}
+        self._counters: Dict[Key, float] = {}
+        self._gauges: Dict[Key, float] = {}
+        self.started = time.time()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Key:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def timer(self, name: str, **labels):
+        """Context manager timing a block as one sample of ``name``"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, self._key(name, labels))
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one duration sample"""
+        if self.enabled:
+            self._observe(self._key(name, labels), seconds)
+
+    def _observe(self, key: Key, seconds: float):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.window)
+            series.add(seconds)
+
+    def increment(self, name: str, value: float = 1.0, **labels):
+        """Add to a counter"""
+        if self.enabled:
+            key = self._key(name, labels)
+            with self._lock:
+                self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value"""
+        if self.enabled:
+            self._gauges[self._key(name, labels)] = value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Per-stage latency statistics, counters and gauges
+
+        Returns:
+            dict: JSON-ready summary; latencies are in milliseconds
+        """
+        with self._lock:
+            series = {key: (s.count, s.total, s.maximum, s.recent().copy())
+                      for key, s in self._series.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        def label(key: Key) -> str:
+            name, labels = key
+            return name + "".join(f"[{k}={v}]" for k, v in labels)
+
+        stages = {}
+        for key, (count, total, maximum, recent) in sorted(series.items()):
+            stats = {"count": count, "mean_ms": total / count * 1000.0, "max_ms": maximum * 1000.0}
+            for q, value in zip(QUANTILES, np.quantile(recent, QUANTILES)):
+                stats[f"p{int(q * 100)}_ms"] = float(value) * 1000.0
+            stages[label(key)] = stats
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": time.time() - self.started,
+            "stages": stages,
+            "counters": {label(key): value for key, value in sorted(counters.items())},
+            "gauges": {label(key): value for key, value in sorted(gauges.items())},
+        }
+
+    def prometheus_text(self, prefix: str = "anywharrow") -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            series = {key: (s.count, s.total, s.recent().copy()) for key, s in self._series.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        def labels(pairs, **extra) -> str:
+            items = list(pairs) + list(extra.items())
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        for name in sorted({key[0] for key in series}):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (series_name, pairs), (count, total, recent) in sorted(series.items()):
+                if series_name != name:
+                    continue
+                for q, value in zip(QUANTILES, np.quantile(recent, QUANTILES)):
+                    lines.append(f"{metric}{labels(pairs, quantile=q)} {value:.9g}")
+                lines.append(f"{metric}_sum{labels(pairs)} {total:.9g}")
+                lines.append(f"{metric}_count{labels(pairs)} {count}")
+        for kind, values, suffix in (("counter", counters, "_total"), ("gauge", gauges, "")):
+            for name in sorted({key[0] for key in values}):
+                metric = f"{prefix}_{name}{suffix}"
+                lines.append(f"# TYPE {metric} {kind}")
+                for (value_name, pairs), value in sorted(values.items()):
+                    if value_name == name:
+                        lines.append(f"{metric}{labels(pairs)} {value:.9g}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the instrumented modules
+metrics = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint serving ``/metrics`` (Prometheus text) and
+    ``/metrics.json`` (the JSON summary)
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(registry.summary()).encode("utf-8")
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = registry.prometheus_text().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever,
+                                            name="metrics-http", daemon=True)
+            self._thread.start()
+            logger.info(f"Metrics endpoint at http://{self.host}:{self.port}/metrics")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start metrics endpoint: {e}")
+            return False
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class SummaryWriter:
+    """Writes the JSON summary to a file every ``interval`` seconds"""
+
+    def __init__(self, path, registry: MetricsRegistry = metrics, interval: float = 60.0):
+        self.path = Path(path)
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-summary", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        """Write the current summary atomically"""
+        try:
+            temporary = self.path.with_name(self.path.name + ".tmp")
+            with open(temporary, 'w') as f:
+                json.dump(self.registry.summary(), f, indent=2)
+            os.replace(temporary, self.path)
+        except Exception as e:
+            logger.error(f"Failed to write metrics summary: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling every thread's stack at a fixed interval
+
+    Stacks are counted in the collapsed ("folded") format used by flame
+    graph tools: one line per distinct stack, frames joined by ``;``,
+    followed by the number of samples.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 48):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started every {self.interval * 1000:.1f} ms")
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = traceback.extract_stack(frame, limit=self.max_depth)
+                stack = ";".join([names.get(ident, str(ident))] +
+                                 [f"{Path(f.filename).stem}.{f.name}" for f in frames])
+                self.stacks[stack] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self) -> str:
+        """Collected stacks in collapsed format"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.folded())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Compact memory-mapped target database and streaming catalog importer
+
+File layout (little-endian):
+    header    magic, version and section offsets (HEADER, 64 bytes)
+    records   fixed-size NumPy records (RECORD_DTYPE), one per target
+    index     sorted name hashes and their record numbers, for O(log n) lookup
+    strings   UTF-8 string table referenced by (offset, length) pairs
+    metadata  JSON: type names and import details
+
+Usage:
+    python utils/target_db.py catalog.csv config/targets.tdb
+"""
+
+import csv
+import json
+import shutil
+import struct
+import hashlib
+import logging
+import tempfile
+from collections import abc
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ANYWTDB\x00"
+VERSION = 1
+# magic, version, record count, records, index, strings, metadata offset, metadata size
+HEADER = struct.Struct("<8sIxxxxQQQQQQ")
+HEADER_SIZE = 64
+
+RECORD_DTYPE = np.dtype([
+    ("name_hash", "<u8"),
+    ("name", "<u4"), ("name_len", "<u4"),
+    ("description", "<u4"), ("description_len", "<u4"),
+    ("extra", "<u4"), ("extra_len", "<u4"),
+    ("type", "u1"), ("pad", "u1"), ("priority", "<i2"),
+    ("norad_id", "<i4"),
+    ("latitude", "<f8"), ("longitude", "<f8"), ("altitude", "<f4"), ("magnitude", "<f4"),
+    ("ra_hours", "<f8"), ("dec_degrees", "<f8"), ("dwell_seconds", "<f4"),
+])
+
+# Numeric fields stored in their own columns; missing values are NaN
+FLOAT_FIELDS = ("latitude", "longitude", "altitude", "magnitude", "ra_hours", "dec_degrees",
+                "dwell_seconds")
+COLUMN_FIELDS = {"name", "description", "type", "priority", "norad_id"} | set(FLOAT_FIELDS)
+
+
+def name_hash(name: str) -> int:
+    """64-bit hash of a case-folded target name"""
+    return int.from_bytes(hashlib.blake2b(name.lower().encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class TargetDatabase:
+    """
+    Read-only, memory-mapped target table
+
+    Opening maps the file and reads only the header and metadata, so
+    startup time and resident memory do not grow with the number of
+    targets. Target dictionaries are decoded on access. The read methods
+    mirror ``TargetStore``.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            (magic, version, count, records_offset, index_offset, strings_offset,
+             metadata_offset, metadata_size) = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path} is not a version {VERSION} target database")
+            f.seek(metadata_offset)
+            self.metadata = json.loads(f.read(metadata_size))
+
+        self.count = count
+        self.types: List[str] = self.metadata["types"]
+        self.records = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r',
+                                 offset=records_offset, shape=(count,)) if count else \
+            np.zeros(0, dtype=RECORD_DTYPE)
+        if count:
+            self.hashes = np.memmap(self.path, dtype="<u8", mode='r', offset=index_offset, shape=(count,))
+            self.index = np.memmap(self.path, dtype="<u4", mode='r',
+                                   offset=index_offset + 8 * count, shape=(count,))
+        else:
+            self.hashes = np.zeros(0, "<u8")
+            self.index = np.zeros(0, "<u4")
+        self.strings = np.memmap(self.path, dtype=np.uint8, mode='r', offset=strings_offset,
+                                 shape=(metadata_offset - strings_offset,)) \
+            if metadata_offset > strings_offset else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _string(self, offset: int, length: int) -> str:
+        return bytes(self.strings[offset:offset + length]).decode("utf-8")
+
+    def _decode(self, record) -> Dict[str, Any]:
+        target = {
+            "name": self._string(record["name"], record["name_len"]),
+            "type": self.types[record["type"]],
+        }
+        if record["description_len"]:
+            target["description"] = self._string(record["description"], record["description_len"])
+        if record["norad_id"] >= 0:
+            target["norad_id"] = int(record["norad_id"])
+        if record["priority"]:
+            target["priority"] = int(record["priority"])
+        for field in FLOAT_FIELDS:
+            value = float(record[field])
+            if not np.isnan(value):
+                target[field] = value
+        if record["extra_len"]:
+            target.update(json.loads(self._string(record["extra"], record["extra_len"])))
+        return target
+
+    def get(self, index: int) -> Optional[Dict[str, Any]]:
+        """Target at a position in file order"""
+        if 0 <= index < self.count:
+            return self._decode(self.records[index])
+        return None
+
+    def index_of(self, name: str) -> Optional[int]:
+        """Position of the first target with this name (case-insensitive)"""
+        # Binary search touches only a few pages of the mapping
+        key = np.uint64(name_hash(name))
+        start = int(np.searchsorted(self.hashes, key, side="left"))
+        end = int(np.searchsorted(self.hashes, key, side="right"))
+        matches = sorted(int(self.index[i]) for i in range(start, end))
+        for position in matches:
+            record = self.records[position]
+            if self._string(record["name"], record["name_len"]).lower() == name.lower():
+                return position
+        return None
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        index = self.index_of(name)
+        return None if index is None else self.get(index)
+
+    def get_by_norad_id(self, norad_id: int) -> Optional[Dict[str, Any]]:
+        matches = np.flatnonzero(self.records["norad_id"] == int(norad_id))
+        return self.get(int(matches[0])) if len(matches) else None
+
+    def get_by_type(self, target_type: str) -> List[Dict[str, Any]]:
+        if target_type not in self.types:
+            return []
+        code = self.types.index(target_type)
+        return [self.get(int(i)) for i in np.flatnonzero(self.records["type"] == code)]
+
+    def names(self) -> Iterator[str]:
+        for record in self.records:
+            yield self._string(record["name"], record["name_len"])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for record in self.records:
+            yield self._decode(record)
+
+
+class TargetView(abc.Sequence):
+    """
+    Read-only sequence over editable targets followed by database targets
+
+    Items are decoded only when accessed, so handing this to the control
+    loop costs nothing up front.
+    """
+
+    def __init__(self, targets: Sequence[Dict[str, Any]], database: Optional[TargetDatabase] = None):
+        self._targets = targets
+        self._database = database
+
+    def __len__(self) -> int:
+        return len(self._targets) + (len(self._database) if self._database is not None else 0)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < len(self._targets):
+            return self._targets[index]
+        target = self._database.get(index - len(self._targets)) if self._database is not None else None
+        if target is None:
+            raise IndexError("target index out of range")
+        return target
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield from self._targets
+        if self._database is not None:
+            yield from self._database
+
+
+def _iter_json_array(f, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of the first JSON array in a file one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        return bool(chunk)
+
+    # Find the opening bracket of the array
+    while True:
+        start = buffer.find("[")
+        if start >= 0:
+            buffer = buffer[start + 1:]
+            break
+        if not fill():
+            return
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        yield item
+        buffer = buffer[end:]
+        if len(buffer) < chunk_size and not eof:
+            fill()
+
+
+def read_catalog(path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream target dictionaries from a catalog dump
+
+    Supports CSV with a header row, JSON Lines (.jsonl), and JSON with a
+    top-level array or a ``targets`` array.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if value not in (None, "")}
+    elif path.suffix.lower() in (".jsonl", ".ndjson"):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, 'r') as f:
+            yield from _iter_json_array(f)
+
+
+class _StringTable:
+    """Append-only string table spooled to a temporary file"""
+
+    def __init__(self, directory):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.size = 0
+
+    def add(self, text: str):
+        data = text.encode("utf-8")
+        offset = self.size
+        self.file.write(data)
+        self.size += len(data)
+        return offset, len(data)
+
+
+def import_catalog(source, destination, chunk_size: int = 10000,
+                   default_type: str = "star") -> int:
+    """
+    Convert a catalog dump to a target database
+
+    Records are written in chunks as they are read and strings are spooled
+    to a temporary file, so memory use is bounded by the chunk size plus
+    sorting the name index at the end (about 16 bytes per target).
+
+    Args:
+        source: CSV, JSON Lines or JSON catalog file, or an iterable of
+            target dictionaries
+        destination: Database file to write
+        chunk_size: Records buffered before each write
+        default_type: Type for entries without one
+
+    Returns:
+        int: Number of targets written
+    """
+    destination = Path(destination)
+    items: Iterable[Dict[str, Any]] = read_catalog(source) if isinstance(source, (str, Path)) else source
+    types: List[str] = []
+    strings = _StringTable(destination.parent)
+    temporary = destination.with_name(destination.name + ".tmp")
+
+    count = 0
+    with open(temporary, 'w+b') as f:
+        f.write(b"\x00" * HEADER_SIZE)
+        rows: List[tuple] = []
+        for target in items:
+            name = str(target.get("name", ""))
+            description = strings.add(str(target["description"])) if target.get("description") else (0, 0)
+            extra = {key: value for key, value in target.items() if key not in COLUMN_FIELDS}
+            target_type = target.get("type") or default_type
+            if target_type not in types:
+                types.append(target_type)
+            norad_id = target.get("norad_id")
+
+            rows.append((
+                name_hash(name), *strings.add(name), *description,
+                *(strings.add(json.dumps(extra)) if extra else (0, 0)),
+                types.index(target_type), 0, int(target.get("priority", 0)),
+                int(norad_id) if norad_id not in (None, "") else -1,
+                *(float(target[field]) if target.get(field) not in (None, "") else np.nan
+                  for field in FLOAT_FIELDS),
+            ))
+            count += 1
+            if len(rows) == chunk_size:
+                f.write(np.array(rows, dtype=RECORD_DTYPE).tobytes())
+                rows = []
+        if rows:
+            f.write(np.array(rows, dtype=RECORD_DTYPE).tobytes())
+
+        # Name index, built from the hash column already on disk
+        index_offset = f.tell()
+        if count:
+            f.flush()
+            hashes = np.memmap(f, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE,
+                               shape=(count,))["name_hash"]
+            order = np.argsort(hashes, kind="stable")
+            f.write(np.asarray(hashes[order], dtype="<u8").tobytes())
+            f.write(order.astype("<u4").tobytes())
+            del hashes, order
+
+        strings_offset = f.tell()
+        strings.file.seek(0)
+        shutil.copyfileobj(strings.file, f)
+        strings.file.close()
+
+        metadata_offset = f.tell()
+        metadata = json.dumps({"types": types, "source": str(source) if isinstance(source, (str, Path)) else None})
+        f.write(metadata.encode("utf-8"))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, count, HEADER_SIZE, index_offset, strings_offset,
+                            metadata_offset, len(metadata.encode("utf-8"))))
+
+    temporary.replace(destination)
+    logger.info(f"Imported {count} targets into {destination}")
+    return count
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert a catalog dump to a target database")
+    parser.add_argument("source", help="CSV, JSON Lines or JSON catalog")
+    parser.add_argument("destination", help="Database file to write, e.g. config/targets.tdb")
+    parser.add_argument("--type", default="star", help="Type for entries without one")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    import_catalog(args.source, args.destination, default_type=args.type)
+
+
+if __name__ == "__main__":
+    main()
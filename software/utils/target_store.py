@@ -0,0 +1,451 @@
+"""
+Indexed target store with journaled writes and hot reload
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Callback(added, removed, changed), each a list of target dictionaries;
+# ``changed`` holds the new versions
+ChangeListener = Callable[[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]], None]
+
+
+def _name_key(target: Dict[str, Any]) -> str:
+    return target.get("name", "").lower()
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class TargetStore:
+    """
+    Target list with hash indexes, a write-ahead journal and hot reload
+
+    Targets are kept in an insertion-ordered dict keyed by an internal id,
+    with indexes by lower-cased name, by type and by NORAD id, so lookups
+    and removals are O(1) however long the list is. Positional access
+    (``get(index)``) uses an order list rebuilt lazily after changes.
+
+    Changes are appended to ``<file>.journal`` as JSON lines and synced in
+    batches; the full file is only rewritten, atomically, when the journal
+    is compacted. Loading replays the journal over the file, so a crash
+    between compactions loses at most the last unsynced batch. The journal
+    starts with a hash of the file it applies to: if the file was edited
+    outside since, the edit wins and the journal is discarded.
+
+    ``start_watching`` polls the file for outside edits and applies only
+    the differences, in place, reporting them to listeners. Targets added
+    outside go to the end of the file order until the next full load.
+    """
+
+    def __init__(self, path, batch_size: int = 100, compact_after: int = 1000):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.batch_size = batch_size
+        self.compact_after = compact_after
+
+        self._lock = threading.RLock()
+        self._targets: Dict[int, Dict[str, Any]] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        self._by_type: Dict[str, Set[int]] = {}
+        self._by_norad: Dict[int, int] = {}
+        self._next_id = 0
+        self._order: Optional[List[int]] = None
+        self._positions: Optional[Dict[int, int]] = None
+
+        self._journal = None
+        self._pending = 0
+        self._journaled = 0
+        self._file_signature = None
+        self._file_hash = None
+        self._listeners: List[ChangeListener] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._watching = threading.Event()
+
+        self.load()
+
+    # Loading and indexing
+
+    def load(self):
+        """Load the target file and replay any journal on top of it"""
+        with self._lock:
+            self._clear()
+            targets = self._read_file() or []
+            for target in targets:
+                self._insert(target)
+            try:
+                self._journaled = self._replay_journal()
+            except Exception as e:
+                # Start from the file alone rather than from half a replay
+                logger.error(f"Failed to replay {self.journal_path}: {e}")
+                self._clear()
+                for target in targets:
+                    self._insert(target)
+                self._journaled = 0
+            self._file_signature = self._signature()
+            logger.info(f"Loaded {len(self._targets)} targets from {self.path}")
+
+    def _read_file(self) -> Optional[List[Dict[str, Any]]]:
+        """Read the target file, remembering the hash of its contents (None if unreadable)"""
+        self._file_hash = None
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            self._file_hash = _content_hash(data)
+            return json.loads(data).get("targets", [])
+        except Exception as e:
+            logger.error(f"Failed to read targets from {self.path}: {e}")
+            return None
+
+    def _replay_journal(self) -> int:
+        if not self.journal_path.exists():
+            return 0
+        count = 0
+        stale = None
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write
+                    logger.warning("Ignoring incomplete journal entry")
+                    break
+                if entry.get("op") == "base":
+                    if entry.get("hash") != self._file_hash:
+                        stale = sum(1 for _ in f)
+                        break
+                    continue
+                self._apply(entry)
+                count += 1
+        if stale is not None:
+            self._discard_journal(f"{self.path} was edited after the journal was started", stale)
+            return 0
+        return count
+
+    def _discard_journal(self, reason: str, count: int):
+        """Drop journaled changes that no longer apply to the target file"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        if count:
+            logger.warning(f"{reason}, discarding {count} journaled target changes")
+        self._pending = 0
+        self._journaled = 0
+
+    def _signature(self):
+        try:
+            stat = self.path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _clear(self):
+        self._targets.clear()
+        self._by_name.clear()
+        self._by_type.clear()
+        self._by_norad.clear()
+        self._invalidate_order()
+
+    def _invalidate_order(self):
+        self._order = None
+        self._positions = None
+
+    def _insert(self, target: Dict[str, Any]) -> int:
+        uid = self._next_id
+        self._next_id += 1
+        self._targets[uid] = target
+        self._by_name.setdefault(_name_key(target), []).append(uid)
+        self._by_type.setdefault(target.get("type"), set()).add(uid)
+        if target.get("norad_id") is not None:
+            self._by_norad[int(target["norad_id"])] = uid
+        self._invalidate_order()
+        return uid
+
+    def _unindex(self, uid: int, target: Dict[str, Any]):
+        uids = self._by_name[_name_key(target)]
+        uids.remove(uid)
+        if not uids:
+            del self._by_name[_name_key(target)]
+        self._by_type[target.get("type")].discard(uid)
+        if target.get("norad_id") is not None and self._by_norad.get(int(target["norad_id"])) == uid:
+            del self._by_norad[int(target["norad_id"])]
+
+    def _delete(self, uid: int) -> Dict[str, Any]:
+        target = self._targets.pop(uid)
+        self._unindex(uid, target)
+        self._invalidate_order()
+        return target
+
+    def _replace(self, uid: int, target: Dict[str, Any]):
+        """Swap in a new version of a target, keeping its position"""
+        self._unindex(uid, self._targets[uid])
+        self._targets[uid] = target
+        names = self._by_name.setdefault(_name_key(target), [])
+        names.append(uid)
+        names.sort()
+        self._by_type.setdefault(target.get("type"), set()).add(uid)
+        if target.get("norad_id") is not None:
+            self._by_norad[int(target["norad_id"])] = uid
+
+    def _find(self, name: str, occurrence: int = 0) -> Optional[int]:
+        uids = self._by_name.get(name.lower(), [])
+        return uids[occurrence] if occurrence < len(uids) else None
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Apply one journal entry"""
+        op = entry.get("op")
+        if op == "add":
+            self._insert(entry["target"])
+        elif op in ("remove", "update"):
+            uid = self._find(entry["name"], entry.get("occurrence", 0))
+            if uid is None:
+                return
+            if op == "remove":
+                self._delete(uid)
+            else:
+                self._replace(uid, entry["target"])
+
+    # Lookups
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def _ordered(self) -> List[int]:
+        if self._order is None:
+            self._order = list(self._targets)
+        return self._order
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All targets in file order"""
+        with self._lock:
+            return [self._targets[uid] for uid in self._ordered()]
+
+    def get(self, index: int) -> Optional[Dict[str, Any]]:
+        """Target at a position in file order"""
+        with self._lock:
+            order = self._ordered()
+            if 0 <= index < len(order):
+                return self._targets[order[index]]
+            return None
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """First target with this name (case-insensitive)"""
+        uid = self._find(name)
+        return None if uid is None else self._targets.get(uid)
+
+    def get_by_norad_id(self, norad_id: int) -> Optional[Dict[str, Any]]:
+        uid = self._by_norad.get(int(norad_id))
+        return None if uid is None else self._targets.get(uid)
+
+    def get_by_type(self, target_type: str) -> List[Dict[str, Any]]:
+        """Targets of one type, in file order"""
+        with self._lock:
+            uids = self._by_type.get(target_type, set())
+            return [self._targets[uid] for uid in sorted(uids)]
+
+    def index_of(self, name: str) -> Optional[int]:
+        """Position in file order of the first target with this name"""
+        with self._lock:
+            uid = self._find(name)
+            if uid is None:
+                return None
+            if self._positions is None:
+                self._positions = {uid: i for i, uid in enumerate(self._ordered())}
+            return self._positions[uid]
+
+    def names(self) -> List[str]:
+        return [target.get("name", "") for target in self.all()]
+
+    # Journaled changes
+
+    def add(self, target: Dict[str, Any]):
+        """Add a target"""
+        with self._lock:
+            self._insert(target)
+            self._log({"op": "add", "target": target})
+
+    def update(self, name: str, target: Dict[str, Any]) -> bool:
+        """Replace the first target with this name"""
+        with self._lock:
+            uid = self._find(name)
+            if uid is None:
+                return False
+            self._replace(uid, target)
+            self._log({"op": "update", "name": name, "target": target})
+            return True
+
+    def remove(self, name: str) -> Optional[Dict[str, Any]]:
+        """Remove the first target with this name"""
+        with self._lock:
+            uid = self._find(name)
+            if uid is None:
+                return None
+            target = self._delete(uid)
+            self._log({"op": "remove", "name": name})
+            return target
+
+    def remove_at(self, index: int) -> Optional[Dict[str, Any]]:
+        """Remove the target at a position in file order"""
+        with self._lock:
+            order = self._ordered()
+            if not 0 <= index < len(order):
+                return None
+            uid = order[index]
+            name = _name_key(self._targets[uid])
+            occurrence = self._by_name[name].index(uid)
+            target = self._delete(uid)
+            self._log({"op": "remove", "name": name, "occurrence": occurrence})
+            return target
+
+    def _log(self, entry: Dict[str, Any]):
+        if self._journal is None:
+            new = not self.journal_path.exists() or self.journal_path.stat().st_size == 0
+            self._journal = open(self.journal_path, 'a')
+            if new:
+                # Ties the journal to the file contents it applies to
+                self._journal.write(json.dumps({"op": "base", "hash": self._file_hash}) + "\n")
+        self._journal.write(json.dumps(entry) + "\n")
+        self._pending += 1
+        self._journaled += 1
+        if self._pending >= self.batch_size:
+            self.sync()
+        if self._journaled >= self.compact_after:
+            self.compact()
+
+    def sync(self):
+        """Make journaled changes durable"""
+        with self._lock:
+            if self._journal is not None and self._pending:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            self._pending = 0
+
+    def compact(self):
+        """Atomically rewrite the target file and empty the journal"""
+        with self._lock:
+            try:
+                temporary = self.path.with_name(self.path.name + ".tmp")
+                data = json.dumps({"targets": self.all()}, indent=2).encode("utf-8")
+                with open(temporary, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporary, self.path)
+                self._file_hash = _content_hash(data)
+
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+                if self.journal_path.exists():
+                    self.journal_path.unlink()
+                self._pending = 0
+                self._journaled = 0
+                self._file_signature = self._signature()
+                logger.info("Targets saved to configuration")
+            except Exception as e:
+                logger.error(f"Failed to save targets: {e}")
+
+    def close(self):
+        """Stop watching and write everything back to the target file"""
+        self.stop_watching()
+        if self._journaled:
+            self.compact()
+        elif self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    # Hot reload
+
+    def subscribe(self, listener: ChangeListener):
+        """Call ``listener(added, removed, changed)`` after a reload"""
+        self._listeners.append(listener)
+
+    def start_watching(self, interval: float = 2.0):
+        """Poll the target file for outside changes in a background thread"""
+        if self._watcher is not None:
+            return
+        self._watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                         name="target-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._watching.wait(interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logger.error(f"Failed to reload targets: {e}")
+
+    def check_for_changes(self) -> bool:
+        """
+        Apply outside edits of the target file and notify listeners
+
+        Only targets that differ from the file are replaced, removed or
+        added; the rest keep their index entries. An outside edit replaces
+        any journaled changes not yet compacted into the file.
+
+        Returns:
+            bool: Whether anything changed
+        """
+        signature = self._signature()
+        if signature == self._file_signature:
+            return False
+
+        with self._lock:
+            previous_hash = self._file_hash
+            targets = self._read_file()
+            self._file_signature = signature
+            if targets is None:
+                # Probably caught mid-write; the next write changes the signature again
+                self._file_hash = previous_hash
+                return False
+            if self._file_hash == previous_hash:
+                # Touched or rewritten with the same contents
+                return False
+            self._discard_journal(f"{self.path} was edited outside", self._journaled)
+
+            new = {}
+            for target in targets:
+                new.setdefault(_name_key(target), []).append(target)
+            added, removed, changed = [], [], []
+            for name in set(self._by_name) | new.keys():
+                uids = list(self._by_name.get(name, []))
+                versions = new.get(name, [])
+                for uid, current in zip(uids, versions):
+                    if self._targets[uid] != current:
+                        self._replace(uid, current)
+                        changed.append(current)
+                for uid in uids[len(versions):]:
+                    removed.append(self._delete(uid))
+                for current in versions[len(uids):]:
+                    self._insert(current)
+                    added.append(current)
+
+        if not (added or removed or changed):
+            return False
+        logger.info(f"Targets reloaded: {len(added)} added, {len(removed)} removed, "
+                    f"{len(changed)} changed")
+        for listener in self._listeners:
+            try:
+                listener(added, removed, changed)
+            except Exception as e:
+                logger.error(f"Target change listener failed: {e}")
+        return True